@@ -0,0 +1,85 @@
+import tempfile
+from io import BytesIO
+from itertools import islice
+
+from django.template.loader import get_template
+from pypdf import PdfWriter
+from xhtml2pdf import pisa
+
+from .models import Student, User
+
+# Rows rendered per xhtml2pdf pass. Each pass parses and lays out only this
+# many rows, so memory stays flat however long the roster is.
+EXPORT_CHUNK_SIZE = 500
+
+
+def html_to_pdf(template_name, context, dest):
+    html = get_template(template_name).render(context)
+    pisa_status = pisa.CreatePDF(html, dest=dest)
+    if pisa_status.err:
+        raise ValueError(f"Could not render {template_name}")
+
+
+def write_list_pdf(dest, template_name, name, queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """
+    Render ``queryset`` into ``dest`` ``chunk_size`` rows at a time.
+
+    Every chunk is laid out by xhtml2pdf on its own, into a temporary PDF
+    that is merged into the output and closed before the next chunk is read,
+    with ``offset`` passed to the template so row numbers keep counting
+    across chunks.
+    """
+    rows = queryset.iterator(chunk_size=chunk_size)
+    writer = PdfWriter()
+    offset = 0
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk and len(writer.pages):
+                break
+            with tempfile.TemporaryFile() as part:
+                html_to_pdf(template_name, {name: chunk, "offset": offset}, part)
+                part.seek(0)
+                writer.append(part)
+            offset += len(chunk)
+            if len(chunk) < chunk_size:
+                break
+        writer.write(dest)
+    finally:
+        writer.close()
+
+
+def student_list_queryset():
+    return Student.objects.select_related("student", "program")
+
+
+def lecturer_list_queryset():
+    return User.objects.filter(is_lecturer=True)
+
+
+def write_student_list_pdf(dest, chunk_size=EXPORT_CHUNK_SIZE):
+    write_list_pdf(
+        dest, "pdf/student_list.html", "students", student_list_queryset(), chunk_size
+    )
+
+
+def write_lecturer_list_pdf(dest, chunk_size=EXPORT_CHUNK_SIZE):
+    write_list_pdf(
+        dest,
+        "pdf/lecturer_list.html",
+        "lecturers",
+        lecturer_list_queryset(),
+        chunk_size,
+    )
+
+
+def student_list_job():
+    buffer = BytesIO()
+    write_student_list_pdf(buffer)
+    return "students_list.pdf", buffer.getvalue()
+
+
+def lecturer_list_job():
+    buffer = BytesIO()
+    write_lecturer_list_pdf(buffer)
+    return "lecturers_list.pdf", buffer.getvalue()
@@ -0,0 +1,40 @@
+from io import BytesIO
+
+from django.test import TestCase, override_settings
+from pypdf import PdfReader
+
+from accounts.models import Student, User
+from accounts.pdf import write_student_list_pdf
+from course.models import Program
+
+
+@override_settings(LANGUAGE_CODE="en")
+class StudentListPdfTestCase(TestCase):
+    def setUp(self):
+        program = Program.objects.create(title="Geology")
+        for i in range(5):
+            user = User.objects.create(
+                username=f"geo{i}", first_name="Rock", last_name=f"Hound{i}"
+            )
+            Student.objects.create(student=user, level="Bachelor", program=program)
+
+    def export(self, chunk_size):
+        buffer = BytesIO()
+        write_student_list_pdf(buffer, chunk_size=chunk_size)
+        return PdfReader(BytesIO(buffer.getvalue()), strict=True)
+
+    def test_chunks_are_concatenated_with_continuous_numbering(self):
+        pdf = self.export(chunk_size=2)
+        self.assertEqual(len(pdf.pages), 3)
+        text = "".join(page.extract_text() for page in pdf.pages)
+        for i in range(5):
+            self.assertIn(f"geo{i}", text)
+        self.assertIn("5.", pdf.pages[-1].extract_text())
+
+    def test_queries_do_not_grow_per_student(self):
+        with self.assertNumQueries(1):
+            self.export(chunk_size=2)
+
+    def test_empty_roster_renders_one_page(self):
+        Student.objects.all().delete()
+        self.assertEqual(len(self.export(chunk_size=2).pages), 1)
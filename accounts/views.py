@@ -1,10 +1,12 @@
+import tempfile
+
 from django.contrib import messages
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import PasswordChangeForm
-from django.http import HttpResponse, JsonResponse
+from django.http import FileResponse, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.template.loader import get_template, render_to_string
+from django.template.loader import render_to_string
 from django.utils.decorators import method_decorator
 from django.views.generic import CreateView
 from django_filters.views import FilterView
@@ -20,7 +22,10 @@ from accounts.forms import (
     StudentAddForm,
 )
 from accounts.models import Parent, Student, User
+from accounts.pdf import write_lecturer_list_pdf, write_student_list_pdf
+from core.exports import ExportMixin
 from core.models import Semester, Session
+from core.pdf_jobs import enqueue_pdf_job, render_in_background
 from course.models import Course
 from result.models import TakenCourse
 from quiz.models import Quiz, Sitting
@@ -86,12 +91,17 @@ def teacher_dashboard(request):
     )
     
     # Get quizzes created by this lecturer
-    quizzes = Quiz.objects.filter(course__in=courses)
+    quizzes = (
+        Quiz.objects.filter(course__in=courses)
+        .with_stats()
+        .select_related("course")
+        .order_by("-timestamp")
+    )
     
     # Get recent quiz attempts by students
     recent_attempts = Sitting.objects.filter(
         quiz__course__in=courses, complete=True
-    ).order_by('-end')[:10]
+    ).select_related("user", "quiz", "course").order_by('-end')[:10]
     
     context = {
         "title": "Teacher Dashboard",
@@ -127,14 +137,9 @@ def student_dashboard(request):
     ).order_by('-end')[:10]
     
     # Calculate GPA and CGPA
-    if enrolled_courses.exists():
-        # Get the first taken course to calculate GPA/CGPA
-        sample_course = enrolled_courses.first()
-        gpa = sample_course.calculate_gpa()
-        cgpa = sample_course.calculate_cgpa()
-    else:
-        gpa = 0.0
-        cgpa = 0.0
+    averages = TakenCourse.objects.gpa_for(student, current_semester)[student.pk]
+    gpa = averages["gpa"]
+    cgpa = averages["cgpa"]
     
     context = {
         "title": "Student Dashboard",
@@ -335,11 +340,20 @@ def edit_staff(request, pk):
 
 
 @method_decorator([login_required, admin_required], name="dispatch")
-class LecturerFilterView(FilterView):
+class LecturerFilterView(ExportMixin, FilterView):
     filterset_class = LecturerFilter
     queryset = User.objects.filter(is_lecturer=True)
     template_name = "accounts/lecturer_list.html"
     paginate_by = 10
+    export_filename = "lecturers"
+    export_fields = (
+        ("ID No.", "username"),
+        ("First Name", "first_name"),
+        ("Last Name", "last_name"),
+        ("Email", "email"),
+        ("Mob No.", "phone"),
+        ("Address/City", "address"),
+    )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -350,17 +364,15 @@ class LecturerFilterView(FilterView):
 @login_required
 @admin_required
 def render_lecturer_pdf_list(request):
-    lecturers = User.objects.filter(is_lecturer=True)
-    template_path = "pdf/lecturer_list.html"
-    context = {"lecturers": lecturers}
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = 'filename="lecturers_list.pdf"'
-    template = get_template(template_path)
-    html = template.render(context)
-    pisa_status = pisa.CreatePDF(html, dest=response)
-    if pisa_status.err:
-        return HttpResponse(f"We had some errors <pre>{html}</pre>")
-    return response
+    if render_in_background(request):
+        return enqueue_pdf_job(request, "lecturer_list", {})
+    # spooled to disk and streamed back by FileResponse in blocks
+    export = tempfile.TemporaryFile()
+    write_lecturer_list_pdf(export)
+    export.seek(0)
+    return FileResponse(
+        export, content_type="application/pdf", filename="lecturers_list.pdf"
+    )
 
 
 @login_required
@@ -421,11 +433,21 @@ def edit_student(request, pk):
 
 
 @method_decorator([login_required, admin_required], name="dispatch")
-class StudentListView(FilterView):
+class StudentListView(ExportMixin, FilterView):
     queryset = Student.objects.all()
     filterset_class = StudentFilter
     template_name = "accounts/student_list.html"
     paginate_by = 10
+    export_filename = "students"
+    export_fields = (
+        ("ID No.", "student__username"),
+        ("First Name", "student__first_name"),
+        ("Last Name", "student__last_name"),
+        ("Email", "student__email"),
+        ("Mob No.", "student__phone"),
+        ("Program", "program__title"),
+        ("Level", "level"),
+    )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -436,17 +458,15 @@ class StudentListView(FilterView):
 @login_required
 @admin_required
 def render_student_pdf_list(request):
-    students = Student.objects.all()
-    template_path = "pdf/student_list.html"
-    context = {"students": students}
-    response = HttpResponse(content_type="application/pdf")
-    response["Content-Disposition"] = 'filename="students_list.pdf"'
-    template = get_template(template_path)
-    html = template.render(context)
-    pisa_status = pisa.CreatePDF(html, dest=response)
-    if pisa_status.err:
-        return HttpResponse(f"We had some errors <pre>{html}</pre>")
-    return response
+    if render_in_background(request):
+        return enqueue_pdf_job(request, "student_list", {})
+    # spooled to disk and streamed back by FileResponse in blocks
+    export = tempfile.TemporaryFile()
+    write_student_list_pdf(export)
+    export.seek(0)
+    return FileResponse(
+        export, content_type="application/pdf", filename="students_list.pdf"
+    )
 
 
 @login_required
@@ -211,6 +211,38 @@ LOGOUT_REDIRECT_URL = "/"
 STRIPE_SECRET_KEY = config("STRIPE_SECRET_KEY", default="")
 STRIPE_PUBLISHABLE_KEY = config("STRIPE_PUBLISHABLE_KEY", default="")
 
+# PDF jobs: render PDFs with `manage.py pdf_worker` instead of in the request
+PDF_JOBS_IN_BACKGROUND = config("PDF_JOBS_IN_BACKGROUND", default=False, cast=bool)
+
+# Quizzes: keep attempts at non-exam quizzes in the cache until they are complete.
+# Needs a cache shared by every web process (e.g. Redis or Memcached).
+QUIZ_PRACTICE_SITTINGS_IN_CACHE = config(
+    "QUIZ_PRACTICE_SITTINGS_IN_CACHE", default=False, cast=bool
+)
+
+# Protected media (course videos): leave the bytes to the web server once the
+# view has checked access. "" streams from Django, "x-sendfile" (Apache,
+# lighttpd) or "x-accel-redirect" (nginx, with an internal location mapped to
+# MEDIA_ACCEL_REDIRECT_PREFIX that aliases MEDIA_ROOT).
+MEDIA_SENDFILE_MODE = config("MEDIA_SENDFILE_MODE", default="")
+MEDIA_ACCEL_REDIRECT_PREFIX = config(
+    "MEDIA_ACCEL_REDIRECT_PREFIX", default="/protected-media/"
+)
+
+# Video transcoding: `manage.py transcode_videos` turns uploads into HLS
+FFMPEG_BINARY = config("FFMPEG_BINARY", default="ffmpeg")
+FFPROBE_BINARY = config("FFPROBE_BINARY", default="ffprobe")
+
+# Course registration: queue registrations and drops for
+# `manage.py registration_worker` instead of writing them in the request
+COURSE_REGISTRATION_QUEUE = config(
+    "COURSE_REGISTRATION_QUEUE", default=False, cast=bool
+)
+# Most credits a student may register per semester; 0 for no limit
+COURSE_REGISTRATION_MAX_CREDITS = config(
+    "COURSE_REGISTRATION_MAX_CREDITS", default=0, cast=int
+)
+
 # LOGGING
 # ------------------------------------------------------------------------------
 # https://docs.djangoproject.com/en/dev/ref/settings/#logging
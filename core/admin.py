@@ -1,12 +1,18 @@
 from django.contrib import admin
 from modeltranslation.admin import TranslationAdmin
-from .models import Session, Semester, NewsAndEvents
+from .models import Session, Semester, NewsAndEvents, PdfJob
 
 
 class NewsAndEventsAdmin(TranslationAdmin):
     pass
 
 
+class PdfJobAdmin(admin.ModelAdmin):
+    list_display = ["kind", "status", "requested_by", "created_at", "finished_at"]
+    list_filter = ["kind", "status"]
+
+
 admin.site.register(Semester)
 admin.site.register(Session)
 admin.site.register(NewsAndEvents, NewsAndEventsAdmin)
+admin.site.register(PdfJob, PdfJobAdmin)
@@ -0,0 +1,97 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.models import PdfJob
+from core.pdf_jobs import finish_batches, requeue_stale_jobs, run_job
+
+
+def setup_worker():
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = "Render queued PDF jobs across a pool of worker processes."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count() or 1,
+            help="Number of rendering processes (0 renders in this process).",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=2.0,
+            help="Seconds to wait between polls when the queue is empty.",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=float,
+            default=1800.0,
+            help=(
+                "Seconds after which a running job is assumed lost with its "
+                "worker and queued again."
+            ),
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is drained instead of polling.",
+        )
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        pool = (
+            ProcessPoolExecutor(max_workers=workers, initializer=setup_worker)
+            if workers
+            else None
+        )
+        stale_after = timedelta(seconds=options["stale_after"])
+        running = set()
+        try:
+            while True:
+                requeued = requeue_stale_jobs(stale_after)
+                if requeued:
+                    self.stdout.write(f"Requeued {requeued} stale PDF job(s).")
+                finish_batches()
+                # only claim what a free process can start right away
+                free = max(workers, 1) - len(running)
+                pending = PdfJob.objects.filter(status=PdfJob.PENDING).values_list(
+                    "pk", flat=True
+                )[:free]
+                claimed = [pk for pk in pending if PdfJob.objects.claim(pk)]
+                if pool:
+                    if claimed:
+                        # forked workers must not share the parent's connections
+                        connections.close_all()
+                        running.update(pool.submit(run_job, pk) for pk in claimed)
+                    if running:
+                        # wake up as soon as one job ends to refill its slot
+                        done, running = wait(
+                            running,
+                            timeout=options["sleep"],
+                            return_when=FIRST_COMPLETED,
+                        )
+                        for future in done:
+                            future.result()
+                        if done:
+                            self.stdout.write(f"Rendered {len(done)} PDF job(s).")
+                        continue
+                elif claimed:
+                    for pk in claimed:
+                        run_job(pk)
+                    self.stdout.write(f"Rendered {len(claimed)} PDF job(s).")
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+        finally:
+            if pool:
+                pool.shutdown()
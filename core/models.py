@@ -1,5 +1,11 @@
+import hashlib
+import json
+
+from django.conf import settings
 from django.db import models
 from django.db.models import Q
+from django.urls import reverse
+from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 
 
@@ -91,3 +97,87 @@ class ActivityLog(models.Model):
 
     def __str__(self):
         return f"[{self.created_at}]{self.message}"
+
+
+class PdfJobManager(models.Manager):
+    def enqueue(self, kind, params=None, user=None, parent=None):
+        """
+        Queue a PDF render, reusing an identical job that is still waiting or
+        running so repeated clicks do not render the same file twice.
+        """
+        params = params or {}
+        key = hashlib.sha256(
+            json.dumps(
+                [kind, params, getattr(user, "pk", None)], sort_keys=True
+            ).encode()
+        ).hexdigest()
+        if parent is None:
+            job = self.filter(
+                key=key, status__in=[PdfJob.PENDING, PdfJob.RUNNING]
+            ).first()
+            if job:
+                return job
+        return self.create(
+            kind=kind, params=params, key=key, requested_by=user, parent=parent
+        )
+
+    def claim(self, pk):
+        """Atomically move a pending job to running; False if already taken."""
+        return bool(
+            self.filter(pk=pk, status=PdfJob.PENDING).update(
+                status=PdfJob.RUNNING, started_at=now()
+            )
+        )
+
+
+class PdfJob(models.Model):
+    """A PDF render queued by a view and produced by ``manage.py pdf_worker``."""
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    STATUS_CHOICES = (
+        (PENDING, _("Pending")),
+        (RUNNING, _("Running")),
+        (DONE, _("Done")),
+        (FAILED, _("Failed")),
+    )
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    key = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True
+    )
+    file = models.FileField(upload_to="pdf_jobs/%Y/%m/%d/", blank=True)
+    error = models.TextField(blank=True)
+    requested_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, blank=True, null=True
+    )
+    parent = models.ForeignKey(
+        "self",
+        on_delete=models.CASCADE,
+        blank=True,
+        null=True,
+        related_name="children",
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    objects = PdfJobManager()
+
+    class Meta:
+        ordering = ("created_at",)
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.DONE, self.FAILED)
+
+    def get_absolute_url(self):
+        return reverse("pdf_job_status", kwargs={"pk": self.pk})
@@ -0,0 +1,118 @@
+import mimetypes
+import os
+import traceback
+import zipfile
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db.models import Count, Q
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+
+from .models import PdfJob
+
+# kind -> callable(**params) returning (filename, pdf bytes)
+PDF_JOB_RENDERERS = {
+    "result_sheet": "result.pdf.result_sheet_job",
+    "registration_form": "result.pdf.registration_form_job",
+    "student_list": "accounts.pdf.student_list_job",
+    "lecturer_list": "accounts.pdf.lecturer_list_job",
+}
+
+# kind -> callable(**params) returning [(child kind, child params), ...]
+PDF_JOB_FANOUTS = {
+    "result_sheets": "result.pdf.result_sheets_batch",
+}
+
+
+def run_job(pk):
+    """
+    Render one job. Runs inside the worker's process pool, so it only takes
+    the primary key and reports failures on the job row instead of raising.
+    """
+    job = PdfJob.objects.get(pk=pk)
+    try:
+        if job.kind in PDF_JOB_FANOUTS:
+            fanout = import_string(PDF_JOB_FANOUTS[job.kind])
+            for kind, params in fanout(**job.params):
+                PdfJob.objects.enqueue(kind, params, job.requested_by, parent=job)
+            # the batch is zipped by finish_batches() once its children are done
+            return
+        render = import_string(PDF_JOB_RENDERERS[job.kind])
+        filename, pdf = render(**job.params)
+        job.file.save(filename, ContentFile(pdf), save=False)
+        job.status = PdfJob.DONE
+    except Exception:
+        job.status = PdfJob.FAILED
+        job.error = traceback.format_exc()
+    job.finished_at = now()
+    job.save(update_fields=["file", "status", "error", "finished_at"])
+
+
+def requeue_stale_jobs(timeout):
+    """
+    Put back in the queue the jobs of a worker that died mid-render: renders
+    running for longer than ``timeout`` and batches that never fanned out.
+    Batches waiting on their children are left to finish_batches(). Returns
+    the number of jobs requeued.
+    """
+    return (
+        PdfJob.objects.filter(status=PdfJob.RUNNING, started_at__lt=now() - timeout)
+        .filter(~Q(kind__in=PDF_JOB_FANOUTS) | Q(children__isnull=True))
+        .update(status=PdfJob.PENDING, started_at=None)
+    )
+
+
+def finish_batches():
+    """Zip the files of every running batch whose children have all finished."""
+    batches = (
+        PdfJob.objects.filter(kind__in=PDF_JOB_FANOUTS, status=PdfJob.RUNNING)
+        .annotate(
+            unfinished=Count(
+                "children",
+                filter=Q(children__status__in=[PdfJob.PENDING, PdfJob.RUNNING]),
+            )
+        )
+        .filter(unfinished=0)
+    )
+    for batch in batches:
+        buffer = BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for child in batch.children.filter(status=PdfJob.DONE):
+                with child.file.open("rb") as pdf:
+                    archive.writestr(os.path.basename(child.file.name), pdf.read())
+        batch.file.save(f"{batch.kind}-{batch.pk}.zip", ContentFile(buffer.getvalue()))
+        batch.status = PdfJob.DONE
+        batch.finished_at = now()
+        batch.save(update_fields=["file", "status", "finished_at"])
+
+
+def job_status(job):
+    status = {
+        "id": job.pk,
+        "kind": job.kind,
+        "status": job.status,
+        "status_url": reverse("pdf_job_status", kwargs={"pk": job.pk}),
+    }
+    if job.status == PdfJob.DONE:
+        status["download_url"] = reverse("pdf_job_download", kwargs={"pk": job.pk})
+    if job.status == PdfJob.FAILED:
+        status["error"] = job.error.strip().splitlines()[-1] if job.error else ""
+    return status
+
+
+def file_content_type(job):
+    return mimetypes.guess_type(job.file.name)[0] or "application/octet-stream"
+
+
+def render_in_background(request):
+    """PDF views hand the render to the worker when asked to or by default."""
+    return settings.PDF_JOBS_IN_BACKGROUND or "background" in request.GET
+
+
+def enqueue_pdf_job(request, kind, params):
+    job = PdfJob.objects.enqueue(kind, params, request.user)
+    return JsonResponse(job_status(job), status=202)
@@ -0,0 +1,138 @@
+import mimetypes
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+STREAM_CHUNK_SIZE = 512 * 1024
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeReader:
+    """
+    Read ``length`` bytes of ``file`` from ``start``, so FileResponse can
+    stream part of a file in ``block_size`` reads.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.remaining = length
+        file.seek(start)
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def parse_range(header, size):
+    """
+    The ``(start, end)`` bytes, inclusive, asked by a single-range ``Range``
+    header. None when the header should be ignored (absent, malformed or
+    several ranges) and ValueError when it cannot be satisfied.
+    """
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if first and last and int(last) < int(first):
+        return None
+    if not first:
+        # "bytes=-500" is the last 500 bytes
+        start, end = max(size - int(last), 0), size - 1
+        if not int(last):
+            raise ValueError("Empty suffix range")
+    else:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        raise ValueError(f"Range starts past the end of {size} bytes")
+    return start, end
+
+
+def file_etag(size, modified):
+    return f'"{int(modified.timestamp()):x}-{size:x}"'
+
+
+def offload_response(storage, name, content_type):
+    """
+    Hand the file to the web server with ``X-Sendfile`` (Apache, lighttpd)
+    or ``X-Accel-Redirect`` (nginx); the server handles ranges and caching.
+    """
+    response = HttpResponse(content_type=content_type)
+    if settings.MEDIA_SENDFILE_MODE == "x-accel-redirect":
+        prefix = settings.MEDIA_ACCEL_REDIRECT_PREFIX.rstrip("/")
+        response["X-Accel-Redirect"] = f"{prefix}/{quote(name)}"
+    else:
+        response["X-Sendfile"] = storage.path(name)
+    return response
+
+
+def serve_file(request, name, storage=default_storage, content_type=None):
+    """
+    Serve the stored file ``name`` from a view that already checked
+    permissions.
+
+    Honours ``If-None-Match``/``If-Modified-Since`` and single ``Range``
+    requests (``If-Range`` included), answering ``206 Partial Content`` with
+    the asked bytes read in ``STREAM_CHUNK_SIZE`` blocks. With
+    ``MEDIA_SENDFILE_MODE`` set, the bytes are left to the web server.
+    Raises Http404 when the file is missing from ``storage``.
+    """
+    content_type = (
+        content_type or mimetypes.guess_type(name)[0] or "application/octet-stream"
+    )
+    if settings.MEDIA_SENDFILE_MODE:
+        return offload_response(storage, name, content_type)
+
+    try:
+        size = storage.size(name)
+        modified = storage.get_modified_time(name)
+    except OSError:
+        raise Http404(f"{name} does not exist")
+    etag = file_etag(size, modified)
+    last_modified = int(modified.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is not None:
+        response["ETag"] = etag
+        return response
+
+    byte_range = None
+    if_range = request.headers.get("If-Range")
+    if not if_range or if_range == etag:
+        try:
+            byte_range = parse_range(request.headers.get("Range"), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+
+    start, end = byte_range or (0, size - 1)
+    try:
+        file = storage.open(name, "rb")
+    except OSError:
+        raise Http404(f"{name} does not exist")
+    response = FileResponse(
+        RangeReader(file, start, end - start + 1),
+        status=206 if byte_range else 200,
+        content_type=content_type,
+    )
+    response.block_size = STREAM_CHUNK_SIZE
+    response["Content-Length"] = end - start + 1
+    if byte_range:
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+    response["Accept-Ranges"] = "bytes"
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Cache-Control"] = "private, max-age=3600"
+    return response
@@ -1,3 +1,283 @@
-from django.test import TestCase
+import csv
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import timedelta
+from io import BytesIO, StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import Student
+from accounts.views import StudentListView
+from course.models import Course, CourseAllocation, Program, UploadVideo
+from result.models import TakenCourse
+from .models import PdfJob, Semester, Session
+from .pdf_jobs import requeue_stale_jobs, run_job
+from .streaming import parse_range, serve_file
+from .views import get_pdf_job
+
+User = get_user_model()
+
+
+@override_settings(
+    LANGUAGE_CODE="en",
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+)
+class PdfJobTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.session = Session.objects.create(
+            session="2024/2025", is_current_session=True
+        )
+        self.semester = Semester.objects.create(
+            semester="First", is_current_semester=True, session=self.session
+        )
+        program = Program.objects.create(title="History")
+        self.course = Course.objects.create(
+            title="Antiquity",
+            code="HI101",
+            credit=3,
+            program=program,
+            level="Bachelor",
+            semester="First",
+        )
+        self.lecturer = User.objects.create_user(username="lect", password="pw")
+        self.lecturer.is_lecturer = True
+        self.lecturer.save()
+        allocation = CourseAllocation.objects.create(
+            lecturer=self.lecturer, session=self.session
+        )
+        allocation.courses.add(self.course)
+        for i in range(2):
+            user = User.objects.create_user(username=f"hist{i}", password="pw")
+            student = Student.objects.create(
+                student=user, level="Bachelor", program=program
+            )
+            TakenCourse.objects.create(student=student, course=self.course)
+
+    def sheet_params(self):
+        return {
+            "course_id": self.course.pk,
+            "semester_id": self.semester.pk,
+            "session_id": self.session.pk,
+            "lecturer_id": self.lecturer.pk,
+        }
+
+    def test_enqueue_reuses_unfinished_job(self):
+        job = PdfJob.objects.enqueue("result_sheet", self.sheet_params(), self.lecturer)
+        again = PdfJob.objects.enqueue(
+            "result_sheet", self.sheet_params(), self.lecturer
+        )
+        self.assertEqual(job, again)
+
+        self.assertTrue(PdfJob.objects.claim(job.pk))
+        self.assertFalse(PdfJob.objects.claim(job.pk))
+        run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfJob.DONE)
+        self.assertTrue(job.file.read().startswith(b"%PDF"))
+
+        fresh = PdfJob.objects.enqueue(
+            "result_sheet", self.sheet_params(), self.lecturer
+        )
+        self.assertNotEqual(job, fresh)
+
+    def test_stale_running_jobs_are_requeued(self):
+        lost = PdfJob.objects.enqueue("result_sheet", self.sheet_params())
+        live = PdfJob.objects.enqueue("registration_form", {"student_id": 1})
+        waiting = PdfJob.objects.enqueue("result_sheets", {})
+        unsplit = PdfJob.objects.enqueue("result_sheets", {"session_id": 1})
+        PdfJob.objects.enqueue("result_sheet", {}, parent=waiting)
+        for job in (lost, live, waiting, unsplit):
+            PdfJob.objects.claim(job.pk)
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        PdfJob.objects.exclude(pk=live.pk).update(started_at=an_hour_ago)
+
+        self.assertEqual(requeue_stale_jobs(timedelta(minutes=30)), 2)
+        self.assertEqual(
+            set(
+                PdfJob.objects.filter(status=PdfJob.PENDING).values_list(
+                    "pk", flat=True
+                )
+            ),
+            {lost.pk, unsplit.pk, waiting.children.get().pk},
+        )
+        lost.refresh_from_db()
+        self.assertIsNone(lost.started_at)
+
+    def test_failed_render_is_recorded(self):
+        params = dict(self.sheet_params(), course_id=0)
+        job = PdfJob.objects.enqueue("result_sheet", params, self.lecturer)
+        run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, PdfJob.FAILED)
+        self.assertIn("DoesNotExist", job.error)
+
+    def test_batch_fans_out_and_is_zipped(self):
+        batch = PdfJob.objects.enqueue(
+            "result_sheets",
+            {"semester_id": self.semester.pk, "session_id": self.session.pk},
+        )
+
+        call_command("pdf_worker", workers=0, once=True, stdout=StringIO())
+
+        batch.refresh_from_db()
+        self.assertEqual(batch.status, PdfJob.DONE)
+        self.assertEqual(batch.children.get().kind, "result_sheet")
+        with zipfile.ZipFile(batch.file.open("rb")) as archive:
+            (name,) = archive.namelist()
+            self.assertTrue(archive.read(name).startswith(b"%PDF"))
+
+    def test_background_view_returns_job_and_serves_requester_only(self):
+        self.client.force_login(self.lecturer)
+        response = self.client.get(
+            reverse("result_sheet_pdf_view", args=[self.course.pk]),
+            {"background": 1},
+        )
+        self.assertEqual(response.status_code, 202)
+        job = PdfJob.objects.get(pk=response.json()["id"])
+        self.assertEqual(job.params, self.sheet_params())
+
+        run_job(job.pk)
+        status = self.client.get(response.json()["status_url"]).json()
+        self.assertEqual(status["status"], PdfJob.DONE)
+        download = self.client.get(status["download_url"])
+        self.assertEqual(download["Content-Type"], "application/pdf")
+
+        request = RequestFactory().get(status["download_url"])
+        request.user = User.objects.create_user(username="other", password="pw")
+        with self.assertRaises(Http404):
+            get_pdf_job(request, job.pk)
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        program = Program.objects.create(title="Music")
+        for name in ("ada", "alan", "grace"):
+            user = User.objects.create_user(username=name, password="pw", email=name)
+            Student.objects.create(student=user, level="Bachelor", program=program)
+        self.admin = User.objects.create_superuser(username="admin", password="pw")
+
+    def export(self, export_format, **filters):
+        request = RequestFactory().get("/", dict(filters, export=export_format))
+        request.user = self.admin
+        response = StudentListView.as_view()(request)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    def test_csv_export_follows_filters(self):
+        with self.assertNumQueries(1):
+            content = self.export("csv", email="a")
+        rows = list(csv.reader(content.decode().splitlines()))
+        self.assertEqual(rows[0][0], "ID No.")
+        self.assertEqual(sorted(row[0] for row in rows[1:]), ["ada", "alan", "grace"])
+
+        rows = list(csv.reader(self.export("csv", email="al").decode().splitlines()))
+        self.assertEqual([row[0] for row in rows[1:]], ["alan"])
+
+    def test_xlsx_export_is_a_valid_workbook(self):
+        content = self.export("xlsx", program="Mus")
+        with zipfile.ZipFile(BytesIO(content)) as workbook:
+            self.assertIsNone(workbook.testzip())
+            sheet = workbook.read("xl/worksheets/sheet1.xml").decode()
+        self.assertEqual(sheet.count("<row "), 4)
+        self.assertIn('<t xml:space="preserve">grace</t>', sheet)
+
+
+@override_settings(LANGUAGE_CODE="en")
+class VideoStreamTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        program = Program.objects.create(title="Film")
+        course = Course.objects.create(
+            title="Montage",
+            code="FI101",
+            credit=2,
+            program=program,
+            level="Bachelor",
+            semester="First",
+        )
+        self.video = UploadVideo(title="Lecture", course=course)
+        self.video.video.save("lecture.mp4", ContentFile(b"0123456789"))
+        self.url = reverse(
+            "video_stream", kwargs={"slug": course.slug, "video_slug": self.video.slug}
+        )
+        self.client.force_login(User.objects.create_user(username="v", password="pw"))
+
+    def test_parse_range(self):
+        self.assertEqual(parse_range("bytes=2-5", 10), (2, 5))
+        self.assertEqual(parse_range("bytes=4-", 10), (4, 9))
+        self.assertEqual(parse_range("bytes=-3", 10), (7, 9))
+        self.assertEqual(parse_range("bytes=8-100", 10), (8, 9))
+        self.assertIsNone(parse_range("bytes=0-1,4-5", 10))
+        self.assertIsNone(parse_range("bytes=5-2", 10))
+        with self.assertRaises(ValueError):
+            parse_range("bytes=10-", 10)
+
+    def test_full_and_partial_content(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Content-Type"], "video/mp4")
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=2-5")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 2-5/10")
+        self.assertEqual(response["Content-Length"], "4")
+        self.assertEqual(b"".join(response.streaming_content), b"2345")
+
+        response = self.client.get(self.url, HTTP_RANGE="bytes=20-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */10")
+
+    def test_etag_validation(self):
+        etag = self.client.get(self.url)["ETag"]
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        # a stale If-Range gets the whole file instead of the range
+        response = self.client.get(
+            self.url, HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"stale"'
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url, HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE=etag)
+        self.assertEqual(response.status_code, 206)
+
+    def test_offload_to_web_server(self):
+        with override_settings(MEDIA_SENDFILE_MODE="x-accel-redirect"):
+            response = self.client.get(self.url)
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/protected-media/{self.video.video.name}"
+        )
+        self.assertEqual(response.content, b"")
+
+        with override_settings(MEDIA_SENDFILE_MODE="x-sendfile"):
+            response = self.client.get(self.url)
+        self.assertEqual(response["X-Sendfile"], self.video.video.path)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_missing_file_is_not_found(self):
+        os.remove(self.video.video.path)
+        with self.assertRaises(Http404):
+            serve_file(RequestFactory().get(self.url), self.video.video.name)
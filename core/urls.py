@@ -14,6 +14,8 @@ from .views import (
     semester_update_view,
     semester_delete_view,
     dashboard_view,
+    pdf_job_status,
+    pdf_job_download,
 )
 
 
@@ -32,4 +34,6 @@ urlpatterns = [
     path("semester/<int:pk>/edit/", semester_update_view, name="edit_semester"),
     path("semester/<int:pk>/delete/", semester_delete_view, name="delete_semester"),
     path("dashboard/", dashboard_view, name="dashboard"),
+    path("pdf-jobs/<int:pk>/", pdf_job_status, name="pdf_job_status"),
+    path("pdf-jobs/<int:pk>/download/", pdf_job_download, name="pdf_job_download"),
 ]
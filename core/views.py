@@ -1,3 +1,6 @@
+import os
+
+from django.http import FileResponse, Http404, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
@@ -5,7 +8,8 @@ from django.contrib.auth.decorators import login_required
 from accounts.decorators import admin_required, lecturer_required
 from accounts.models import User, Student
 from .forms import SessionForm, SemesterForm, NewsAndEventsForm
-from .models import NewsAndEvents, ActivityLog, Session, Semester
+from .models import NewsAndEvents, ActivityLog, PdfJob, Session, Semester
+from .pdf_jobs import file_content_type, job_status
 
 
 # ########################################################
@@ -207,3 +211,30 @@ def unset_current_semester():
     if current_semester:
         current_semester.is_current_semester = False
         current_semester.save()
+
+
+# ########################################################
+# PDF jobs
+# ########################################################
+def get_pdf_job(request, pk):
+    job = get_object_or_404(PdfJob, pk=pk)
+    if job.requested_by_id != request.user.pk and not request.user.is_superuser:
+        raise Http404
+    return job
+
+
+@login_required
+def pdf_job_status(request, pk):
+    return JsonResponse(job_status(get_pdf_job(request, pk)))
+
+
+@login_required
+def pdf_job_download(request, pk):
+    job = get_pdf_job(request, pk)
+    if job.status != PdfJob.DONE:
+        raise Http404
+    return FileResponse(
+        job.file.open("rb"),
+        content_type=file_content_type(job),
+        filename=os.path.basename(job.file.name),
+    )
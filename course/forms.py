@@ -30,6 +30,7 @@ class CourseAddForm(forms.ModelForm):
         self.fields["level"].widget.attrs.update({"class": "form-control"})
         self.fields["year"].widget.attrs.update({"class": "form-control"})
         self.fields["semester"].widget.attrs.update({"class": "form-control"})
+        self.fields["capacity"].widget.attrs.update({"class": "form-control"})
 
 
 class CourseAllocationForm(forms.ModelForm):
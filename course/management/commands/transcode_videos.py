@@ -0,0 +1,111 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from course.models import UploadVideo
+from course.transcoding import claim, requeue_stale, transcode_video
+
+
+def setup_worker():
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = "Transcode uploaded course videos to HLS renditions with ffmpeg."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=2,
+            help=(
+                "Videos transcoded at once (0 transcodes in this process); "
+                "each ffmpeg run already uses several cores."
+            ),
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=10.0,
+            help="Seconds to wait between polls when the queue is empty.",
+        )
+        parser.add_argument(
+            "--stale-after",
+            type=float,
+            default=3 * 3600.0,
+            help=(
+                "Seconds after which a running transcode is assumed lost with "
+                "its worker and queued again; keep it above the longest video."
+            ),
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is drained instead of polling.",
+        )
+        parser.add_argument(
+            "--queue-existing",
+            action="store_true",
+            help="Also queue videos uploaded before transcoding was set up.",
+        )
+
+    def handle(self, *args, **options):
+        if options["queue_existing"]:
+            queued = UploadVideo.objects.filter(transcode_status="").update(
+                transcode_status=UploadVideo.PENDING
+            )
+            self.stdout.write(f"Queued {queued} existing video(s).")
+
+        workers = options["workers"]
+        pool = (
+            ProcessPoolExecutor(max_workers=workers, initializer=setup_worker)
+            if workers
+            else None
+        )
+        stale_after = timedelta(seconds=options["stale_after"])
+        running = set()
+        try:
+            while True:
+                requeued = requeue_stale(stale_after)
+                if requeued:
+                    self.stdout.write(f"Requeued {requeued} stale video(s).")
+                # only claim what a free process can start right away
+                free = max(workers, 1) - len(running)
+                pending = UploadVideo.objects.filter(
+                    transcode_status=UploadVideo.PENDING
+                ).values_list("pk", flat=True)[:free]
+                claimed = [pk for pk in pending if claim(pk)]
+                if pool:
+                    if claimed:
+                        # forked workers must not share the parent's connections
+                        connections.close_all()
+                        running.update(
+                            pool.submit(transcode_video, pk) for pk in claimed
+                        )
+                    if running:
+                        # wake up as soon as one video ends to refill its slot
+                        done, running = wait(
+                            running,
+                            timeout=options["sleep"],
+                            return_when=FIRST_COMPLETED,
+                        )
+                        for future in done:
+                            future.result()
+                        if done:
+                            self.stdout.write(f"Transcoded {len(done)} video(s).")
+                        continue
+                elif claimed:
+                    for pk in claimed:
+                        transcode_video(pk)
+                    self.stdout.write(f"Transcoded {len(claimed)} video(s).")
+                    continue
+                if options["once"]:
+                    break
+                time.sleep(options["sleep"])
+        finally:
+            if pool:
+                pool.shutdown()
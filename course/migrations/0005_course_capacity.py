@@ -0,0 +1,22 @@
+# Generated by Django 4.0.8 on 2026-10-18 17:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("course", "0004_alter_course_code_alter_course_credit_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="course",
+            name="capacity",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Seats available; leave empty for no limit.",
+                null=True,
+            ),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.0.8 on 2026-10-18 17:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("course", "0006_course_enrolled_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="uploadvideo",
+            name="hls_playlist",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="uploadvideo",
+            name="poster",
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AddField(
+            model_name="uploadvideo",
+            name="transcode_error",
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name="uploadvideo",
+            name="transcode_status",
+            field=models.CharField(
+                blank=True,
+                choices=[
+                    ("pending", "Pending"),
+                    ("running", "Running"),
+                    ("done", "Done"),
+                    ("failed", "Failed"),
+                ],
+                db_index=True,
+                max_length=10,
+            ),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.0.8 on 2026-10-18 17:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("course", "0007_video_transcoding"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="uploadvideo",
+            name="transcode_started_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
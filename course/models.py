@@ -1,7 +1,7 @@
 from django.conf import settings
 from django.core.validators import FileExtensionValidator
 from django.db import models
-from django.db.models import Q
+from django.db.models import F, Q
 from django.db.models.signals import pre_save, post_delete, post_save
 from django.dispatch import receiver
 from django.urls import reverse
@@ -57,6 +57,25 @@ class CourseManager(models.Manager):
             queryset = queryset.filter(or_lookup).distinct()
         return queryset
 
+    def take_seat(self, pk):
+        """Count one more student in course ``pk`` if it has a free seat."""
+        has_seat = Q(capacity__isnull=True) | Q(enrolled_count__lt=F("capacity"))
+        return bool(
+            self.filter(has_seat, pk=pk).update(enrolled_count=F("enrolled_count") + 1)
+        )
+
+    def add_enrolled(self, deltas):
+        """
+        Apply ``{course_id: delta}`` to ``enrolled_count`` with one UPDATE per
+        distinct delta, so concurrent writers never overwrite each other.
+        """
+        by_delta = {}
+        for pk, delta in deltas.items():
+            if delta:
+                by_delta.setdefault(delta, []).append(pk)
+        for delta, pks in by_delta.items():
+            self.filter(pk__in=pks).update(enrolled_count=F("enrolled_count") + delta)
+
 
 class Course(models.Model):
     slug = models.SlugField(unique=True, blank=True)
@@ -69,6 +88,11 @@ class Course(models.Model):
     year = models.IntegerField(choices=settings.YEARS, default=1)
     semester = models.CharField(choices=settings.SEMESTER_CHOICES, max_length=200)
     is_elective = models.BooleanField(default=False)
+    capacity = models.PositiveIntegerField(
+        blank=True, null=True, help_text=_("Seats available; leave empty for no limit.")
+    )
+    # kept in step with TakenCourse rows, so seat checks never count them
+    enrolled_count = models.PositiveIntegerField(default=0, editable=False)
 
     objects = CourseManager()
 
@@ -78,6 +102,23 @@ class Course(models.Model):
     def get_absolute_url(self):
         return reverse("course_detail", kwargs={"slug": self.slug})
 
+    def save(self, *args, **kwargs):
+        # the counter only moves through CourseManager.take_seat/add_enrolled;
+        # writing back the value loaded with the instance would undo them
+        if not self._state.adding and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name != "enrolled_count"
+            ]
+        super().save(*args, **kwargs)
+
+    @property
+    def seats_left(self):
+        if self.capacity is None:
+            return None
+        return max(self.capacity - self.enrolled_count, 0)
+
     @property
     def is_current_semester(self):
 
@@ -193,6 +234,18 @@ def log_upload_delete(sender, instance, **kwargs):
 
 
 class UploadVideo(models.Model):
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    TRANSCODE_STATUS_CHOICES = (
+        (PENDING, _("Pending")),
+        (RUNNING, _("Running")),
+        (DONE, _("Done")),
+        (FAILED, _("Failed")),
+    )
+
     title = models.CharField(max_length=100)
     slug = models.SlugField(unique=True, blank=True)
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
@@ -205,6 +258,15 @@ class UploadVideo(models.Model):
     )
     summary = models.TextField(blank=True)
     timestamp = models.DateTimeField(auto_now_add=True)
+    # HLS renditions written by `manage.py transcode_videos`; blank status means
+    # the video was never queued and is streamed as uploaded
+    transcode_status = models.CharField(
+        max_length=10, choices=TRANSCODE_STATUS_CHOICES, blank=True, db_index=True
+    )
+    transcode_started_at = models.DateTimeField(blank=True, null=True)
+    transcode_error = models.TextField(blank=True)
+    hls_playlist = models.CharField(max_length=255, blank=True)
+    poster = models.CharField(max_length=255, blank=True)
 
     def __str__(self):
         return f"{self.title}"
@@ -214,8 +276,19 @@ class UploadVideo(models.Model):
             "video_single", kwargs={"slug": self.course.slug, "video_slug": self.slug}
         )
 
+    @property
+    def hls_directory(self):
+        return f"course_videos/hls/{self.pk}"
+
+    @property
+    def is_transcoded(self):
+        return self.transcode_status == self.DONE and bool(self.hls_playlist)
+
     def delete(self, *args, **kwargs):
         self.video.delete(save=False)
+        from .transcoding import remove_renditions
+
+        remove_renditions(self)
         super().delete(*args, **kwargs)
 
 
@@ -223,6 +296,28 @@ class UploadVideo(models.Model):
 def video_pre_save_receiver(sender, instance, **kwargs):
     if not instance.slug:
         instance.slug = unique_slug_generator(instance)
+    update_fields = kwargs.get("update_fields")
+    if instance.pk and (update_fields is None or "video" in update_fields):
+        previous = (
+            UploadVideo.objects.filter(pk=instance.pk)
+            .values_list("video", flat=True)
+            .first()
+        )
+        instance._video_changed = previous != instance.video.name
+
+
+@receiver(post_save, sender=UploadVideo)
+def queue_video_transcode(sender, instance, created, **kwargs):
+    if created or getattr(instance, "_video_changed", False):
+        instance._video_changed = False
+        instance.transcode_status = UploadVideo.PENDING
+        instance.transcode_error = instance.hls_playlist = instance.poster = ""
+        UploadVideo.objects.filter(pk=instance.pk).update(
+            transcode_status=UploadVideo.PENDING,
+            transcode_error="",
+            hls_playlist="",
+            poster="",
+        )
 
 
 @receiver(post_save, sender=UploadVideo)
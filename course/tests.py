@@ -1,3 +1,158 @@
-from django.test import TestCase
+import json
+import os
+import shutil
+import subprocess
+import tempfile
+from datetime import timedelta
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.http import Http404
+from django.test import RequestFactory, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Course, Program, UploadVideo
+from .transcoding import claim, requeue_stale, transcode_video
+from .views import handle_video_hls
+
+User = get_user_model()
+
+
+def fake_ffmpeg(args, **kwargs):
+    """Answer ffprobe for a 1280x720 clip and write whatever ffmpeg would."""
+    if args[0] == "ffprobe":
+        info = {
+            "streams": [{"codec_type": "video", "width": 1280, "height": 720}],
+            "format": {"duration": "42.0"},
+        }
+        return subprocess.CompletedProcess(args, 0, json.dumps(info), "")
+    with open(args[-1], "w") as output:
+        output.write("#EXTM3U\n")
+    return subprocess.CompletedProcess(args, 0, "", "")
+
+
+class CourseSeatTests(TestCase):
+    def test_saving_a_course_keeps_the_seat_counter(self):
+        course = Course.objects.create(
+            title="Optics",
+            code="PH201",
+            credit=3,
+            program=Program.objects.create(title="Physics"),
+            level="Bachelor",
+            semester="First",
+            capacity=2,
+        )
+        self.assertTrue(Course.objects.take_seat(course.pk))
+
+        # an edit of the instance loaded before the registration
+        course.title = "Optics I"
+        course.save()
+        course.refresh_from_db()
+        self.assertEqual((course.title, course.enrolled_count), ("Optics I", 1))
+
+
+@override_settings(LANGUAGE_CODE="en")
+class VideoTranscodeTests(TestCase):
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        media = override_settings(MEDIA_ROOT=self.media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        program = Program.objects.create(title="Film")
+        self.course = Course.objects.create(
+            title="Montage",
+            code="FI101",
+            credit=2,
+            program=program,
+            level="Bachelor",
+            semester="First",
+        )
+        self.video = UploadVideo(title="Lecture", course=self.course)
+        self.video.video.save("lecture.mp4", ContentFile(b"raw"))
+
+    def test_uploads_are_queued_on_save(self):
+        self.assertEqual(self.video.transcode_status, UploadVideo.PENDING)
+        UploadVideo.objects.filter(pk=self.video.pk).update(
+            transcode_status=UploadVideo.DONE
+        )
+        self.video.refresh_from_db()
+
+        self.video.title = "Renamed"
+        self.video.save()
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.transcode_status, UploadVideo.DONE)
+
+        self.video.video.save("cut.mp4", ContentFile(b"new"))
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.transcode_status, UploadVideo.PENDING)
+
+    def test_stale_running_videos_are_requeued(self):
+        self.assertTrue(claim(self.video.pk))
+        self.assertEqual(requeue_stale(timedelta(hours=3)), 0)
+
+        UploadVideo.objects.filter(pk=self.video.pk).update(
+            transcode_started_at=timezone.now() - timedelta(hours=4)
+        )
+        self.assertEqual(requeue_stale(timedelta(hours=3)), 1)
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.transcode_status, UploadVideo.PENDING)
+        self.assertTrue(claim(self.video.pk))
+
+    @patch("course.transcoding.subprocess.run", side_effect=fake_ffmpeg)
+    def test_transcode_writes_renditions_and_serves_them(self, run):
+        UploadVideo.objects.filter(pk=self.video.pk).update(
+            transcode_status=UploadVideo.RUNNING
+        )
+        transcode_video(self.video.pk)
+
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.transcode_status, UploadVideo.DONE)
+        self.assertEqual(self.video.poster, f"{self.video.hls_directory}/poster.jpg")
+        directory = os.path.join(self.media_root, self.video.hls_directory)
+        with open(os.path.join(directory, "master.m3u8")) as playlist:
+            master = playlist.read()
+        # no 1080p rendition for a 720p upload
+        self.assertNotIn("1080p", master)
+        self.assertIn("RESOLUTION=854x480\n480p/index.m3u8", master)
+        self.assertEqual(run.call_count, 5)
+
+        user = User.objects.create_user(username="v", password="pw")
+        self.client.force_login(user)
+        response = self.client.get(
+            reverse(
+                "video_hls",
+                kwargs={
+                    "slug": self.course.slug,
+                    "video_slug": self.video.slug,
+                    "name": "720p/index.m3u8",
+                },
+            )
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/vnd.apple.mpegurl")
+
+        request = RequestFactory().get("/")
+        request.user = user
+        for name in ("notes.txt", "720p/segment_9999.ts"):
+            with self.assertRaises(Http404):
+                handle_video_hls(request, self.course.slug, self.video.slug, name=name)
+
+    @patch("course.transcoding.subprocess.run")
+    def test_failed_transcode_is_recorded(self, run):
+        run.return_value = subprocess.CompletedProcess([], 1, "", "Invalid data")
+        UploadVideo.objects.filter(pk=self.video.pk).update(
+            transcode_status=UploadVideo.RUNNING
+        )
+        transcode_video(self.video.pk)
+
+        self.video.refresh_from_db()
+        self.assertEqual(self.video.transcode_status, UploadVideo.FAILED)
+        self.assertEqual(self.video.transcode_error, "Invalid data")
+        self.assertFalse(self.video.is_transcoded)
+        self.assertFalse(
+            os.path.exists(os.path.join(self.media_root, self.video.hls_directory))
+        )
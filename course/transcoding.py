@@ -0,0 +1,240 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+import traceback
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils.timezone import now
+
+from .models import UploadVideo
+
+# (height, video bitrate, audio bitrate), best first; renditions taller than
+# the upload are skipped
+HLS_RENDITIONS = (
+    (1080, 5000, 192),
+    (720, 2800, 128),
+    (480, 1400, 128),
+    (360, 800, 96),
+)
+HLS_SEGMENT_SECONDS = 6
+HLS_AUDIO_BITRATE = 128
+POSTER_HEIGHT = 720
+# ffmpeg output kept on the video when a transcode fails
+ERROR_TAIL = 4000
+
+HLS_CONTENT_TYPES = {
+    ".m3u8": "application/vnd.apple.mpegurl",
+    ".ts": "video/mp2t",
+    ".jpg": "image/jpeg",
+}
+# the files transcode() writes, relative to the video's hls_directory
+HLS_NAME_RE = re.compile(
+    r"master\.m3u8|poster\.jpg|(\d+p|audio)/(index\.m3u8|segment_\d+\.ts)"
+)
+
+
+class TranscodeError(Exception):
+    pass
+
+
+def run_ffmpeg_tool(args):
+    try:
+        result = subprocess.run(args, capture_output=True, text=True, check=False)
+    except OSError as error:
+        raise TranscodeError(f"Could not run {args[0]}: {error}") from error
+    if result.returncode:
+        raise TranscodeError(result.stderr[-ERROR_TAIL:])
+    return result.stdout
+
+
+def probe(path):
+    """The ``(width, height, duration)`` of a media file; no size for audio."""
+    info = json.loads(
+        run_ffmpeg_tool(
+            [
+                settings.FFPROBE_BINARY,
+                "-v",
+                "error",
+                "-print_format",
+                "json",
+                "-show_entries",
+                "stream=codec_type,width,height:format=duration",
+                path,
+            ]
+        )
+    )
+    video = next(
+        (s for s in info.get("streams", []) if s.get("codec_type") == "video"), {}
+    )
+    duration = float(info.get("format", {}).get("duration") or 0)
+    return video.get("width"), video.get("height"), duration
+
+
+def pick_renditions(height):
+    renditions = [r for r in HLS_RENDITIONS if r[0] <= height]
+    return renditions or [HLS_RENDITIONS[-1]]
+
+
+def rendition_command(source, directory, height, video_kbps, audio_kbps):
+    name = f"{height}p" if height else "audio"
+    os.makedirs(os.path.join(directory, name), exist_ok=True)
+    command = [settings.FFMPEG_BINARY, "-y", "-v", "error", "-i", source]
+    if height:
+        keyframes = str(HLS_SEGMENT_SECONDS * 2)
+        command += [
+            "-vf",
+            f"scale=-2:{height}",
+            "-c:v",
+            "libx264",
+            "-preset",
+            "veryfast",
+            "-b:v",
+            f"{video_kbps}k",
+            "-maxrate",
+            f"{video_kbps * 107 // 100}k",
+            "-bufsize",
+            f"{video_kbps * 3 // 2}k",
+            # a keyframe at every segment boundary lets players switch there
+            "-g",
+            keyframes,
+            "-keyint_min",
+            keyframes,
+            "-sc_threshold",
+            "0",
+        ]
+    else:
+        command += ["-vn"]
+    command += [
+        "-c:a",
+        "aac",
+        "-b:a",
+        f"{audio_kbps}k",
+        "-f",
+        "hls",
+        "-hls_time",
+        str(HLS_SEGMENT_SECONDS),
+        "-hls_playlist_type",
+        "vod",
+        "-hls_segment_filename",
+        os.path.join(directory, name, "segment_%04d.ts"),
+        os.path.join(directory, name, "index.m3u8"),
+    ]
+    return name, command
+
+
+def master_playlist(variants):
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3"]
+    for name, bandwidth, resolution in variants:
+        attributes = f"BANDWIDTH={bandwidth}"
+        if resolution:
+            attributes += f",RESOLUTION={resolution}"
+        lines += [f"#EXT-X-STREAM-INF:{attributes}", f"{name}/index.m3u8"]
+    return "\n".join(lines) + "\n"
+
+
+def remove_renditions(video):
+    storage = video.video.storage
+    shutil.rmtree(storage.path(video.hls_directory), ignore_errors=True)
+
+
+def transcode(video):
+    """
+    Write the HLS renditions and poster of ``video`` under its
+    ``hls_directory``: one ffmpeg run per rendition, then a master playlist
+    listing them. Returns the storage names of the playlist and poster.
+    """
+    storage = video.video.storage
+    source = video.video.path
+    directory = storage.path(video.hls_directory)
+    remove_renditions(video)
+    os.makedirs(directory)
+
+    width, height, duration = probe(source)
+    if height:
+        renditions = pick_renditions(height)
+    else:
+        renditions = [(None, 0, HLS_AUDIO_BITRATE)]
+    variants = []
+    for rendition_height, video_kbps, audio_kbps in renditions:
+        name, command = rendition_command(
+            source, directory, rendition_height, video_kbps, audio_kbps
+        )
+        run_ffmpeg_tool(command)
+        resolution = None
+        if rendition_height:
+            scaled_width = round(width * rendition_height / height / 2) * 2
+            resolution = f"{scaled_width}x{rendition_height}"
+        variants.append((name, (video_kbps + audio_kbps) * 1000, resolution))
+
+    with open(os.path.join(directory, "master.m3u8"), "w") as playlist:
+        playlist.write(master_playlist(variants))
+
+    poster = ""
+    if height:
+        run_ffmpeg_tool(
+            [
+                settings.FFMPEG_BINARY,
+                "-y",
+                "-v",
+                "error",
+                "-ss",
+                f"{min(5, duration / 2):.2f}",
+                "-i",
+                source,
+                "-frames:v",
+                "1",
+                "-vf",
+                f"scale=-2:{min(POSTER_HEIGHT, height)}",
+                os.path.join(directory, "poster.jpg"),
+            ]
+        )
+        poster = f"{video.hls_directory}/poster.jpg"
+    return f"{video.hls_directory}/master.m3u8", poster
+
+
+def claim(pk):
+    """Atomically move a pending video to running; False if already taken."""
+    return bool(
+        UploadVideo.objects.filter(pk=pk, transcode_status=UploadVideo.PENDING).update(
+            transcode_status=UploadVideo.RUNNING, transcode_started_at=now()
+        )
+    )
+
+
+def requeue_stale(timeout):
+    """
+    Queue again the videos of a worker that died mid-transcode, i.e. running
+    for longer than ``timeout`` or claimed before start times were recorded.
+    Returns the number of videos requeued.
+    """
+    stale = Q(transcode_started_at__lt=now() - timeout) | Q(
+        transcode_started_at__isnull=True
+    )
+    return UploadVideo.objects.filter(
+        stale, transcode_status=UploadVideo.RUNNING
+    ).update(transcode_status=UploadVideo.PENDING, transcode_started_at=None)
+
+
+def transcode_video(pk):
+    """
+    Transcode one claimed video. Runs inside the worker's process pool, so it
+    only takes the primary key and reports failures on the video row.
+    """
+    video = UploadVideo.objects.get(pk=pk)
+    fields = {"transcode_status": UploadVideo.DONE, "transcode_error": ""}
+    try:
+        fields["hls_playlist"], fields["poster"] = transcode(video)
+    except Exception as error:
+        remove_renditions(video)
+        fields["transcode_status"] = UploadVideo.FAILED
+        if isinstance(error, TranscodeError):
+            fields["transcode_error"] = str(error)
+        else:
+            fields["transcode_error"] = traceback.format_exc()
+    # a re-upload while this ran has queued the video again; leave it pending
+    UploadVideo.objects.filter(pk=pk, transcode_status=UploadVideo.RUNNING).update(
+        **fields
+    )
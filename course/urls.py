@@ -60,6 +60,16 @@ urlpatterns = [
         views.handle_video_single,
         name="video_single",
     ),
+    path(
+        "course/<slug>/video_tutorials/<video_slug>/stream/",
+        views.handle_video_stream,
+        name="video_stream",
+    ),
+    path(
+        "course/<slug>/video_tutorials/<video_slug>/hls/<path:name>",
+        views.handle_video_hls,
+        name="video_hls",
+    ),
     path(
         "course/<slug>/video_tutorials/<video_slug>/edit/",
         views.handle_video_edit,
@@ -73,5 +83,10 @@ urlpatterns = [
     # course registration
     path("course/registration/", views.course_registration, name="course_registration"),
     path("course/drop/", views.course_drop, name="course_drop"),
+    path(
+        "course/registration/<int:pk>/status/",
+        views.course_registration_status,
+        name="course_registration_status",
+    ),
     path("my_courses/", views.user_course_list, name="user_course_list"),
 ]
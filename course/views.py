@@ -1,16 +1,24 @@
+import os
+from datetime import timedelta
+
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
-from django.db.models import Sum
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Sum
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils.decorators import method_decorator
+from django.utils.timezone import now
 from django.views.generic import CreateView
 from django_filters.views import FilterView
 
 from accounts.decorators import lecturer_required, student_required
 from accounts.models import Student
+from core.exports import ExportMixin
 from core.models import Semester
+from core.streaming import serve_file
 from course.filters import CourseAllocationFilter, ProgramFilter
 from course.forms import (
     CourseAddForm,
@@ -27,7 +35,13 @@ from course.models import (
     Upload,
     UploadVideo,
 )
-from result.models import TakenCourse
+from course.transcoding import HLS_CONTENT_TYPES, HLS_NAME_RE
+from result.models import RegistrationRequest, TakenCourse, WaitlistEntry
+from result.registration import (
+    enqueue_registration,
+    promote_waitlist,
+    request_status,
+)
 
 
 # ########################################################
@@ -36,9 +50,11 @@ from result.models import TakenCourse
 
 
 @method_decorator([login_required, lecturer_required], name="dispatch")
-class ProgramFilterView(FilterView):
+class ProgramFilterView(ExportMixin, FilterView):
     filterset_class = ProgramFilter
     template_name = "course/program_list.html"
+    export_filename = "programs"
+    export_fields = (("Program Name", "title"), ("Summary", "summary"))
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -216,9 +232,18 @@ class CourseAllocationFormView(CreateView):
 
 
 @method_decorator([login_required, lecturer_required], name="dispatch")
-class CourseAllocationFilterView(FilterView):
+class CourseAllocationFilterView(ExportMixin, FilterView):
     filterset_class = CourseAllocationFilter
     template_name = "course/course_allocation_view.html"
+    export_filename = "course_allocations"
+    export_fields = (
+        ("Lecturer ID", "lecturer__username"),
+        ("First Name", "lecturer__first_name"),
+        ("Last Name", "lecturer__last_name"),
+        ("Course Code", "courses__code"),
+        ("Course Title", "courses__title"),
+        ("Session", "session__session"),
+    )
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -351,6 +376,25 @@ def handle_video_single(request, slug, video_slug):
     )
 
 
+@login_required
+def handle_video_stream(request, slug, video_slug):
+    video = get_object_or_404(UploadVideo, slug=video_slug, course__slug=slug)
+    return serve_file(request, video.video.name, video.video.storage)
+
+
+@login_required
+def handle_video_hls(request, slug, video_slug, name):
+    video = get_object_or_404(UploadVideo, slug=video_slug, course__slug=slug)
+    if not video.is_transcoded or not HLS_NAME_RE.fullmatch(name):
+        raise Http404
+    return serve_file(
+        request,
+        f"{video.hls_directory}/{name}",
+        video.video.storage,
+        HLS_CONTENT_TYPES.get(os.path.splitext(name)[1]),
+    )
+
+
 @login_required
 @lecturer_required
 def handle_video_edit(request, slug, video_slug):
@@ -391,16 +435,19 @@ def handle_video_delete(request, slug, video_slug):
 @student_required
 def course_registration(request):
     if request.method == "POST":
-        student = Student.objects.get(student__pk=request.user.id)
-        ids = ()
-        data = request.POST.copy()
-        data.pop("csrfmiddlewaretoken", None)  # remove csrf_token
-        for key in data.keys():
-            ids = ids + (str(key),)
-        for s in range(0, len(ids)):
-            course = Course.objects.get(pk=ids[s])
-            obj = TakenCourse.objects.create(student=student, course=course)
-            obj.save()
+        student = get_object_or_404(Student, student__pk=request.user.id)
+        # the ticked checkboxes are named after the course pk
+        ids = [key for key in request.POST if key.isdigit()]
+        courses = Course.objects.filter(
+            pk__in=ids, program__pk=student.program_id, level=student.level
+        )
+        if settings.COURSE_REGISTRATION_QUEUE:
+            course_ids = list(courses.values_list("pk", flat=True))
+            if course_ids:
+                enqueue_registration(student, RegistrationRequest.REGISTER, course_ids)
+            messages.info(request, "Your registration has been queued.")
+            return redirect("course_registration")
+        TakenCourse.objects.register(student, courses)
         messages.success(request, "Courses registered successfully!")
         return redirect("course_registration")
     else:
@@ -409,52 +456,44 @@ def course_registration(request):
             messages.error(request, "No active semester found.")
             return render(request, "course/course_registration.html")
 
-        # student = Student.objects.get(student__pk=request.user.id)
         student = get_object_or_404(Student, student__id=request.user.id)
-        taken_courses = TakenCourse.objects.filter(student__student__id=request.user.id)
-        t = ()
-        for i in taken_courses:
-            t += (i.course.pk,)
-
-        courses = (
-            Course.objects.filter(
-                program__pk=student.program.id,
-                level=student.level,
-                semester=current_semester,
+        is_registered = Exists(
+            TakenCourse.objects.filter(student=student, course=OuterRef("pk"))
+        )
+        # seats are read from Course.enrolled_count in this same query
+        level_courses = (
+            Course.objects.filter(level=student.level)
+            .filter(Q(program__pk=student.program_id) | is_registered)
+            .annotate(
+                is_registered=is_registered,
+                is_waitlisted=Exists(
+                    WaitlistEntry.objects.filter(student=student, course=OuterRef("pk"))
+                ),
             )
-            .exclude(id__in=t)
             .order_by("year")
         )
-        all_courses = Course.objects.filter(
-            level=student.level, program__pk=student.program.id
-        )
-
-        no_course_is_registered = False  # Check if no course is registered
-        all_courses_are_registered = False
-
-        registered_courses = Course.objects.filter(level=student.level).filter(id__in=t)
-        if (
-            registered_courses.count() == 0
-        ):  # Check if number of registered courses is 0
-            no_course_is_registered = True
-
-        if registered_courses.count() == all_courses.count():
-            all_courses_are_registered = True
 
+        courses, registered_courses, all_courses = [], [], 0
         total_first_semester_credit = 0
         total_sec_semester_credit = 0
         total_registered_credit = 0
-        for i in courses:
-            if i.semester == "First":
-                total_first_semester_credit += int(i.credit)
-            if i.semester == "Second":
-                total_sec_semester_credit += int(i.credit)
-        for i in registered_courses:
-            total_registered_credit += int(i.credit)
+        for course in level_courses:
+            if course.program_id == student.program_id:
+                all_courses += 1
+            if course.is_registered:
+                registered_courses.append(course)
+                total_registered_credit += int(course.credit)
+            elif course.semester == current_semester.semester:
+                courses.append(course)
+                if course.semester == "First":
+                    total_first_semester_credit += int(course.credit)
+                if course.semester == "Second":
+                    total_sec_semester_credit += int(course.credit)
+
         context = {
             "is_calender_on": True,
-            "all_courses_are_registered": all_courses_are_registered,
-            "no_course_is_registered": no_course_is_registered,
+            "all_courses_are_registered": len(registered_courses) == all_courses,
+            "no_course_is_registered": not registered_courses,
             "current_semester": current_semester,
             "courses": courses,
             "total_first_semester_credit": total_first_semester_credit,
@@ -463,6 +502,12 @@ def course_registration(request):
             "total_registered_credit": total_registered_credit,
             "student": student,
         }
+        if settings.COURSE_REGISTRATION_QUEUE:
+            # waiting requests, and what recent ones could not register
+            recent = Q(processed_at__gte=now() - timedelta(hours=1)) & ~Q(message="")
+            context["queued_requests"] = RegistrationRequest.objects.filter(
+                Q(status=RegistrationRequest.PENDING) | recent, student=student
+            )
         return render(request, "course/course_registration.html", context)
 
 
@@ -471,15 +516,29 @@ def course_registration(request):
 def course_drop(request):
     if request.method == "POST":
         student = get_object_or_404(Student, student__pk=request.user.id)
-        course_ids = request.POST.getlist("course_ids")
-        print("course_ids", course_ids)
-        for course_id in course_ids:
-            course = get_object_or_404(Course, pk=course_id)
-            TakenCourse.objects.filter(student=student, course=course).delete()
+        course_ids = [i for i in request.POST.getlist("course_ids") if i.isdigit()]
+        if settings.COURSE_REGISTRATION_QUEUE:
+            if course_ids:
+                enqueue_registration(student, RegistrationRequest.DROP, course_ids)
+            messages.info(request, "Your drop request has been queued.")
+            return redirect("course_registration")
+        if TakenCourse.objects.drop(student, course_ids):
+            # the queue worker promotes in queued mode; here the freed seats
+            # go to the waitlists once the drop is committed
+            transaction.on_commit(lambda: promote_waitlist(course_ids=course_ids))
         messages.success(request, "Courses dropped successfully!")
         return redirect("course_registration")
 
 
+@login_required
+@student_required
+def course_registration_status(request, pk):
+    registration = get_object_or_404(
+        RegistrationRequest, pk=pk, student__student=request.user
+    )
+    return JsonResponse(request_status(registration))
+
+
 # ########################################################
 # User Course List View
 # ########################################################
@@ -8,11 +8,13 @@ from modeltranslation.forms import TranslationModelForm
 from .models import (
     Quiz,
     Progress,
+    ProgressScore,
     Question,
     MCQuestion,
     Choice,
     EssayQuestion,
     Sitting,
+    SittingAnswer,
 )
 
 
@@ -20,6 +22,11 @@ class ChoiceInline(admin.TabularInline):
     model = Choice
 
 
+class SittingAnswerInline(admin.TabularInline):
+    model = SittingAnswer
+    extra = 0
+
+
 class QuizAdminForm(TranslationModelForm):
     questions = forms.ModelMultipleChoiceField(
         queryset=Question.objects.all().select_subclasses(),
@@ -66,7 +73,7 @@ class MCQuestionAdmin(TranslationAdmin):
     list_display = ("content",)
     # list_filter = ('category',)
     fieldsets = [
-        ("figure" "quiz" "choice_order", {"fields": ("content", "explanation")})
+        ("figure" "quiz" "choice_order", {"fields": ("content", "explanation", "tag")})
     ]
 
     search_fields = ("content", "explanation")
@@ -76,10 +83,12 @@ class MCQuestionAdmin(TranslationAdmin):
 
 
 class ProgressAdmin(admin.ModelAdmin):
-    search_fields = (
-        "user",
-        "score",
-    )
+    search_fields = ("user__username",)
+
+
+class ProgressScoreAdmin(admin.ModelAdmin):
+    list_display = ("user", "quiz", "score", "possible")
+    search_fields = ("user__username", "quiz__title")
 
 
 class EssayQuestionAdmin(admin.ModelAdmin):
@@ -89,13 +98,20 @@ class EssayQuestionAdmin(admin.ModelAdmin):
         "content",
         "quiz",
         "explanation",
+        "tag",
     )
     search_fields = ("content", "explanation")
     filter_horizontal = ("quiz",)
 
 
+class SittingAdmin(admin.ModelAdmin):
+    list_display = ("user", "quiz", "current_score", "complete", "end")
+    inlines = [SittingAnswerInline]
+
+
 admin.site.register(Quiz, QuizAdmin)
 admin.site.register(MCQuestion, MCQuestionAdmin)
 admin.site.register(Progress, ProgressAdmin)
+admin.site.register(ProgressScore, ProgressScoreAdmin)
 admin.site.register(EssayQuestion, EssayQuestionAdmin)
-admin.site.register(Sitting)
+admin.site.register(Sitting, SittingAdmin)
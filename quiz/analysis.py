@@ -0,0 +1,128 @@
+import numpy as np
+
+from .models import SittingAnswer
+from .utils import get_quiz_snapshot
+
+HISTOGRAM_BINS = 10
+ANALYSIS_CHUNK_SIZE = 2000
+
+
+def response_matrix(quiz, question_ids, choice_ids):
+    """
+    Read every answer of the completed sittings of ``quiz`` in one pass.
+
+    Returns three arrays: ``correct`` and ``answered``, sittings x questions
+    0/1 matrices in the column order of ``question_ids``, and ``chosen``, the
+    column of ``choice_ids`` picked by each multiple choice answer.
+    """
+    columns = {question_id: i for i, question_id in enumerate(question_ids)}
+    choice_columns = {choice_id: i for i, choice_id in enumerate(choice_ids)}
+    rows, row_index, column_index, is_correct, chosen = {}, [], [], [], []
+
+    answers = (
+        SittingAnswer.objects.filter(sitting__quiz=quiz, sitting__complete=True)
+        .values_list("sitting_id", "question_id", "answer", "is_correct")
+        .iterator(chunk_size=ANALYSIS_CHUNK_SIZE)
+    )
+    for sitting_id, question_id, answer, correct in answers:
+        row = rows.setdefault(sitting_id, len(rows))
+        column = columns.get(question_id)
+        if column is None:
+            continue  # taken out of the quiz since
+        row_index.append(row)
+        column_index.append(column)
+        is_correct.append(correct)
+        if answer.isdigit() and int(answer) in choice_columns:
+            chosen.append(choice_columns[int(answer)])
+
+    shape = (len(rows), len(question_ids))
+    answered = np.zeros(shape, dtype=np.int8)
+    correct = np.zeros(shape, dtype=np.int8)
+    answered[row_index, column_index] = 1
+    correct[row_index, column_index] = is_correct
+    return correct, answered, np.array(chosen, dtype=np.intp)
+
+
+def point_biserial(correct, answered):
+    """
+    Correlation of each item with the rest of the score (the total without
+    that item), over the sittings that answered it. NaN where undefined.
+    """
+    totals = correct.sum(axis=1, keepdims=True)
+    rest = totals - correct
+    counts = np.maximum(answered.sum(axis=0), 1)
+    item_mean = correct.sum(axis=0) / counts
+    rest_mean = (rest * answered).sum(axis=0) / counts
+    item_dev = (correct - item_mean) * answered
+    rest_dev = (rest - rest_mean) * answered
+    covariance = (item_dev * rest_dev).sum(axis=0)
+    spread = np.sqrt((item_dev**2).sum(axis=0) * (rest_dev**2).sum(axis=0))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(spread > 0, covariance / spread, np.nan)
+
+
+def score_histogram(correct, answered, bins=HISTOGRAM_BINS):
+    asked = np.maximum(answered.sum(axis=1), 1)
+    percents = correct.sum(axis=1) * 100 / asked
+    counts, edges = np.histogram(percents, bins=bins, range=(0, 100))
+    return [
+        {"low": int(low), "high": int(high), "count": int(count)}
+        for low, high, count in zip(edges[:-1], edges[1:], counts)
+    ], percents
+
+
+def item_analysis(quiz):
+    """
+    Item statistics of ``quiz`` over its completed sittings: the difficulty
+    index (share of correct answers) and point-biserial discrimination of
+    each question, how often each choice was picked, and a histogram of the
+    sitting scores.
+    """
+    snapshot = get_quiz_snapshot(quiz)
+    questions = list(snapshot.questions.values())
+    choices = [choice for question in questions for choice in question.choices]
+    correct, answered, chosen = response_matrix(
+        quiz, [question.id for question in questions], [c.id for c in choices]
+    )
+
+    answer_counts = answered.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        difficulty = correct.sum(axis=0) / answer_counts
+    discrimination = point_biserial(correct, answered)
+    picks = np.bincount(chosen, minlength=len(choices))
+    histogram, percents = score_histogram(correct, answered)
+
+    items, offset = [], 0
+    for column, question in enumerate(questions):
+        count = int(answer_counts[column])
+        item_choices = []
+        for choice in question.choices:
+            picked = int(picks[offset])
+            offset += 1
+            item_choices.append(
+                {
+                    "choice": choice,
+                    "count": picked,
+                    "share": picked / count if count else None,
+                }
+            )
+        items.append(
+            {
+                "question": question,
+                "answered": count,
+                "difficulty": None if count == 0 else float(difficulty[column]),
+                "discrimination": (
+                    None
+                    if np.isnan(discrimination[column])
+                    else float(discrimination[column])
+                ),
+                "choices": item_choices,
+            }
+        )
+
+    return {
+        "sittings": len(percents),
+        "mean_score": float(percents.mean()) if len(percents) else None,
+        "items": items,
+        "histogram": histogram,
+    }
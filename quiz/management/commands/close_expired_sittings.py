@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quiz.models import Sitting
+
+
+class Command(BaseCommand):
+    help = "Complete the timed quiz sittings whose deadline has passed."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of sittings closed per UPDATE.",
+        )
+        parser.add_argument(
+            "--every",
+            type=float,
+            default=0,
+            help="Sweep again after this many seconds (0 sweeps once and exits).",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            closed = Sitting.objects.close_expired(options["batch_size"])
+            if closed:
+                self.stdout.write(f"Closed {closed} expired sitting(s).")
+            if not options["every"]:
+                break
+            time.sleep(options["every"])
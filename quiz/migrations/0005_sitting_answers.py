@@ -0,0 +1,150 @@
+# Generated by Django 4.0.8 on 2026-10-18 17:00
+
+import json
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def split_ids(value):
+    return [int(item) for item in (value or "").split(",") if item]
+
+
+def move_sittings_to_answer_table(apps, schema_editor):
+    Sitting = apps.get_model("quiz", "Sitting")
+    SittingAnswer = apps.get_model("quiz", "SittingAnswer")
+    Question = apps.get_model("quiz", "Question")
+    existing_questions = set(Question.objects.values_list("id", flat=True))
+
+    for sitting in Sitting.objects.iterator():
+        order = split_ids(sitting.question_order)
+        remaining = split_ids(sitting.question_list)
+        incorrect = set(split_ids(sitting.incorrect_questions))
+        try:
+            user_answers = json.loads(sitting.user_answers or "{}")
+        except ValueError:
+            user_answers = {}
+
+        positions = {question_id: i for i, question_id in enumerate(order)}
+        answers = []
+        for question_id, answer in user_answers.items():
+            question_id = int(question_id)
+            if question_id not in existing_questions:
+                continue
+            answers.append(
+                SittingAnswer(
+                    sitting=sitting,
+                    question_id=question_id,
+                    position=positions.get(question_id, len(order)),
+                    answer="" if answer is None else str(answer),
+                    is_correct=question_id not in incorrect,
+                )
+            )
+        SittingAnswer.objects.bulk_create(answers)
+
+        sitting.question_order_ids = order
+        sitting.cursor = len(order) - len(remaining)
+        sitting.save(update_fields=["question_order_ids", "cursor"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0004_alter_essayquestion_options_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sitting",
+            name="cursor",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Position in the question order of the next question.",
+                verbose_name="Cursor",
+            ),
+        ),
+        migrations.AddField(
+            model_name="sitting",
+            name="question_order_ids",
+            field=models.JSONField(default=list),
+        ),
+        migrations.CreateModel(
+            name="SittingAnswer",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("position", models.PositiveIntegerField(verbose_name="Position")),
+                ("answer", models.TextField(blank=True, verbose_name="Answer")),
+                (
+                    "is_correct",
+                    models.BooleanField(default=False, verbose_name="Correct"),
+                ),
+                (
+                    "question",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="quiz.question",
+                        verbose_name="Question",
+                    ),
+                ),
+                (
+                    "sitting",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="answers",
+                        to="quiz.sitting",
+                        verbose_name="Sitting",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Sitting answer",
+                "verbose_name_plural": "Sitting answers",
+                "ordering": ("sitting", "position"),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="sittinganswer",
+            constraint=models.UniqueConstraint(
+                fields=("sitting", "question"), name="unique_sitting_answer"
+            ),
+        ),
+        migrations.RunPython(move_sittings_to_answer_table, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="sitting",
+            name="incorrect_questions",
+        ),
+        migrations.RemoveField(
+            model_name="sitting",
+            name="question_list",
+        ),
+        migrations.RemoveField(
+            model_name="sitting",
+            name="user_answers",
+        ),
+        migrations.RemoveField(
+            model_name="sitting",
+            name="question_order",
+        ),
+        migrations.RenameField(
+            model_name="sitting",
+            old_name="question_order_ids",
+            new_name="question_order",
+        ),
+        migrations.AlterField(
+            model_name="sitting",
+            name="question_order",
+            field=models.JSONField(
+                default=list,
+                help_text="Ids of the questions in the order they are asked.",
+                verbose_name="Question Order",
+            ),
+        ),
+    ]
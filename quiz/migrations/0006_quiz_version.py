@@ -0,0 +1,22 @@
+# Generated by Django 4.0.8 on 2026-10-18 17:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0005_sitting_answers"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="quiz",
+            name="version",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Bumped whenever the quiz's questions or choices change.",
+            ),
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 4.0.8 on 2026-10-18 17:07
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def move_scores_to_table(apps, schema_editor):
+    """
+    Progress.score held "<quiz title>,<score>,<possible>," triples; titles are
+    matched back to quizzes and ambiguous or unknown titles are dropped.
+    """
+    Progress = apps.get_model("quiz", "Progress")
+    ProgressScore = apps.get_model("quiz", "ProgressScore")
+    Quiz = apps.get_model("quiz", "Quiz")
+
+    quiz_ids = {}
+    for quiz_id, title in Quiz.objects.values_list("id", "title"):
+        quiz_ids[title] = None if title in quiz_ids else quiz_id
+
+    scores = []
+    for user_id, score in Progress.objects.values_list("user_id", "score"):
+        items = (score or "").split(",")
+        for i in range(0, len(items) - 2, 3):
+            title, points, possible = items[i : i + 3]
+            quiz_id = quiz_ids.get(title)
+            if quiz_id and points.isdigit() and possible.isdigit():
+                scores.append(
+                    ProgressScore(
+                        user_id=user_id,
+                        quiz_id=quiz_id,
+                        score=int(points),
+                        possible=int(possible),
+                    )
+                )
+    ProgressScore.objects.bulk_create(scores, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("quiz", "0006_quiz_version"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProgressScore",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("score", models.PositiveIntegerField(default=0, verbose_name="Score")),
+                (
+                    "possible",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Possible Score"
+                    ),
+                ),
+                (
+                    "quiz",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="quiz.quiz",
+                        verbose_name="Quiz",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="quiz_scores",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="User",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Progress score",
+                "verbose_name_plural": "Progress scores",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="progressscore",
+            constraint=models.UniqueConstraint(
+                fields=("user", "quiz"), name="unique_progress_score"
+            ),
+        ),
+        migrations.RunPython(move_scores_to_table, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name="progress",
+            name="score",
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.0.8 on 2026-10-18 17:11
+
+from django.db import migrations, models
+import quiz.utils
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0007_progress_score"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sitting",
+            name="seed",
+            field=models.PositiveIntegerField(
+                default=quiz.utils.new_seed,
+                editable=False,
+                help_text="Fixes the random order of questions and choices.",
+                verbose_name="Seed",
+            ),
+        ),
+    ]
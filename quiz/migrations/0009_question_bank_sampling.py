@@ -0,0 +1,42 @@
+# Generated by Django 4.0.8 on 2026-10-18 17:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0008_sitting_seed"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="question",
+            name="tag",
+            field=models.CharField(
+                blank=True,
+                help_text="Topic used to stratify questions drawn for a sitting.",
+                max_length=50,
+                verbose_name="Tag",
+            ),
+        ),
+        migrations.AddField(
+            model_name="quiz",
+            name="max_questions",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Number of questions drawn from the quiz's questions on each attempt. Leave blank to ask all of them.",
+                null=True,
+                verbose_name="Max Questions",
+            ),
+        ),
+        migrations.AddField(
+            model_name="quiz",
+            name="stratified",
+            field=models.BooleanField(
+                default=False,
+                help_text="If yes, each question tag gets a proportional share of the drawn questions.",
+                verbose_name="Stratify by tag",
+            ),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.0.8 on 2026-10-18 17:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0009_question_bank_sampling"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sitting",
+            name="draft",
+            field=models.TextField(
+                blank=True,
+                help_text="Autosaved answer to the current essay question.",
+                verbose_name="Draft",
+            ),
+        ),
+    ]
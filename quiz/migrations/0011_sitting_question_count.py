@@ -0,0 +1,32 @@
+# Generated by Django 4.0.8 on 2026-10-18 17:19
+
+from django.db import migrations, models
+
+
+def count_questions(apps, schema_editor):
+    Sitting = apps.get_model("quiz", "Sitting")
+    sittings = []
+    for sitting in Sitting.objects.only("question_order").iterator():
+        sitting.question_count = len(sitting.question_order)
+        sittings.append(sitting)
+    Sitting.objects.bulk_update(sittings, ["question_count"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0010_sitting_draft"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="sitting",
+            name="question_count",
+            field=models.PositiveIntegerField(
+                default=0,
+                help_text="Number of questions in the question order.",
+                verbose_name="Question Count",
+            ),
+        ),
+        migrations.RunPython(count_questions, migrations.RunPython.noop),
+    ]
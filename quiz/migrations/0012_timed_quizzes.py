@@ -0,0 +1,39 @@
+# Generated by Django 4.0.8 on 2026-10-18 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("quiz", "0011_sitting_question_count"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="quiz",
+            name="duration",
+            field=models.PositiveIntegerField(
+                blank=True,
+                help_text="Minutes allowed for each attempt. Leave blank for no limit.",
+                null=True,
+                verbose_name="Time Limit",
+            ),
+        ),
+        migrations.AddField(
+            model_name="sitting",
+            name="deadline",
+            field=models.DateTimeField(
+                blank=True,
+                help_text="When a timed attempt closes.",
+                null=True,
+                verbose_name="Deadline",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="sitting",
+            index=models.Index(
+                fields=["complete", "deadline"], name="sitting_deadline_idx"
+            ),
+        ),
+    ]
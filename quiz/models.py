@@ -1,16 +1,33 @@
-import json
-import re
+from datetime import timedelta
+from fractions import Fraction
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.exceptions import ImproperlyConfigured, ValidationError
-from django.core.validators import (
-    MaxValueValidator,
-    validate_comma_separated_integer_list,
+from django.core.validators import MaxValueValidator
+from django.db import IntegrityError, models, transaction
+from django.db.models import (
+    Case,
+    Count,
+    Exists,
+    F,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.db.models.functions import Cast, Coalesce, Floor, Mod
+from django.db.models.signals import (
+    m2m_changed,
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
 )
-from django.db import models
-from django.db.models import Q
-from django.db.models.signals import pre_save
 from django.urls import reverse
+from django.utils.functional import cached_property
 from django.utils.timezone import now
 from django.utils.translation import gettext_lazy as _
 from django.dispatch import receiver
@@ -18,6 +35,13 @@ from model_utils.managers import InheritanceManager
 
 from course.models import Course
 from core.utils import unique_slug_generator
+from .utils import (
+    draw_question_order,
+    essay_draft_key,
+    get_quiz_snapshot,
+    new_seed,
+    shuffled,
+)
 
 CHOICE_ORDER_OPTIONS = (
     ("content", _("Content")),
@@ -32,7 +56,53 @@ CATEGORY_OPTIONS = (
 )
 
 
-class QuizManager(models.Manager):
+class QuizQuerySet(models.QuerySet):
+    def with_stats(self, user=None):
+        """
+        Annotate ``question_count`` (the question pool), ``asked_count`` (the
+        questions drawn per attempt, capped by ``max_questions``) and
+        ``attempt_count`` (completed sittings) in the same query. With
+        ``user``, attempts are that user's only and ``in_progress`` tells
+        whether they have an open sitting.
+        """
+        questions = (
+            Question.quiz.through.objects.filter(quiz=OuterRef("pk"))
+            .order_by()
+            .values("quiz")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        sittings = Sitting.objects.filter(quiz=OuterRef("pk"))
+        if user is not None:
+            sittings = sittings.filter(user=user)
+        attempts = (
+            sittings.filter(complete=True)
+            .order_by()
+            .values("quiz")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        queryset = self.annotate(
+            question_count=Coalesce(Subquery(questions), 0),
+            attempt_count=Coalesce(Subquery(attempts), 0),
+        ).annotate(
+            asked_count=Case(
+                When(
+                    max_questions__gt=0,
+                    max_questions__lt=F("question_count"),
+                    then=F("max_questions"),
+                ),
+                default=F("question_count"),
+            )
+        )
+        if user is not None:
+            queryset = queryset.annotate(
+                in_progress=Exists(sittings.filter(complete=False))
+            )
+        return queryset
+
+
+class QuizManager(models.Manager.from_queryset(QuizQuerySet)):
     def search(self, query=None):
         queryset = self.get_queryset()
         if query:
@@ -80,6 +150,28 @@ class Quiz(models.Model):
         verbose_name=_("Single Attempt"),
         help_text=_("If yes, only one attempt by a user will be permitted."),
     )
+    max_questions = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        verbose_name=_("Max Questions"),
+        help_text=_(
+            "Number of questions drawn from the quiz's questions on each attempt. "
+            "Leave blank to ask all of them."
+        ),
+    )
+    stratified = models.BooleanField(
+        default=False,
+        verbose_name=_("Stratify by tag"),
+        help_text=_(
+            "If yes, each question tag gets a proportional share of the drawn questions."
+        ),
+    )
+    duration = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        verbose_name=_("Time Limit"),
+        help_text=_("Minutes allowed for each attempt. Leave blank for no limit."),
+    )
     pass_mark = models.SmallIntegerField(
         default=50,
         verbose_name=_("Pass Mark"),
@@ -94,6 +186,11 @@ class Quiz(models.Model):
         ),
     )
     timestamp = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        help_text=_("Bumped whenever the quiz's questions or choices change."),
+    )
 
     objects = QuizManager()
 
@@ -118,11 +215,19 @@ class Quiz(models.Model):
 
     @property
     def get_max_score(self):
-        return self.get_questions().count()
+        count = self.get_questions().count()
+        if self.max_questions:
+            return min(self.max_questions, count)
+        return count
 
     def get_absolute_url(self):
         return reverse("quiz_index", kwargs={"slug": self.course.slug})
 
+    def get_deadline(self, start):
+        if not self.duration:
+            return None
+        return start + timedelta(minutes=self.duration)
+
 
 @receiver(pre_save, sender=Quiz)
 def quiz_pre_save_receiver(sender, instance, **kwargs):
@@ -132,7 +237,7 @@ def quiz_pre_save_receiver(sender, instance, **kwargs):
 
 class ProgressManager(models.Manager):
     def new_progress(self, user):
-        new_progress = self.create(user=user, score="")
+        new_progress = self.create(user=user)
         return new_progress
 
 
@@ -140,11 +245,6 @@ class Progress(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL, verbose_name=_("User"), on_delete=models.CASCADE
     )
-    score = models.CharField(
-        max_length=1024,
-        verbose_name=_("Score"),
-        validators=[validate_comma_separated_integer_list],
-    )
 
     objects = ProgressManager()
 
@@ -153,28 +253,25 @@ class Progress(models.Model):
         verbose_name_plural = _("User progress records")
 
     def list_all_cat_scores(self):
-        return {}  # Implement as needed
-
-    def update_score(self, question, score_to_add=0, possible_to_add=0):
+        """
+        {category: [correct, incorrect, percent]} over every quiz the user has
+        answered, from one grouped query.
+        """
+        categories = dict(CATEGORY_OPTIONS)
+        scores = {}
+        for row in ProgressScore.objects.category_totals(self.user_id):
+            label = categories.get(row["category"]) or _("Uncategorized")
+            score, possible = row["score"], row["possible"]
+            percent = int(round(score / possible * 100)) if possible else 0
+            scores[label] = [score, possible - score, percent]
+        return scores
+
+    def update_score(self, quiz, score_to_add=0, possible_to_add=0):
         if not isinstance(score_to_add, int) or not isinstance(possible_to_add, int):
             return _("Error"), _("Invalid score values.")
-
-        to_find = re.escape(str(question.quiz)) + r",(?P<score>\d+),(?P<possible>\d+),"
-        match = re.search(to_find, self.score, re.IGNORECASE)
-
-        if match:
-            updated_score = int(match.group("score")) + abs(score_to_add)
-            updated_possible = int(match.group("possible")) + abs(possible_to_add)
-            new_score = ",".join(
-                [str(question.quiz), str(updated_score), str(updated_possible), ""]
-            )
-            self.score = self.score.replace(match.group(), new_score)
-            self.save()
-        else:
-            self.score += ",".join(
-                [str(question.quiz), str(score_to_add), str(possible_to_add), ""]
-            )
-            self.save()
+        ProgressScore.objects.add(
+            self.user_id, quiz, abs(score_to_add), abs(possible_to_add)
+        )
 
     def show_exams(self):
         if self.user.is_superuser:
@@ -185,14 +282,67 @@ class Progress(models.Model):
             )
 
 
+class ProgressScoreManager(models.Manager):
+    def add(self, user, quiz, score=0, possible=0):
+        """Atomically add to a user's running total for ``quiz``."""
+        user_id = getattr(user, "pk", user)
+        quiz_id = getattr(quiz, "pk", quiz)
+        increments = {"score": F("score") + score, "possible": F("possible") + possible}
+        if self.filter(user_id=user_id, quiz_id=quiz_id).update(**increments):
+            return
+        try:
+            with transaction.atomic():
+                self.create(
+                    user_id=user_id, quiz_id=quiz_id, score=score, possible=possible
+                )
+        except IntegrityError:
+            # created by a concurrent answer in the meantime
+            self.filter(user_id=user_id, quiz_id=quiz_id).update(**increments)
+
+    def for_user(self, user):
+        return self.filter(user=user).select_related("quiz")
+
+    def category_totals(self, user):
+        return (
+            self.filter(user=user)
+            .values(category=F("quiz__category"))
+            .annotate(score=Sum("score"), possible=Sum("possible"))
+            .order_by("category")
+        )
+
+
+class ProgressScore(models.Model):
+    """A user's running score over every attempt at one quiz."""
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        verbose_name=_("User"),
+        on_delete=models.CASCADE,
+        related_name="quiz_scores",
+    )
+    quiz = models.ForeignKey(Quiz, verbose_name=_("Quiz"), on_delete=models.CASCADE)
+    score = models.PositiveIntegerField(default=0, verbose_name=_("Score"))
+    possible = models.PositiveIntegerField(default=0, verbose_name=_("Possible Score"))
+
+    objects = ProgressScoreManager()
+
+    class Meta:
+        verbose_name = _("Progress score")
+        verbose_name_plural = _("Progress scores")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "quiz"], name="unique_progress_score"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.quiz}: {self.score}/{self.possible}"
+
+
 class SittingManager(models.Manager):
     def new_sitting(self, user, quiz, course):
-        if quiz.random_order:
-            question_set = quiz.question_set.all().select_subclasses().order_by("?")
-        else:
-            question_set = quiz.question_set.all().select_subclasses()
-
-        question_ids = [item.id for item in question_set]
+        seed = new_seed()
+        question_ids = draw_question_order(quiz, seed)
         if not question_ids:
             raise ImproperlyConfigured(
                 _(
@@ -200,18 +350,17 @@ class SittingManager(models.Manager):
                 )
             )
 
-        questions = ",".join(map(str, question_ids)) + ","
-
         new_sitting = self.create(
             user=user,
             quiz=quiz,
             course=course,
-            question_order=questions,
-            question_list=questions,
-            incorrect_questions="",
+            question_order=question_ids,
+            question_count=len(question_ids),
+            seed=seed,
+            deadline=quiz.get_deadline(now()),
+            cursor=0,
             current_score=0,
             complete=False,
-            user_answers="{}",
         )
         return new_sitting
 
@@ -223,6 +372,7 @@ class SittingManager(models.Manager):
             return False
         try:
             sitting = self.get(user=user, quiz=quiz, course=course, complete=False)
+            sitting.quiz = quiz
         except Sitting.DoesNotExist:
             sitting = self.new_sitting(user, quiz, course)
         except Sitting.MultipleObjectsReturned:
@@ -231,100 +381,121 @@ class SittingManager(models.Manager):
             ).first()
         return sitting
 
+    def with_percent(self):
+        """
+        Annotate ``percent``, the score percentage, in SQL. It is rounded half
+        to even and clamped to 0-100 like ``Sitting.get_percent_correct``.
+        """
+        return self.alias(
+            whole_percent=Cast(
+                Floor(F("current_score") * 100.0 / F("question_count")),
+                models.IntegerField(),
+            ),
+            twice_remainder=(
+                F("current_score") * 100 - F("whole_percent") * F("question_count")
+            )
+            * 2,
+        ).annotate(
+            percent=Case(
+                When(question_count=0, then=Value(0)),
+                When(current_score__lte=0, then=Value(0)),
+                When(current_score__gte=F("question_count"), then=Value(100)),
+                When(
+                    twice_remainder__gt=F("question_count"),
+                    then=F("whole_percent") + 1,
+                ),
+                When(
+                    twice_remainder=F("question_count"),
+                    then=F("whole_percent") + Mod(F("whole_percent"), 2),
+                ),
+                default=F("whole_percent"),
+                output_field=models.IntegerField(),
+            )
+        )
 
-class Sitting(models.Model):
-    user = models.ForeignKey(
-        settings.AUTH_USER_MODEL, verbose_name=_("User"), on_delete=models.CASCADE
-    )
-    quiz = models.ForeignKey(Quiz, verbose_name=_("Quiz"), on_delete=models.CASCADE)
-    course = models.ForeignKey(
-        Course, verbose_name=_("Course"), on_delete=models.CASCADE
-    )
-    question_order = models.CharField(
-        max_length=1024,
-        verbose_name=_("Question Order"),
-        validators=[validate_comma_separated_integer_list],
-    )
-    question_list = models.CharField(
-        max_length=1024,
-        verbose_name=_("Question List"),
-        validators=[validate_comma_separated_integer_list],
-    )
-    incorrect_questions = models.CharField(
-        max_length=1024,
-        blank=True,
-        verbose_name=_("Incorrect questions"),
-        validators=[validate_comma_separated_integer_list],
-    )
-    current_score = models.IntegerField(verbose_name=_("Current Score"))
-    complete = models.BooleanField(default=False, verbose_name=_("Complete"))
-    user_answers = models.TextField(
-        blank=True, default="{}", verbose_name=_("User Answers")
-    )
-    start = models.DateTimeField(auto_now_add=True, verbose_name=_("Start"))
-    end = models.DateTimeField(null=True, blank=True, verbose_name=_("End"))
+    def close_expired(self, batch_size=500):
+        """
+        Complete the open sittings whose deadline has passed, ``batch_size``
+        rows per UPDATE, ending them at their deadline. Returns the number of
+        sittings closed.
+        """
+        closed = 0
+        while True:
+            batch = list(
+                self.filter(complete=False, deadline__lte=now())
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not batch:
+                return closed
+            closed += self.filter(pk__in=batch, complete=False).update(
+                complete=True, end=F("deadline")
+            )
 
-    objects = SittingManager()
+    def recompute_scores(self, sitting_ids):
+        """Set the score of each sitting to its number of correct answers."""
+        correct = (
+            SittingAnswer.objects.filter(sitting=OuterRef("pk"), is_correct=True)
+            .order_by()
+            .values("sitting")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        return self.filter(pk__in=sitting_ids).update(
+            current_score=Coalesce(Subquery(correct), 0)
+        )
 
-    class Meta:
-        permissions = (("view_sittings", _("Can see completed exams.")),)
 
-    def get_first_question(self):
-        if not self.question_list:
-            return False
-        first_question_id = int(self.question_list.split(",", 1)[0])
-        return Question.objects.get_subclass(id=first_question_id)
+class SittingStateMixin:
+    """
+    The read side of a sitting, shared by Sitting and the cached
+    PracticeSitting. Needs ``quiz``, ``question_order``, ``question_count``,
+    ``cursor``, ``current_score``, ``seed``, ``deadline`` and an
+    ``answer_map``.
+    """
 
-    def remove_first_question(self):
-        if not self.question_list:
-            return
-        _, remaining_questions = self.question_list.split(",", 1)
-        self.question_list = remaining_questions
-        self.save()
+    @property
+    def is_expired(self):
+        return self.deadline is not None and now() >= self.deadline
 
-    def add_to_score(self, points):
-        self.current_score += int(points)
-        self.save()
+    @property
+    def current_question_id(self):
+        if self.cursor >= len(self.question_order):
+            return None
+        return self.question_order[self.cursor]
+
+    @cached_property
+    def snapshot(self):
+        return get_quiz_snapshot(self.quiz)
+
+    def get_first_question(self):
+        question_id = self.current_question_id
+        if question_id is None:
+            return False
+        return self.snapshot.get_question(question_id).with_seed(self.seed)
 
     @property
     def get_current_score(self):
         return self.current_score
 
     def _question_ids(self):
-        return [int(q) for q in self.question_order.split(",") if q]
+        return self.question_order
 
     @property
     def get_percent_correct(self):
-        total_questions = len(self._question_ids())
+        total_questions = self.question_count
         if total_questions == 0:
             return 0
-        percent = (self.current_score / total_questions) * 100
-        return min(max(int(round(percent)), 0), 100)
-
-    def mark_quiz_complete(self):
-        self.complete = True
-        self.end = now()
-        self.save()
-
-    def add_incorrect_question(self, question):
-        incorrect_ids = self.get_incorrect_questions
-        incorrect_ids.append(question.id)
-        self.incorrect_questions = ",".join(map(str, incorrect_ids)) + ","
-        if self.complete:
-            self.add_to_score(-1)
-        self.save()
+        percent = round(Fraction(self.current_score * 100, total_questions))
+        return min(max(percent, 0), 100)
 
     @property
     def get_incorrect_questions(self):
-        return [int(q) for q in self.incorrect_questions.split(",") if q]
-
-    def remove_incorrect_question(self, question):
-        incorrect_ids = self.get_incorrect_questions
-        if question.id in incorrect_ids:
-            incorrect_ids.remove(question.id)
-            self.incorrect_questions = ",".join(map(str, incorrect_ids)) + ","
-            self.add_to_score(1)
-            self.save()
+        return [
+            question_id
+            for question_id, (_answer, is_correct) in self.answer_map.items()
+            if not is_correct
+        ]
 
     @property
     def check_if_passed(self):
@@ -337,22 +508,18 @@ class Sitting(models.Model):
         else:
             return _("You failed this quiz, try again.")
 
-    def add_user_answer(self, question, guess):
-        user_answers = json.loads(self.user_answers)
-        user_answers[str(question.id)] = guess
-        self.user_answers = json.dumps(user_answers)
-        self.save()
-
     def get_questions(self, with_answers=False):
-        question_ids = self._question_ids()
-        questions = sorted(
-            self.quiz.question_set.filter(id__in=question_ids).select_subclasses(),
-            key=lambda q: question_ids.index(q.id),
-        )
+        questions = self.snapshot.questions
+        questions = [
+            questions[question_id].with_seed(self.seed)
+            for question_id in self._question_ids()
+            if question_id in questions
+        ]
         if with_answers:
-            user_answers = json.loads(self.user_answers)
-            for question in questions:
-                question.user_answer = user_answers.get(str(question.id))
+            questions = [
+                question.with_answer(self.answer_map.get(question.id, (None,))[0])
+                for question in questions
+            ]
         return questions
 
     @property
@@ -361,14 +528,200 @@ class Sitting(models.Model):
 
     @property
     def get_max_score(self):
-        return len(self._question_ids())
+        return self.question_count
 
     def progress(self):
-        answered = len(json.loads(self.user_answers))
+        answered = self.cursor
         total = self.get_max_score
         return answered, total
 
 
+class Sitting(SittingStateMixin, models.Model):
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, verbose_name=_("User"), on_delete=models.CASCADE
+    )
+    quiz = models.ForeignKey(Quiz, verbose_name=_("Quiz"), on_delete=models.CASCADE)
+    course = models.ForeignKey(
+        Course, verbose_name=_("Course"), on_delete=models.CASCADE
+    )
+    question_order = models.JSONField(
+        default=list,
+        verbose_name=_("Question Order"),
+        help_text=_("Ids of the questions in the order they are asked."),
+    )
+    question_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Question Count"),
+        help_text=_("Number of questions in the question order."),
+    )
+    cursor = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Cursor"),
+        help_text=_("Position in the question order of the next question."),
+    )
+    seed = models.PositiveIntegerField(
+        default=new_seed,
+        editable=False,
+        verbose_name=_("Seed"),
+        help_text=_("Fixes the random order of questions and choices."),
+    )
+    draft = models.TextField(
+        blank=True,
+        verbose_name=_("Draft"),
+        help_text=_("Autosaved answer to the current essay question."),
+    )
+    current_score = models.IntegerField(verbose_name=_("Current Score"))
+    complete = models.BooleanField(default=False, verbose_name=_("Complete"))
+    start = models.DateTimeField(auto_now_add=True, verbose_name=_("Start"))
+    end = models.DateTimeField(null=True, blank=True, verbose_name=_("End"))
+    deadline = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name=_("Deadline"),
+        help_text=_("When a timed attempt closes."),
+    )
+
+    objects = SittingManager()
+
+    scores_each_answer = True
+
+    class Meta:
+        permissions = (("view_sittings", _("Can see completed exams.")),)
+        indexes = [
+            models.Index(fields=["complete", "deadline"], name="sitting_deadline_idx")
+        ]
+
+    def record_answer(self, question, guess, is_correct):
+        """
+        Store the answer to the current question and move on to the next one,
+        completing the sitting after the last question.
+
+        The sitting row is written once, guarded on the cursor so a repeated
+        submission of the same question is ignored; returns False in that case.
+        """
+        position = self.cursor
+        self.cursor += 1
+        if is_correct:
+            self.current_score += 1
+        self.draft = ""
+        fields = ["cursor", "current_score", "draft"]
+        if self.cursor >= len(self.question_order):
+            self.complete = True
+            self.end = now()
+            fields += ["complete", "end"]
+
+        with transaction.atomic(savepoint=False):
+            updated = Sitting.objects.filter(pk=self.pk, cursor=position).update(
+                **{field: getattr(self, field) for field in fields}
+            )
+            if not updated:
+                self.refresh_from_db(fields=fields)
+                return False
+            SittingAnswer.objects.create(
+                sitting=self,
+                question_id=question.id,
+                position=position,
+                answer=guess,
+                is_correct=is_correct,
+            )
+        cache.delete(essay_draft_key(self.pk))
+        self.__dict__.pop("answer_map", None)
+        return True
+
+    def add_to_score(self, points):
+        self.current_score += int(points)
+        self.save(update_fields=["current_score"])
+
+    def mark_quiz_complete(self):
+        self.complete = True
+        self.end = now()
+        self.save(update_fields=["complete", "end"])
+
+    @cached_property
+    def answer_map(self):
+        """{question id: (answer, is_correct)} for the answered questions."""
+        return {
+            question_id: (answer, is_correct)
+            for question_id, answer, is_correct in self.answers.values_list(
+                "question_id", "answer", "is_correct"
+            )
+        }
+
+    def set_answer_correct(self, question, is_correct):
+        updated = self.answers.filter(
+            question_id=question.id, is_correct=not is_correct
+        ).update(is_correct=is_correct)
+        self.__dict__.pop("answer_map", None)
+        return updated
+
+    def add_incorrect_question(self, question):
+        if self.set_answer_correct(question, False) and self.complete:
+            self.add_to_score(-1)
+
+    def remove_incorrect_question(self, question):
+        if self.set_answer_correct(question, True):
+            self.add_to_score(1)
+
+
+class SittingAnswerManager(models.Manager):
+    def apply_verdicts(self, verdicts, **lookups):
+        """
+        Mark answers of completed sittings correct or incorrect in one
+        transaction. ``verdicts`` maps SittingAnswer ids to booleans, limited
+        to the answers matching ``lookups``; the score of every sitting with a
+        changed answer is recomputed once. Returns the number of answers that
+        changed.
+        """
+        with transaction.atomic():
+            changed = {True: [], False: []}
+            sitting_ids = set()
+            answers = (
+                self.select_for_update()
+                .filter(pk__in=verdicts, sitting__complete=True, **lookups)
+                .values_list("pk", "sitting_id", "is_correct")
+            )
+            for pk, sitting_id, is_correct in answers:
+                if verdicts[pk] != is_correct:
+                    changed[verdicts[pk]].append(pk)
+                    sitting_ids.add(sitting_id)
+            for is_correct, pks in changed.items():
+                if pks:
+                    self.filter(pk__in=pks).update(is_correct=is_correct)
+            if sitting_ids:
+                Sitting.objects.recompute_scores(sitting_ids)
+        return len(changed[True]) + len(changed[False])
+
+
+class SittingAnswer(models.Model):
+    sitting = models.ForeignKey(
+        Sitting,
+        verbose_name=_("Sitting"),
+        on_delete=models.CASCADE,
+        related_name="answers",
+    )
+    question = models.ForeignKey(
+        "Question", verbose_name=_("Question"), on_delete=models.CASCADE
+    )
+    position = models.PositiveIntegerField(verbose_name=_("Position"))
+    answer = models.TextField(blank=True, verbose_name=_("Answer"))
+    is_correct = models.BooleanField(default=False, verbose_name=_("Correct"))
+
+    objects = SittingAnswerManager()
+
+    class Meta:
+        verbose_name = _("Sitting answer")
+        verbose_name_plural = _("Sitting answers")
+        ordering = ("sitting", "position")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["sitting", "question"], name="unique_sitting_answer"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.sitting_id}: {self.question_id}"
+
+
 class Question(models.Model):
     quiz = models.ManyToManyField(Quiz, verbose_name=_("Quiz"), blank=True)
     figure = models.ImageField(
@@ -388,6 +741,12 @@ class Question(models.Model):
         help_text=_("Explanation to be shown after the question has been answered."),
         verbose_name=_("Explanation"),
     )
+    tag = models.CharField(
+        max_length=50,
+        blank=True,
+        help_text=_("Topic used to stratify questions drawn for a sitting."),
+        verbose_name=_("Tag"),
+    )
 
     objects = InheritanceManager()
 
@@ -421,19 +780,21 @@ class MCQuestion(Question):
         except (Choice.DoesNotExist, ValueError):
             return False
 
-    def order_choices(self, queryset):
+    def order_choices(self, queryset, seed=None):
         if self.choice_order == "content":
             return queryset.order_by("choice_text")
         elif self.choice_order == "random":
-            return queryset.order_by("?")
+            if seed is None:
+                seed = new_seed()
+            return shuffled(queryset, f"{seed}:{self.id}")
         else:
             return queryset
 
-    def get_choices(self):
-        return self.order_choices(Choice.objects.filter(question=self))
+    def get_choices(self, seed=None):
+        return self.order_choices(Choice.objects.filter(question=self), seed)
 
-    def get_choices_list(self):
-        return [(choice.id, choice.choice_text) for choice in self.get_choices()]
+    def get_choices_list(self, seed=None):
+        return [(choice.id, choice.choice_text) for choice in self.get_choices(seed)]
 
     def answer_choice_to_string(self, guess):
         try:
@@ -481,3 +842,42 @@ class EssayQuestion(Question):
 
     def answer_choice_to_string(self, guess):
         return str(guess)
+
+
+def bump_quiz_versions(quizzes):
+    """Retire the cached snapshots of ``quizzes`` (a queryset or ids)."""
+    Quiz.objects.filter(pk__in=quizzes).update(version=F("version") + 1)
+
+
+def quiz_ids_of_question(question_id):
+    return Question.quiz.through.objects.filter(question_id=question_id).values(
+        "quiz_id"
+    )
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_save, sender=MCQuestion)
+@receiver(post_save, sender=EssayQuestion)
+@receiver(pre_delete, sender=Question)
+@receiver(pre_delete, sender=MCQuestion)
+@receiver(pre_delete, sender=EssayQuestion)
+def question_changed_receiver(sender, instance, **kwargs):
+    bump_quiz_versions(quiz_ids_of_question(instance.pk))
+
+
+@receiver(post_save, sender=Choice)
+@receiver(post_delete, sender=Choice)
+def choice_changed_receiver(sender, instance, **kwargs):
+    bump_quiz_versions(quiz_ids_of_question(instance.question_id))
+
+
+@receiver(m2m_changed, sender=Question.quiz.through)
+def question_quizzes_changed_receiver(sender, instance, action, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "pre_clear"):
+        return
+    if isinstance(instance, Quiz):
+        bump_quiz_versions([instance.pk])
+    elif pk_set:
+        bump_quiz_versions(pk_set)
+    else:
+        bump_quiz_versions(quiz_ids_of_question(instance.pk))
@@ -0,0 +1,95 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.timezone import now
+
+from .models import ProgressScore, SittingStateMixin
+from .utils import draw_question_order, new_seed
+
+PRACTICE_SITTING_TIMEOUT = 60 * 60 * 24
+
+
+def uses_practice_sitting(quiz):
+    return settings.QUIZ_PRACTICE_SITTINGS_IN_CACHE and not quiz.exam_paper
+
+
+class PracticeSitting(SittingStateMixin):
+    """
+    An attempt at a quiz that is not an exam paper, kept in the cache rather
+    than the database. Nothing is written until the last answer, when the
+    final score is added to the user's ProgressScore in one update.
+    """
+
+    pk = None
+    draft = ""
+    # the answers reach Progress with the final summary, not one by one
+    scores_each_answer = False
+
+    def __init__(self, user, quiz, course, question_order, seed, **state):
+        self.user = user
+        self.quiz = quiz
+        self.course = course
+        self.question_order = question_order
+        self.question_count = len(question_order)
+        self.seed = seed
+        if "deadline" in state:
+            self.deadline = state["deadline"]
+        else:
+            self.deadline = quiz.get_deadline(now())
+        self.cursor = state.get("cursor", 0)
+        self.current_score = state.get("current_score", 0)
+        self.answer_map = state.get("answer_map", {})
+        self.complete = False
+        self.end = None
+
+    @classmethod
+    def user_sitting(cls, user, quiz, course):
+        state = cache.get(cls.cache_key(user.pk, quiz.pk, course.pk))
+        if state is None:
+            seed = new_seed()
+            return cls(user, quiz, course, draw_question_order(quiz, seed), seed)
+        return cls(user, quiz, course, **state)
+
+    @staticmethod
+    def cache_key(user_id, quiz_id, course_id):
+        return f"practice_sitting:{user_id}:{quiz_id}:{course_id}"
+
+    @property
+    def key(self):
+        return self.cache_key(self.user.pk, self.quiz.pk, self.course.pk)
+
+    def save(self):
+        state = {
+            "question_order": self.question_order,
+            "seed": self.seed,
+            "deadline": self.deadline,
+            "cursor": self.cursor,
+            "current_score": self.current_score,
+            "answer_map": self.answer_map,
+        }
+        cache.set(self.key, state, PRACTICE_SITTING_TIMEOUT)
+
+    def delete(self):
+        cache.delete(self.key)
+
+    def record_answer(self, question, guess, is_correct):
+        if question.id != self.current_question_id:
+            return False
+        self.answer_map[question.id] = (guess, is_correct)
+        self.cursor += 1
+        if is_correct:
+            self.current_score += 1
+        if self.cursor >= len(self.question_order):
+            self.mark_quiz_complete()
+        else:
+            self.save()
+        return True
+
+    def mark_quiz_complete(self):
+        if self.complete:
+            return
+        self.complete = True
+        self.end = now()
+        ProgressScore.objects.add(
+            self.user, self.quiz, self.current_score, self.question_count
+        )
+        self.delete()
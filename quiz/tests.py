@@ -1,3 +1,622 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from course.models import Course, Program
+from .models import (
+    Choice,
+    EssayQuestion,
+    MCQuestion,
+    Progress,
+    ProgressScore,
+    Quiz,
+    Sitting,
+    SittingAnswer,
+)
+from .analysis import item_analysis
+from .views import QuizMarkingList
+from .utils import (
+    LOCAL_SNAPSHOTS,
+    essay_draft_key,
+    get_essay_draft,
+    get_quiz_snapshot,
+    shuffled,
+)
+
+User = get_user_model()
+
+
+class QuizTestCase(TestCase):
+    def setUp(self):
+        # snapshots are keyed on quiz pk and version, which repeat across tests
+        cache.clear()
+        LOCAL_SNAPSHOTS.clear()
+        program = Program.objects.create(title="Mathematics")
+        self.course = Course.objects.create(
+            title="Calculus",
+            code="MA101",
+            credit=3,
+            program=program,
+            level="Bachelor",
+            semester="First",
+        )
+        self.quiz = Quiz.objects.create(
+            course=self.course, title="Limits", category="exam", exam_paper=True
+        )
+        self.user = User.objects.create_user(username="taker", password="pw")
+        self.user.is_student = True
+        self.user.save()
+
+    def add_mc_question(self, content, quiz=None):
+        quiz = quiz or self.quiz
+        question = MCQuestion.objects.create(content=content)
+        question.quiz.add(quiz)
+        right = Choice.objects.create(
+            question=question, choice_text="yes", correct=True
+        )
+        wrong = Choice.objects.create(question=question, choice_text="no")
+        quiz.refresh_from_db(fields=["version"])
+        return question, right, wrong
+
+    def add_essay_question(self, content, quiz=None):
+        quiz = quiz or self.quiz
+        question = EssayQuestion.objects.create(content=content)
+        question.quiz.add(quiz)
+        quiz.refresh_from_db(fields=["version"])
+        return question
+
+
+class QuizSnapshotTests(QuizTestCase):
+    def snapshot(self):
+        self.quiz.refresh_from_db()
+        return get_quiz_snapshot(self.quiz)
+
+    def test_snapshot_is_built_once_per_version(self):
+        question, right, wrong = self.add_mc_question("Is 3 prime?")
+        essay = self.add_essay_question("Why?")
+        snapshot = self.snapshot()
+
+        with self.assertNumQueries(0):
+            self.assertIs(get_quiz_snapshot(self.quiz), snapshot)
+        LOCAL_SNAPSHOTS.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(get_quiz_snapshot(self.quiz), snapshot)
+
+        mc = snapshot.get_question(question.pk)
+        self.assertTrue(mc.check_if_correct(str(right.pk)))
+        self.assertFalse(mc.check_if_correct(str(wrong.pk)))
+        self.assertFalse(mc.check_if_correct("nonsense"))
+        self.assertEqual(mc.answer_choice_to_string(str(wrong.pk)), "no")
+        self.assertTrue(snapshot.get_question(essay.pk).is_essay)
+
+    def test_edits_invalidate_the_snapshot(self):
+        question, right, _ = self.add_mc_question("Is 4 prime?")
+        before = self.snapshot()
+
+        right.choice_text = "definitely"
+        right.save()
+        after = self.snapshot()
+        self.assertGreater(after.version, before.version)
+        self.assertEqual(
+            after.get_question(question.pk).choices[0].choice_text, "definitely"
+        )
+
+        added = self.add_essay_question("Prove it.")
+        self.assertIn(added.pk, self.snapshot().questions)
+        self.quiz.question_set.remove(added)
+        self.assertNotIn(added.pk, self.snapshot().questions)
+        question.delete()
+        self.assertEqual(self.snapshot().questions, {})
+
+
+class QuizStatsTests(QuizTestCase):
+    def test_with_stats_counts_questions_and_attempts(self):
+        first, _, _ = self.add_mc_question("0 < 1?")
+        self.add_mc_question("1 < 0?")
+        other = User.objects.create_user(username="other", password="pw")
+        done = Sitting.objects.new_sitting(other, self.quiz, self.course)
+        done.mark_quiz_complete()
+        Sitting.objects.new_sitting(self.user, self.quiz, self.course)
+        Quiz.objects.create(course=self.course, title="Series", category="practice")
+        drawn = Quiz.objects.create(
+            course=self.course, title="Sequences", category="practice", max_questions=1
+        )
+        self.add_mc_question("2 < 3?", quiz=drawn)
+        self.add_mc_question("3 < 2?", quiz=drawn)
+
+        with self.assertNumQueries(1):
+            quizzes = {q.title: q for q in Quiz.objects.with_stats()}
+        self.assertEqual(quizzes["Limits"].question_count, 2)
+        self.assertEqual(quizzes["Limits"].asked_count, 2)
+        self.assertEqual(quizzes["Limits"].attempt_count, 1)
+        self.assertEqual(quizzes["Series"].question_count, 0)
+        self.assertEqual(quizzes["Sequences"].question_count, 2)
+        self.assertEqual(quizzes["Sequences"].asked_count, 1)
+
+        with self.assertNumQueries(1):
+            quizzes = {q.title: q for q in Quiz.objects.with_stats(self.user)}
+        self.assertEqual(quizzes["Limits"].attempt_count, 0)
+        self.assertTrue(quizzes["Limits"].in_progress)
+        self.assertFalse(quizzes["Series"].in_progress)
+
+
+class ProgressScoreTests(QuizTestCase):
+    def test_scores_accumulate_per_quiz_and_category(self):
+        practice = Quiz.objects.create(
+            course=self.course, title="Limits", category="practice"
+        )
+        ProgressScore.objects.add(self.user, self.quiz, 1, 1)
+        ProgressScore.objects.add(self.user, self.quiz, 0, 1)
+        ProgressScore.objects.add(self.user, practice, 3, 4)
+
+        score = ProgressScore.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual((score.score, score.possible), (1, 2))
+
+        progress = Progress.objects.new_progress(self.user)
+        with self.assertNumQueries(1):
+            scores = progress.list_all_cat_scores()
+        self.assertEqual(scores, {"Exam": [1, 1, 50], "Practice Quiz": [3, 1, 75]})
+
+
+class SittingTests(QuizTestCase):
+    def test_answers_move_the_cursor_and_score(self):
+        first, right, _ = self.add_mc_question("1 + 1 = 2?")
+        essay = self.add_essay_question("Explain limits.")
+        sitting = Sitting.objects.new_sitting(self.user, self.quiz, self.course)
+        self.assertEqual(sitting.question_order, [first.pk, essay.pk])
+
+        with self.assertNumQueries(2):
+            sitting.record_answer(first, str(right.pk), True)
+        sitting.record_answer(essay, "They approach.", False)
+        self.assertTrue(sitting.complete)
+
+        sitting.refresh_from_db()
+        self.assertTrue(sitting.complete)
+        self.assertEqual(sitting.progress(), (2, 2))
+        self.assertFalse(sitting.get_first_question())
+        self.assertEqual(sitting.current_score, 1)
+        self.assertEqual(sitting.get_incorrect_questions, [essay.pk])
+        answers = [q.user_answer for q in sitting.get_questions(with_answers=True)]
+        self.assertEqual(answers, [str(right.pk), "They approach."])
+
+    def test_repeated_submission_is_ignored(self):
+        question, right, _ = self.add_mc_question("2 > 1?")
+        self.add_mc_question("1 > 2?")
+        sitting = Sitting.objects.new_sitting(self.user, self.quiz, self.course)
+        stale = Sitting.objects.get(pk=sitting.pk)
+
+        self.assertTrue(sitting.record_answer(question, str(right.pk), True))
+        self.assertFalse(stale.record_answer(question, str(right.pk), True))
+
+        self.assertEqual(stale.cursor, 1)
+        self.assertEqual(stale.current_score, 1)
+        self.assertEqual(sitting.answers.count(), 1)
+
+    def test_marking_toggles_correctness(self):
+        question = self.add_essay_question("Define continuity.")
+        sitting = Sitting.objects.new_sitting(self.user, self.quiz, self.course)
+        sitting.record_answer(question, "No jumps.", False)
+        sitting.mark_quiz_complete()
+
+        sitting.remove_incorrect_question(question)
+        self.assertEqual(sitting.current_score, 1)
+        self.assertEqual(sitting.get_incorrect_questions, [])
+        sitting.remove_incorrect_question(question)
+        self.assertEqual(sitting.current_score, 1)
+
+        sitting.add_incorrect_question(question)
+        sitting.refresh_from_db()
+        self.assertEqual(sitting.current_score, 0)
+        self.assertEqual(sitting.get_incorrect_questions, [question.pk])
+
+    def test_random_order_is_fixed_by_the_seed(self):
+        self.quiz.random_order = True
+        self.quiz.save()
+        questions = [self.add_mc_question(f"Is {i} odd?")[0] for i in range(12)]
+        for question in questions:
+            question.choice_order = "random"
+            question.save()
+            for i in range(4):
+                Choice.objects.create(question=question, choice_text=f"c{i}")
+        self.quiz.refresh_from_db()
+
+        with CaptureQueriesContext(connection) as queries:
+            sitting = Sitting.objects.new_sitting(self.user, self.quiz, self.course)
+        self.assertFalse(any("RANDOM" in q["sql"].upper() for q in queries))
+        self.assertCountEqual(sitting.question_order, [q.pk for q in questions])
+        self.assertEqual(
+            sitting.question_order,
+            shuffled([q.pk for q in questions], sitting.seed),
+        )
+
+        reloaded = Sitting.objects.get(pk=sitting.pk)
+        first = sitting.get_first_question().get_choices()
+        self.assertEqual(reloaded.get_first_question().get_choices(), first)
+        self.assertEqual(
+            [c.id for c in first],
+            [c.id for c in reloaded.get_questions()[0].get_choices()],
+        )
+        model_choices = questions[0].get_choices(seed=sitting.seed)
+        self.assertEqual(model_choices, questions[0].get_choices(seed=sitting.seed))
+
+    def test_sitting_draws_max_questions_from_the_bank(self):
+        for i in range(30):
+            question = self.add_essay_question(f"Question {i}")
+            question.tag = "algebra" if i < 20 else "geometry"
+            question.save()
+        self.quiz.refresh_from_db()
+        self.quiz.max_questions = 5
+        self.quiz.stratified = True
+        self.quiz.save()
+        get_quiz_snapshot(self.quiz)
+
+        with self.assertNumQueries(1):
+            sitting = Sitting.objects.new_sitting(self.user, self.quiz, self.course)
+
+        drawn = sitting.get_questions()
+        self.assertEqual(sitting.get_max_score, 5)
+        self.assertEqual(sitting.question_order, sorted(sitting.question_order))
+        tags = sorted(question.tag for question in drawn)
+        self.assertEqual(tags, ["algebra"] * 3 + ["geometry"] * 2)
+        self.assertEqual(self.quiz.get_max_score, 5)
+
+    def test_sweeper_closes_expired_sittings_in_batches(self):
+        self.quiz.duration = 5
+        self.quiz.save()
+        self.add_essay_question("Explain epsilon-delta.")
+        sittings = []
+        for i in range(5):
+            taker = User.objects.create_user(username=f"late{i}", password="pw")
+            sittings.append(Sitting.objects.new_sitting(taker, self.quiz, self.course))
+        past = timezone.now() - timedelta(minutes=1)
+        Sitting.objects.filter(pk__in=[s.pk for s in sittings[:3]]).update(
+            deadline=past
+        )
+
+        with CaptureQueriesContext(connection) as queries:
+            call_command("close_expired_sittings", batch_size=2, stdout=StringIO())
+
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 2)
+        closed = Sitting.objects.filter(complete=True)
+        self.assertEqual(closed.count(), 3)
+        self.assertEqual({s.end for s in closed}, {past})
+
+    def test_sql_percent_matches_get_percent_correct(self):
+        self.add_essay_question("Explain epsilon-delta.")
+        sitting = Sitting.objects.new_sitting(self.user, self.quiz, self.course)
+        percents = []
+        for score, count in [(1, 8), (3, 8), (23, 40), (2, 3), (0, 0), (5, 4), (-1, 4)]:
+            Sitting.objects.filter(pk=sitting.pk).update(
+                current_score=score, question_count=count
+            )
+            sitting = Sitting.objects.with_percent().get(pk=sitting.pk)
+            percents.append((sitting.percent, sitting.get_percent_correct))
+        # halves round to even, like Python's round()
+        expected = [12, 38, 58, 67, 0, 100, 0]
+        self.assertEqual(percents, list(zip(expected, expected)))
+
+    def test_no_question_count_ceiling(self):
+        for i in range(300):
+            self.add_essay_question(f"Question {i}")
+        sitting = Sitting.objects.new_sitting(self.user, self.quiz, self.course)
+        sitting.refresh_from_db()
+        self.assertEqual(len(sitting.question_order), 300)
+
+
+class ItemAnalysisTests(QuizTestCase):
+    def setUp(self):
+        super().setUp()
+        self.first, self.first_right, self.first_wrong = self.add_mc_question("0 < 1?")
+        self.second, self.second_right, self.second_wrong = self.add_mc_question(
+            "1 < 0?"
+        )
+
+    def take(self, username, first_correct, second_correct):
+        user = User.objects.create_user(username=username, password="pw")
+        sitting = Sitting.objects.new_sitting(user, self.quiz, self.course)
+        for question, right, wrong, correct in (
+            (self.first, self.first_right, self.first_wrong, first_correct),
+            (self.second, self.second_right, self.second_wrong, second_correct),
+        ):
+            if correct is not None:
+                choice = right if correct else wrong
+                sitting.record_answer(question, str(choice.pk), correct)
+        return sitting
+
+    def test_statistics_over_completed_sittings(self):
+        self.take("a", True, True)
+        self.take("b", True, False)
+        self.take("c", False, False)
+        self.take("d", True, True)
+        self.take("unfinished", False, None)
+
+        analysis = item_analysis(self.quiz)
+
+        self.assertEqual(analysis["sittings"], 4)
+        self.assertAlmostEqual(analysis["mean_score"], 62.5)
+        first, second = analysis["items"]
+        self.assertEqual(first["answered"], 4)
+        self.assertAlmostEqual(first["difficulty"], 0.75)
+        self.assertAlmostEqual(second["difficulty"], 0.5)
+        self.assertAlmostEqual(first["discrimination"], 0.57735, places=4)
+        self.assertAlmostEqual(second["discrimination"], 0.57735, places=4)
+        picks = [(row["choice"].id, row["count"]) for row in first["choices"]]
+        self.assertEqual(picks, [(self.first_right.pk, 3), (self.first_wrong.pk, 1)])
+        counts = [bin["count"] for bin in analysis["histogram"]]
+        self.assertEqual(counts, [1, 0, 0, 0, 0, 1, 0, 0, 0, 2])
+
+    def test_undefined_statistics_are_none(self):
+        self.take("a", True, True)
+        self.add_essay_question("Added later")
+        self.quiz.refresh_from_db()
+
+        analysis = item_analysis(self.quiz)
+
+        self.assertEqual(analysis["sittings"], 1)
+        self.assertIsNone(analysis["items"][0]["discrimination"])
+        later = analysis["items"][2]
+        self.assertEqual((later["answered"], later["difficulty"]), (0, None))
+        self.assertEqual(later["choices"], [])
+
+    @override_settings(
+        LANGUAGE_CODE="en",
+        STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    )
+    def test_lecturers_see_the_report(self):
+        self.take("a", True, False)
+        lecturer = User.objects.create_superuser(username="lecturer", password="pw")
+        self.client.force_login(lecturer)
+
+        response = self.client.get(
+            reverse("quiz_item_analysis", args=[self.course.slug, self.quiz.pk])
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "1 &lt; 0?")
+        self.assertEqual(response.context["analysis"]["sittings"], 1)
+
+
+@override_settings(
+    LANGUAGE_CODE="en",
+    STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+)
+class QuizTakeTests(QuizTestCase):
+    def take_url(self):
+        return reverse("quiz_take", args=[self.course.pk, self.quiz.slug])
+
+    def test_taking_a_quiz_records_every_answer(self):
+        first, right, _ = self.add_mc_question("Is 0 even?")
+        second, _, wrong = self.add_mc_question("Is 1 even?")
+        self.client.force_login(self.user)
+
+        response = self.client.get(self.take_url())
+        self.assertEqual(response.context["question"].id, first.pk)
+        self.client.post(self.take_url(), {"answers": right.pk})
+        response = self.client.post(self.take_url(), {"answers": wrong.pk})
+
+        self.assertTemplateUsed(response, "quiz/result.html")
+        self.assertEqual(response.context["score"], 1)
+        sitting = Sitting.objects.get(user=self.user)
+        self.assertTrue(sitting.complete)
+        self.assertEqual(sitting.get_incorrect_questions, [second.pk])
+        score = ProgressScore.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual((score.score, score.possible), (1, 2))
+
+        response = self.client.get(reverse("quiz_progress"))
+        self.assertEqual(response.context["cat_scores"], {"Exam": [1, 1, 50]})
+
+    def test_essay_drafts_are_coalesced_and_restored(self):
+        first = self.add_essay_question("Define a limit.")
+        second = self.add_essay_question("Define continuity.")
+        self.client.force_login(self.user)
+        self.client.get(self.take_url())
+        sitting = Sitting.objects.get(user=self.user)
+        url = reverse("quiz_essay_autosave", args=[sitting.pk])
+
+        def autosave(question, text):
+            return self.client.post(
+                url,
+                {"question": question.pk, "text": text},
+                content_type="application/json",
+            )
+
+        self.assertEqual(autosave(first, "A value").json(), {"saved": True})
+        with self.assertNumQueries(2):  # session and user only
+            self.assertEqual(autosave(first, "A value approached").status_code, 200)
+        sitting.refresh_from_db()
+        self.assertEqual(sitting.draft, "A value")
+        self.assertEqual(get_essay_draft(sitting), "A value approached")
+        response = self.client.get(self.take_url())
+        self.assertEqual(
+            response.context["form"].initial["answers"], "A value approached"
+        )
+
+        self.assertEqual(autosave(second, "Too early").status_code, 409)
+        self.client.post(self.take_url(), {"answers": "A value approached"})
+        sitting.refresh_from_db()
+        self.assertEqual(sitting.draft, "")
+        self.assertEqual(get_essay_draft(sitting), "")
+        self.assertEqual(autosave(first, "Too late").status_code, 409)
+        self.assertEqual(autosave(second, "No breaks").status_code, 200)
+
+    def test_essay_drafts_flush_on_leave_and_stop_at_the_deadline(self):
+        essay = self.add_essay_question("Define a limit.")
+        self.client.force_login(self.user)
+        self.client.get(self.take_url())
+        sitting = Sitting.objects.get(user=self.user)
+        url = reverse("quiz_essay_autosave", args=[sitting.pk])
+
+        def autosave(text, **extra):
+            return self.client.post(
+                url,
+                {"question": essay.pk, "text": text, **extra},
+                content_type="application/json",
+            )
+
+        autosave("A value")
+        autosave("A value approached", flush=True)
+        sitting.refresh_from_db()
+        self.assertEqual(sitting.draft, "A value approached")
+
+        Sitting.objects.filter(pk=sitting.pk).update(
+            deadline=timezone.now() - timedelta(seconds=1)
+        )
+        cache.delete(essay_draft_key(sitting.pk))
+        self.assertEqual(autosave("After time").status_code, 409)
+        sitting.refresh_from_db()
+        self.assertEqual(sitting.draft, "A value approached")
+
+    def test_essay_answers_are_marked_in_one_batch(self):
+        essay = self.add_essay_question("Define a derivative.")
+        question, right, _ = self.add_mc_question("Is 0 a limit of 1/n?")
+        answers = []
+        for i in range(3):
+            taker = User.objects.create_user(username=f"essayist{i}", password="pw")
+            sitting = Sitting.objects.new_sitting(taker, self.quiz, self.course)
+            sitting.record_answer(essay, f"Slope {i}", False)
+            sitting.record_answer(question, str(right.pk), True)
+            answers.append(sitting.answers.get(question=essay))
+        marker = User.objects.create_superuser(username="marker", password="pw")
+        self.client.force_login(marker)
+        url = reverse("quiz_essay_marking", args=[self.quiz.pk, essay.pk])
+
+        response = self.client.get(url)
+        self.assertEqual(len(response.context["answers"]), 3)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(
+                url,
+                {
+                    f"verdict-{answers[0].pk}": "correct",
+                    f"verdict-{answers[1].pk}": "correct",
+                    f"verdict-{answers[2].pk}": "incorrect",
+                    f"verdict-{sitting.answers.get(question=question).pk}": "incorrect",
+                },
+            )
+        updates = [q for q in queries if q["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 2)
+
+        scores = Sitting.objects.order_by("pk").values_list("current_score", flat=True)
+        self.assertEqual(list(scores), [2, 2, 1])
+        self.assertEqual(
+            [a.is_correct for a in SittingAnswer.objects.filter(question=question)],
+            [True, True, True],
+        )
+
+    def test_marking_list_is_keyset_paginated(self):
+        question, right, _ = self.add_mc_question("Is 4 even?")
+        other, _, wrong = self.add_mc_question("Is 5 even?")
+        for i in range(5):
+            taker = User.objects.create_user(username=f"paged{i}", password="pw")
+            sitting = Sitting.objects.new_sitting(taker, self.quiz, self.course)
+            sitting.record_answer(question, str(right.pk), i % 2 == 0)
+            sitting.record_answer(other, str(wrong.pk), False)
+        marker = User.objects.create_superuser(username="marker", password="pw")
+        self.client.force_login(marker)
+        url = reverse("quiz_marking")
+
+        with patch.object(QuizMarkingList, "paginate_by", 2):
+            response = self.client.get(url, {"user_filter": "paged"})
+            first_page = response.context["sitting_list"]
+            self.assertEqual(
+                [s.user.username for s in first_page], ["paged4", "paged3"]
+            )
+            self.assertEqual([s.percent for s in first_page], [50, 0])
+            self.assertContains(response, "50%")
+
+            query = response.context["next_page_query"]
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(f"{url}?{query}")
+            self.assertIn("user_filter=paged", query)
+            self.assertEqual(
+                [s.user.username for s in response.context["sitting_list"]],
+                ["paged2", "paged1"],
+            )
+            response = self.client.get(f"{url}?{response.context['next_page_query']}")
+            self.assertEqual(len(response.context["sitting_list"]), 1)
+            self.assertIsNone(response.context["next_page_query"])
+        self.assertFalse(any("COUNT" in q["sql"] for q in queries))
+
+    @override_settings(QUIZ_PRACTICE_SITTINGS_IN_CACHE=True)
+    def test_practice_attempts_only_persist_the_final_score(self):
+        self.quiz.category = "practice"
+        self.quiz.exam_paper = False
+        self.quiz.answers_at_end = True
+        self.quiz.save()
+        first, right, _ = self.add_mc_question("Is 6 even?")
+        second, _, wrong = self.add_mc_question("Is 7 even?")
+        self.client.force_login(self.user)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.take_url())
+            response = self.client.post(self.take_url(), {"answers": right.pk})
+            self.assertEqual(response.context["question"].id, second.pk)
+        writes = [q for q in queries if not q["sql"].startswith("SELECT")]
+        self.assertFalse([q for q in writes if "quiz_" in q["sql"]])
+        self.assertFalse(Sitting.objects.exists())
+        self.assertFalse(ProgressScore.objects.exists())
+
+        response = self.client.post(self.take_url(), {"answers": wrong.pk})
+        self.assertTemplateUsed(response, "quiz/result.html")
+        self.assertEqual(response.context["score"], 1)
+        self.assertEqual(response.context["incorrect_questions"], [second.pk])
+        score = ProgressScore.objects.get(user=self.user, quiz=self.quiz)
+        self.assertEqual((score.score, score.possible), (1, 2))
+        self.assertFalse(Sitting.objects.exists())
+
+        response = self.client.get(self.take_url())
+        self.assertEqual(response.context["question"].id, first.pk)
+
+    def test_expired_attempts_are_closed_without_extra_reads(self):
+        self.quiz.duration = 10
+        self.quiz.save()
+        question, right, _ = self.add_mc_question("Is 8 even?")
+        self.add_mc_question("Is 9 even?")
+        self.client.force_login(self.user)
+        response = self.client.get(self.take_url())
+        sitting = Sitting.objects.get(user=self.user)
+        self.assertAlmostEqual(
+            (sitting.deadline - sitting.start).total_seconds(), 600, delta=5
+        )
+        self.assertContains(response, "quiz-timer")
+
+        Sitting.objects.filter(pk=sitting.pk).update(
+            deadline=timezone.now() - timedelta(seconds=1)
+        )
+        response = self.client.post(self.take_url(), {"answers": right.pk})
+
+        self.assertTemplateUsed(response, "quiz/result.html")
+        sitting.refresh_from_db()
+        self.assertTrue(sitting.complete)
+        self.assertEqual(sitting.cursor, 0)
+        self.assertFalse(sitting.answers.exists())
+
+    def test_result_and_marking_pages_read_the_snapshot(self):
+        self.quiz.answers_at_end = True
+        self.quiz.save()
+        question, right, _ = self.add_mc_question("Is 2 even?")
+        essay = self.add_essay_question("Why is 2 even?")
+        self.client.force_login(self.user)
+        self.client.get(self.take_url())
+        self.client.post(self.take_url(), {"answers": right.pk})
+        response = self.client.post(self.take_url(), {"answers": "It halves."})
+        self.assertContains(response, "This is the correct answer")
+        self.assertContains(response, "It halves.")
+
+        marker = User.objects.create_superuser(username="marker", password="pw")
+        self.client.force_login(marker)
+        sitting = Sitting.objects.get(user=self.user)
+        url = reverse("quiz_marking_detail", args=[sitting.pk])
+        self.client.post(url, {"qid": essay.pk})
+        sitting.refresh_from_db()
+        self.assertEqual(sitting.current_score, 2)
+        self.assertEqual(sitting.get_incorrect_questions, [])
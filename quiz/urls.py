@@ -11,10 +11,25 @@ urlpatterns = [
         view=views.QuizMarkingDetail.as_view(),
         name="quiz_marking_detail",
     ),
+    path(
+        "marking/<int:pk>/essays/<int:question_id>/",
+        views.essay_marking_queue,
+        name="quiz_essay_marking",
+    ),
     path("<int:pk>/<slug>/take/", view=views.QuizTake.as_view(), name="quiz_take"),
+    path(
+        "sitting/<int:pk>/autosave/",
+        views.essay_autosave,
+        name="quiz_essay_autosave",
+    ),
     path("<slug>/quiz_add/", views.QuizCreateView.as_view(), name="quiz_create"),
     path("<slug>/<int:pk>/add/", views.QuizUpdateView.as_view(), name="quiz_update"),
     path("<slug>/<int:pk>/delete/", views.quiz_delete, name="quiz_delete"),
+    path(
+        "<slug>/<int:pk>/analysis/",
+        views.quiz_item_analysis,
+        name="quiz_item_analysis",
+    ),
     path(
         "mc-question/add/<slug>/<int:quiz_id>/",
         views.MCQuestionCreate.as_view(),
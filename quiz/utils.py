@@ -0,0 +1,293 @@
+import random
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field, replace
+
+from django.core.cache import cache
+from django.utils.timezone import now as tz_now
+from django.utils.translation import get_language
+
+QUIZ_SNAPSHOT_TIMEOUT = 60 * 60 * 24
+# snapshots kept in this process, most recently used last
+LOCAL_SNAPSHOTS = OrderedDict()
+LOCAL_SNAPSHOT_LIMIT = 128
+ESSAY_DRAFT_TIMEOUT = 60 * 60 * 6
+# at most one database write per sitting in this many seconds of autosaves
+ESSAY_DRAFT_FLUSH_INTERVAL = 15
+
+
+def new_seed():
+    return random.randrange(2**31)
+
+
+def shuffled(items, seed):
+    """A shuffled copy of ``items`` whose order only depends on ``seed``."""
+    items = list(items)
+    random.Random(seed).shuffle(items)
+    return items
+
+
+@dataclass(frozen=True)
+class FigureSnapshot:
+    name: str
+    url: str
+
+    def __str__(self):
+        return self.name
+
+
+@dataclass(frozen=True)
+class ChoiceSnapshot:
+    id: int
+    choice_text: str
+    correct: bool
+
+    def __str__(self):
+        return self.choice_text
+
+
+@dataclass(frozen=True)
+class QuestionSnapshot:
+    """
+    Read-only copy of a question and its choices that answers the same calls
+    as MCQuestion/EssayQuestion without touching the database.
+    """
+
+    id: int
+    kind: str
+    content: str
+    explanation: str
+    tag: str = ""
+    figure: FigureSnapshot = None
+    choice_order: str = ""
+    choices: tuple = ()
+    user_answer: str = field(default=None, compare=False)
+    seed: int = field(default=None, compare=False)
+
+    def __str__(self):
+        return self.content
+
+    @property
+    def is_essay(self):
+        return self.kind == "EssayQuestion"
+
+    def with_answer(self, answer):
+        return replace(self, user_answer=answer)
+
+    def with_seed(self, seed):
+        return replace(self, seed=seed)
+
+    def get_choices(self):
+        """
+        The choices in display order; a random order is derived from the
+        sitting's seed so it stays the same every time the question is shown.
+        """
+        if self.choice_order == "random":
+            if self.seed is None:
+                return random.sample(self.choices, len(self.choices))
+            return shuffled(self.choices, f"{self.seed}:{self.id}")
+        return self.choices
+
+    def get_choices_list(self):
+        return [(choice.id, choice.choice_text) for choice in self.get_choices()]
+
+    def get_choice(self, guess):
+        try:
+            guess = int(guess)
+        except (TypeError, ValueError):
+            return None
+        return next((choice for choice in self.choices if choice.id == guess), None)
+
+    def check_if_correct(self, guess):
+        if self.is_essay:
+            return False  # Needs manual grading
+        choice = self.get_choice(guess)
+        return bool(choice and choice.correct)
+
+    def answer_choice_to_string(self, guess):
+        if self.is_essay:
+            return str(guess)
+        choice = self.get_choice(guess)
+        return choice.choice_text if choice else ""
+
+
+@dataclass(frozen=True)
+class QuizSnapshot:
+    quiz_id: int
+    version: int
+    questions: dict
+    question_ids: tuple = ()
+    # question ids by tag, the strata of a stratified draw
+    strata: dict = field(default_factory=dict)
+
+    def sample(self, size, seed, stratified=False):
+        """
+        Draw ``size`` question ids, in quiz order, from the precomputed index.
+
+        With ``stratified`` every tag gets a share of the draw proportional to
+        its number of questions, the remainder going to the largest fractions.
+        """
+        rng = random.Random(seed)
+        if not stratified or len(self.strata) < 2:
+            return sorted(rng.sample(self.question_ids, size))
+        total = len(self.question_ids)
+        quotas = {tag: size * len(ids) / total for tag, ids in self.strata.items()}
+        counts = {tag: int(quota) for tag, quota in quotas.items()}
+        by_remainder = sorted(
+            quotas, key=lambda tag: quotas[tag] - counts[tag], reverse=True
+        )
+        for tag in by_remainder[: size - sum(counts.values())]:
+            counts[tag] += 1
+        drawn = []
+        for tag, ids in self.strata.items():
+            drawn.extend(rng.sample(ids, counts[tag]))
+        return sorted(drawn)
+
+    def get_question(self, question_id):
+        """
+        The snapshot of ``question_id``; questions taken out of the quiz since
+        a sitting started are read from the database instead.
+        """
+        question = self.questions.get(question_id)
+        if question is None:
+            from .models import Question
+
+            question = snapshot_question(
+                Question.objects.get_subclass(id=question_id), {}
+            )
+        return question
+
+
+def snapshot_question(question, choices):
+    figure = None
+    if question.figure:
+        figure = FigureSnapshot(question.figure.name, question.figure.url)
+    choice_order = getattr(question, "choice_order", "")
+    question_choices = choices.get(question.id, [])
+    if choice_order == "content":
+        question_choices = sorted(question_choices, key=lambda c: c.choice_text)
+    return QuestionSnapshot(
+        id=question.id,
+        kind=question.__class__.__name__,
+        content=question.content,
+        explanation=question.explanation,
+        tag=question.tag,
+        figure=figure,
+        choice_order=choice_order,
+        choices=tuple(question_choices),
+    )
+
+
+def build_quiz_snapshot(quiz):
+    from .models import Choice
+
+    choices = {}
+    for choice in Choice.objects.filter(question__quiz=quiz).order_by("pk"):
+        choices.setdefault(choice.question_id, []).append(
+            ChoiceSnapshot(choice.id, choice.choice_text, choice.correct)
+        )
+    questions = {
+        question.id: snapshot_question(question, choices)
+        for question in quiz.question_set.order_by("pk").select_subclasses()
+    }
+    strata = {}
+    for question in questions.values():
+        strata.setdefault(question.tag, []).append(question.id)
+    return QuizSnapshot(
+        quiz.pk,
+        quiz.version,
+        questions,
+        tuple(questions),
+        {tag: tuple(ids) for tag, ids in strata.items()},
+    )
+
+
+def get_quiz_snapshot(quiz):
+    """
+    The questions and choices of ``quiz``, built once per quiz version and
+    language and shared through this process and the Django cache.
+    """
+    key = f"quiz_snapshot:{quiz.pk}:{quiz.version}:{get_language()}"
+    snapshot = LOCAL_SNAPSHOTS.get(key)
+    if snapshot is None:
+        snapshot = cache.get(key)
+        if snapshot is None:
+            snapshot = build_quiz_snapshot(quiz)
+            cache.set(key, snapshot, QUIZ_SNAPSHOT_TIMEOUT)
+        LOCAL_SNAPSHOTS[key] = snapshot
+        if len(LOCAL_SNAPSHOTS) > LOCAL_SNAPSHOT_LIMIT:
+            LOCAL_SNAPSHOTS.popitem(last=False)
+    else:
+        LOCAL_SNAPSHOTS.move_to_end(key)
+    return snapshot
+
+
+def draw_question_order(quiz, seed):
+    """The question ids asked, in order, by a new sitting of ``quiz``."""
+    snapshot = get_quiz_snapshot(quiz)
+    if quiz.max_questions and quiz.max_questions < len(snapshot.question_ids):
+        question_ids = snapshot.sample(quiz.max_questions, seed, quiz.stratified)
+    else:
+        question_ids = list(snapshot.question_ids)
+    if quiz.random_order:
+        question_ids = shuffled(question_ids, seed)
+    return question_ids
+
+
+def essay_draft_key(sitting_id):
+    return f"essay_draft:{sitting_id}"
+
+
+def save_essay_draft(sitting_id, user_id, question_id, text, flush=False):
+    """
+    Keep ``text`` as the draft answer to the current question of a sitting.
+
+    Drafts are coalesced in the cache: every call replaces the cached text,
+    but ``Sitting.draft`` is only written when the last write is older than
+    ``ESSAY_DRAFT_FLUSH_INTERVAL`` or when ``flush`` is set, as it is for the
+    last draft sent when the page is left. The sitting is read once per
+    question to check it belongs to the user and is on ``question_id``;
+    returns False if it does not or if its deadline has passed.
+    """
+    from .models import Sitting
+
+    key = essay_draft_key(sitting_id)
+    draft = cache.get(key)
+    if draft is None or (draft["user"], draft["question"]) != (user_id, question_id):
+        row = (
+            Sitting.objects.filter(pk=sitting_id, user_id=user_id, complete=False)
+            .values_list("question_order", "cursor", "deadline")
+            .first()
+        )
+        if row is None:
+            return False
+        question_order, cursor, deadline = row
+        if cursor >= len(question_order) or question_order[cursor] != question_id:
+            return False
+        draft = {"user": user_id, "question": question_id, "position": cursor}
+        draft.update(deadline=deadline, flushed=0)
+
+    if draft["deadline"] is not None and tz_now() >= draft["deadline"]:
+        cache.delete(key)
+        return False
+    draft["text"] = text
+    now = time.time()
+    if flush or now - draft["flushed"] >= ESSAY_DRAFT_FLUSH_INTERVAL:
+        # the cursor guard drops drafts that arrive after the answer
+        flushed = Sitting.objects.filter(
+            pk=sitting_id, cursor=draft["position"], complete=False
+        ).update(draft=text)
+        if not flushed:
+            cache.delete(key)
+            return False
+        draft["flushed"] = now
+    cache.set(key, draft, ESSAY_DRAFT_TIMEOUT)
+    return True
+
+
+def get_essay_draft(sitting):
+    """The latest draft answer to the current question of ``sitting``."""
+    draft = cache.get(essay_draft_key(sitting.pk))
+    if draft and draft["position"] == sitting.cursor:
+        return draft["text"]
+    return sitting.draft
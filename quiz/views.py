@@ -1,8 +1,12 @@
+import json
+
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
+from django.http import Http404, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils.decorators import method_decorator
+from django.views.decorators.http import require_POST
 from django.views.generic import (
     CreateView,
     DetailView,
@@ -13,6 +17,8 @@ from django.views.generic import (
 )
 
 from accounts.decorators import lecturer_required
+from core.exports import ExportMixin
+from course.models import CourseAllocation
 from .forms import (
     EssayForm,
     MCQuestionForm,
@@ -22,13 +28,17 @@ from .forms import (
 )
 from .models import (
     Course,
-    EssayQuestion,
     MCQuestion,
     Progress,
+    ProgressScore,
     Question,
     Quiz,
     Sitting,
+    SittingAnswer,
 )
+from .analysis import item_analysis
+from .practice import PracticeSitting, uses_practice_sitting
+from .utils import get_essay_draft, get_quiz_snapshot, save_essay_draft
 
 
 # ########################################################
@@ -94,12 +104,25 @@ def quiz_delete(request, slug, pk):
 @login_required
 def quiz_list(request, slug):
     course = get_object_or_404(Course, slug=slug)
-    quizzes = Quiz.objects.filter(course=course).order_by("-timestamp")
+    quizzes = (
+        Quiz.objects.filter(course=course)
+        .with_stats(request.user)
+        .order_by("-timestamp")
+    )
     return render(
         request, "quiz/quiz_list.html", {"quizzes": quizzes, "course": course}
     )
 
 
+@login_required
+@lecturer_required
+def quiz_item_analysis(request, slug, pk):
+    course = get_object_or_404(Course, slug=slug)
+    quiz = get_object_or_404(Quiz, pk=pk, course=course)
+    context = {"course": course, "quiz": quiz, "analysis": item_analysis(quiz)}
+    return render(request, "quiz/item_analysis.html", context)
+
+
 # ########################################################
 # Multiple Choice Question Views
 # ########################################################
@@ -171,22 +194,39 @@ class QuizUserProgressView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         progress, _ = Progress.objects.get_or_create(user=self.request.user)
-        context["cat_scores"] = progress.list_all_cat_scores
+        context["cat_scores"] = progress.list_all_cat_scores()
         context["exams"] = progress.show_exams()
         context["exams_counter"] = context["exams"].count()
         return context
 
 
 @method_decorator([login_required, lecturer_required], name="dispatch")
-class QuizMarkingList(ListView):
+class QuizMarkingList(ExportMixin, ListView):
     model = Sitting
     template_name = "quiz/quiz_marking_list.html"
+    paginate_by = 50
+    export_filename = "completed_exams"
+    export_fields = (
+        ("User", "user__username"),
+        ("Course", "course__title"),
+        ("Quiz", "quiz__title"),
+        ("Completed", "end"),
+        ("Score", "current_score"),
+        ("Score (%)", "percent"),
+    )
 
     def get_queryset(self):
-        queryset = Sitting.objects.filter(complete=True)
+        queryset = (
+            Sitting.objects.with_percent()
+            .filter(complete=True)
+            .select_related("user", "quiz__course")
+            .defer("question_order", "draft")
+        )
         if not self.request.user.is_superuser:
             queryset = queryset.filter(
-                quiz__course__allocated_course__lecturer__pk=self.request.user.id
+                quiz__course__in=CourseAllocation.objects.filter(
+                    lecturer=self.request.user
+                ).values("courses")
             )
         quiz_filter = self.request.GET.get("quiz_filter")
         if quiz_filter:
@@ -196,6 +236,31 @@ class QuizMarkingList(ListView):
             queryset = queryset.filter(user__username__icontains=user_filter)
         return queryset
 
+    def paginate_queryset(self, queryset, page_size):
+        """
+        Keyset pagination, newest sitting first: ``?before=<pk>`` starts the
+        page after that sitting, so every page costs the same to fetch.
+        """
+        before = self.request.GET.get("before", "")
+        if before.isdigit():
+            queryset = queryset.filter(pk__lt=int(before))
+        sittings = list(queryset.order_by("-pk")[: page_size + 1])
+        has_next = len(sittings) > page_size
+        sittings = sittings[:page_size]
+        if has_next:
+            params = self.request.GET.copy()
+            params["before"] = sittings[-1].pk
+            self.next_page_query = params.urlencode()
+        return None, None, sittings, has_next
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["next_page_query"] = getattr(self, "next_page_query", None)
+        first_page = self.request.GET.copy()
+        first_page.pop("before", None)
+        context["first_page_query"] = first_page.urlencode()
+        return context
+
 
 @method_decorator([login_required, lecturer_required], name="dispatch")
 class QuizMarkingDetail(DetailView):
@@ -206,7 +271,7 @@ class QuizMarkingDetail(DetailView):
         sitting = self.get_object()
         question_id = request.POST.get("qid")
         if question_id:
-            question = Question.objects.get_subclass(id=int(question_id))
+            question = sitting.snapshot.get_question(int(question_id))
             if int(question_id) in sitting.get_incorrect_questions:
                 sitting.remove_incorrect_question(question)
             else:
@@ -219,6 +284,47 @@ class QuizMarkingDetail(DetailView):
         return context
 
 
+VERDICTS = {"correct": True, "incorrect": False}
+
+
+@login_required
+@lecturer_required
+def essay_marking_queue(request, pk, question_id):
+    """
+    Every completed sitting's answer to one essay question of quiz ``pk`` on a
+    single page; the verdicts are submitted together and applied in bulk.
+    """
+    quiz = get_object_or_404(Quiz, pk=pk)
+    question = get_quiz_snapshot(quiz).questions.get(question_id)
+    if question is None or not question.is_essay:
+        raise Http404("No essay question found.")
+
+    if request.method == "POST":
+        verdicts = {}
+        for key, value in request.POST.items():
+            if not key.startswith("verdict-"):
+                continue
+            answer_id = key[len("verdict-") :]
+            if answer_id.isdigit() and value in VERDICTS:
+                verdicts[int(answer_id)] = VERDICTS[value]
+        changed = SittingAnswer.objects.apply_verdicts(
+            verdicts, question_id=question_id, sitting__quiz=quiz
+        )
+        messages.success(request, f"{changed} answer(s) updated.")
+        return redirect("quiz_essay_marking", pk=quiz.pk, question_id=question_id)
+
+    context = {
+        "quiz": quiz,
+        "question": question,
+        "answers": SittingAnswer.objects.filter(
+            question_id=question_id, sitting__quiz=quiz, sitting__complete=True
+        )
+        .select_related("sitting__user")
+        .order_by("sitting__end", "pk"),
+    }
+    return render(request, "quiz/essay_marking.html", context)
+
+
 # ########################################################
 # Quiz Taking View
 # ########################################################
@@ -233,13 +339,18 @@ class QuizTake(FormView):
     def dispatch(self, request, *args, **kwargs):
         self.quiz = get_object_or_404(Quiz, slug=self.kwargs["slug"])
         self.course = get_object_or_404(Course, pk=self.kwargs["pk"])
-        if not Question.objects.filter(quiz=self.quiz).exists():
+        if not get_quiz_snapshot(self.quiz).questions:
             messages.warning(request, "This quiz has no questions available.")
             return redirect("quiz_index", slug=self.course.slug)
 
-        self.sitting = Sitting.objects.user_sitting(
-            request.user, self.quiz, self.course
-        )
+        if uses_practice_sitting(self.quiz):
+            self.sitting = PracticeSitting.user_sitting(
+                request.user, self.quiz, self.course
+            )
+        else:
+            self.sitting = Sitting.objects.user_sitting(
+                request.user, self.quiz, self.course
+            )
         if not self.sitting:
             messages.info(
                 request,
@@ -247,6 +358,12 @@ class QuizTake(FormView):
             )
             return redirect("quiz_index", slug=self.course.slug)
 
+        if self.sitting.is_expired:
+            messages.warning(
+                request, "Time is up. Your answers so far have been submitted."
+            )
+            return self.final_result_user()
+
         # Set self.question and self.progress here
         self.question = self.sitting.get_first_question()
         self.progress = self.sitting.progress()
@@ -258,42 +375,42 @@ class QuizTake(FormView):
         kwargs["question"] = self.question
         return kwargs
 
+    def get_initial(self):
+        initial = super().get_initial()
+        if self.question and self.question.is_essay and self.sitting.pk:
+            initial["answers"] = get_essay_draft(self.sitting)
+        return initial
+
     def get_form_class(self):
-        if isinstance(self.question, EssayQuestion):
+        if self.question.is_essay:
             return EssayForm
         return self.form_class
 
     def form_valid(self, form):
-        self.form_valid_user(form)
-        if not self.sitting.get_first_question():
+        with transaction.atomic():
+            self.form_valid_user(form)
+        if not self.question:
             return self.final_result_user()
         return super().get(self.request)
 
     def form_valid_user(self, form):
-        progress, _ = Progress.objects.get_or_create(user=self.request.user)
         guess = form.cleaned_data["answers"]
         is_correct = self.question.check_if_correct(guess)
 
-        if is_correct:
-            self.sitting.add_to_score(1)
-            progress.update_score(self.question, 1, 1)
-        else:
-            self.sitting.add_incorrect_question(self.question)
-            progress.update_score(self.question, 0, 1)
-
         if not self.quiz.answers_at_end:
             self.previous = {
                 "previous_answer": guess,
                 "previous_outcome": is_correct,
                 "previous_question": self.question,
                 "answers": self.question.get_choices(),
-                "question_type": {self.question.__class__.__name__: True},
+                "question_type": {self.question.kind: True},
             }
         else:
             self.previous = {}
 
-        self.sitting.add_user_answer(self.question, guess)
-        self.sitting.remove_first_question()
+        recorded = self.sitting.record_answer(self.question, guess, is_correct)
+        if recorded and self.sitting.scores_each_answer:
+            ProgressScore.objects.add(self.request.user, self.quiz, int(is_correct), 1)
 
         # Update self.question and self.progress for the next question
         self.question = self.sitting.get_first_question()
@@ -302,6 +419,7 @@ class QuizTake(FormView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["question"] = self.question
+        context["sitting"] = self.sitting
         context["quiz"] = self.quiz
         context["course"] = self.course
         if hasattr(self, "previous"):
@@ -311,7 +429,8 @@ class QuizTake(FormView):
         return context
 
     def final_result_user(self):
-        self.sitting.mark_quiz_complete()
+        if not self.sitting.complete:
+            self.sitting.mark_quiz_complete()
         results = {
             "course": self.course,
             "quiz": self.quiz,
@@ -334,3 +453,25 @@ class QuizTake(FormView):
             self.sitting.delete()
 
         return render(self.request, self.result_template_name, results)
+
+
+@login_required
+@require_POST
+def essay_autosave(request, pk):
+    """
+    Store the in-progress text of the current essay question of sitting
+    ``pk``. Posted as JSON ``{"question": <id>, "text": <answer>}``, with
+    ``"flush": true`` to write it through to the sitting right away.
+    """
+    try:
+        data = json.loads(request.body)
+        question_id = int(data["question"])
+        text = str(data["text"])
+        flush = bool(data.get("flush", False))
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({"saved": False, "error": "Invalid draft."}, status=400)
+    if not save_essay_draft(pk, request.user.pk, question_id, text, flush=flush):
+        return JsonResponse(
+            {"saved": False, "error": "This question is no longer open."}, status=409
+        )
+    return JsonResponse({"saved": True})
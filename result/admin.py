@@ -1,7 +1,13 @@
 from django.contrib import admin
 from django.contrib.auth.models import Group
 
-from .models import TakenCourse, Result
+from .models import (
+    AcademicStanding,
+    RegistrationRequest,
+    TakenCourse,
+    Result,
+    WaitlistEntry,
+)
 
 
 class ScoreAdmin(admin.ModelAdmin):
@@ -19,5 +25,31 @@ class ScoreAdmin(admin.ModelAdmin):
     ]
 
 
+class AcademicStandingAdmin(admin.ModelAdmin):
+    list_display = [
+        "student",
+        "session",
+        "semester",
+        "level",
+        "credits_attempted",
+        "credits_earned",
+        "gpa",
+        "cgpa",
+    ]
+
+
+class RegistrationRequestAdmin(admin.ModelAdmin):
+    list_display = ["student", "action", "status", "created_at", "processed_at"]
+    list_filter = ["action", "status"]
+
+
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ["student", "course", "created_at"]
+    list_filter = ["course"]
+
+
 admin.site.register(TakenCourse, ScoreAdmin)
 admin.site.register(Result)
+admin.site.register(AcademicStanding, AcademicStandingAdmin)
+admin.site.register(RegistrationRequest, RegistrationRequestAdmin)
+admin.site.register(WaitlistEntry, WaitlistEntryAdmin)
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from result.models import AcademicStanding
+
+
+class Command(BaseCommand):
+    help = "Recompute the AcademicStanding table from TakenCourse rows."
+
+    def handle(self, *args, **options):
+        AcademicStanding.objects.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt {AcademicStanding.objects.count()} academic standings."
+            )
+        )
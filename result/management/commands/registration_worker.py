@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from result.registration import (
+    REGISTRATION_BATCH_SIZE,
+    process_registration_queue,
+    promote_waitlist,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply queued course registrations and drops in batched transactions "
+        "and promote waitlisted students into freed seats. Run a single "
+        "worker so seats and credits are checked in one place."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=REGISTRATION_BATCH_SIZE,
+            help="Requests applied, or students promoted, per transaction.",
+        )
+        parser.add_argument(
+            "--sleep",
+            type=float,
+            default=1.0,
+            help="Seconds to wait between polls when the queue is empty.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Exit once the queue is drained instead of polling.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_registration_queue(options["batch_size"])
+            if processed:
+                self.stdout.write(f"Applied {processed} registration request(s).")
+            promoted = promote_waitlist(options["batch_size"])
+            if promoted:
+                self.stdout.write(f"Promoted {promoted} waitlisted student(s).")
+            if processed or promoted:
+                continue
+            if options["once"]:
+                break
+            time.sleep(options["sleep"])
@@ -0,0 +1,168 @@
+# Generated by Django 4.0.8 on 2026-10-18 16:48
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_academic_standing(apps, schema_editor):
+    TakenCourse = apps.get_model("result", "TakenCourse")
+    AcademicStanding = apps.get_model("result", "AcademicStanding")
+    semester_order = {"First": 0, "Second": 1, "Third": 2}
+
+    totals = {}
+    for (
+        student_id,
+        semester,
+        level,
+        credit,
+        point,
+        comment,
+    ) in TakenCourse.objects.values_list(
+        "student_id",
+        "course__semester",
+        "course__level",
+        "course__credit",
+        "point",
+        "comment",
+    ).iterator():
+        key = (student_id, semester, level)
+        attempted, earned, points = totals.get(key, (0, 0, Decimal("0.00")))
+        totals[key] = (
+            attempted + credit,
+            earned + (credit if comment == "PASS" else 0),
+            points + point,
+        )
+
+    def average(points, credits):
+        return round(points / credits, 2) if credits else Decimal("0.00")
+
+    standings = []
+    cumulative = {}
+    for key in sorted(totals, key=lambda k: (k[0], semester_order.get(k[1], 0))):
+        student_id, semester, level = key
+        attempted, earned, points = totals[key]
+        cumulative_points, cumulative_credits = cumulative.get(
+            student_id, (Decimal("0.00"), 0)
+        )
+        cumulative_points += points
+        cumulative_credits += attempted
+        cumulative[student_id] = (cumulative_points, cumulative_credits)
+        standings.append(
+            AcademicStanding(
+                student_id=student_id,
+                semester=semester,
+                level=level,
+                credits_attempted=attempted,
+                credits_earned=earned,
+                points=points,
+                gpa=average(points, attempted),
+                cgpa=average(cumulative_points, cumulative_credits),
+            )
+        )
+    AcademicStanding.objects.bulk_create(standings, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_newsandevents_summary_es_newsandevents_summary_fr_and_more"),
+        ("accounts", "0002_initial"),
+        ("result", "0002_alter_result_level_alter_takencourse_comment_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="takencourse",
+            name="session",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to="core.session",
+            ),
+        ),
+        migrations.CreateModel(
+            name="AcademicStanding",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "semester",
+                    models.CharField(
+                        choices=[
+                            ("First", "First"),
+                            ("Second", "Second"),
+                            ("Third", "Third"),
+                        ],
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "level",
+                    models.CharField(
+                        choices=[
+                            ("Bachelor", "Bachelor Degree"),
+                            ("Master", "Master Degree"),
+                        ],
+                        max_length=25,
+                        null=True,
+                    ),
+                ),
+                ("credits_attempted", models.IntegerField(default=0)),
+                ("credits_earned", models.IntegerField(default=0)),
+                (
+                    "points",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=8
+                    ),
+                ),
+                (
+                    "gpa",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=4
+                    ),
+                ),
+                (
+                    "cgpa",
+                    models.DecimalField(
+                        decimal_places=2, default=Decimal("0.00"), max_digits=4
+                    ),
+                ),
+                (
+                    "session",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="core.session",
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="accounts.student",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("session", "semester"),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="academicstanding",
+            constraint=models.UniqueConstraint(
+                fields=("student", "session", "semester", "level"),
+                name="unique_academic_standing",
+            ),
+        ),
+        migrations.RunPython(populate_academic_standing, migrations.RunPython.noop),
+    ]
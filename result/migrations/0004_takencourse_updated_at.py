@@ -0,0 +1,18 @@
+# Generated by Django 4.0.8 on 2026-10-18 16:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("result", "0003_academicstanding"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="takencourse",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
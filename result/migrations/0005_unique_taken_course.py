@@ -0,0 +1,107 @@
+# Generated by Django 4.0.8 on 2026-10-18 17:27
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+def rebuild_academic_standing(apps, student_ids):
+    """Recompute the standings of ``student_ids`` from their TakenCourse rows."""
+    TakenCourse = apps.get_model("result", "TakenCourse")
+    AcademicStanding = apps.get_model("result", "AcademicStanding")
+    semester_order = {"First": 0, "Second": 1, "Third": 2}
+
+    totals = {}
+    for (
+        student_id,
+        session_id,
+        semester,
+        level,
+        credit,
+        point,
+        comment,
+    ) in TakenCourse.objects.filter(student_id__in=student_ids).values_list(
+        "student_id",
+        "session_id",
+        "course__semester",
+        "course__level",
+        "course__credit",
+        "point",
+        "comment",
+    ):
+        key = (student_id, session_id, semester, level)
+        attempted, earned, points = totals.get(key, (0, 0, Decimal("0.00")))
+        totals[key] = (
+            attempted + credit,
+            earned + (credit if comment == "PASS" else 0),
+            points + point,
+        )
+
+    def average(points, credits):
+        return round(points / credits, 2) if credits else Decimal("0.00")
+
+    standings = []
+    cumulative = {}
+    for key in sorted(
+        totals, key=lambda k: (k[0], k[1] or 0, semester_order.get(k[2], 0))
+    ):
+        student_id, session_id, semester, level = key
+        attempted, earned, points = totals[key]
+        cumulative_points, cumulative_credits = cumulative.get(
+            student_id, (Decimal("0.00"), 0)
+        )
+        cumulative_points += points
+        cumulative_credits += attempted
+        cumulative[student_id] = (cumulative_points, cumulative_credits)
+        standings.append(
+            AcademicStanding(
+                student_id=student_id,
+                session_id=session_id,
+                semester=semester,
+                level=level,
+                credits_attempted=attempted,
+                credits_earned=earned,
+                points=points,
+                gpa=average(points, attempted),
+                cgpa=average(cumulative_points, cumulative_credits),
+            )
+        )
+    AcademicStanding.objects.filter(student_id__in=student_ids).delete()
+    AcademicStanding.objects.bulk_create(standings, batch_size=500)
+
+
+def remove_duplicate_registrations(apps, schema_editor):
+    """
+    Keep the latest row of every (student, course) registered twice. Historical
+    models send no signals, so the standings of those students are rebuilt
+    from the rows left; course seat counts are first filled in by 0007.
+    """
+    TakenCourse = apps.get_model("result", "TakenCourse")
+    duplicates = list(
+        TakenCourse.objects.values("student", "course")
+        .annotate(latest=models.Max("pk"), rows=models.Count("pk"))
+        .filter(rows__gt=1)
+        .order_by()
+    )
+    for row in duplicates:
+        TakenCourse.objects.filter(
+            student=row["student"], course=row["course"]
+        ).exclude(pk=row["latest"]).delete()
+    if duplicates:
+        rebuild_academic_standing(apps, {row["student"] for row in duplicates})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("result", "0004_takencourse_updated_at"),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_registrations, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name="takencourse",
+            constraint=models.UniqueConstraint(
+                fields=("student", "course"), name="unique_taken_course"
+            ),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 4.0.8 on 2026-10-18 17:34
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models.functions import Coalesce
+
+
+def count_enrolled(apps, schema_editor):
+    Course = apps.get_model("course", "Course")
+    TakenCourse = apps.get_model("result", "TakenCourse")
+    enrolled = (
+        TakenCourse.objects.filter(course=models.OuterRef("pk"))
+        .order_by()
+        .values("course")
+        .annotate(count=models.Count("pk"))
+        .values("count")
+    )
+    Course.objects.update(enrolled_count=Coalesce(models.Subquery(enrolled), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("accounts", "0002_initial"),
+        ("course", "0006_course_enrolled_count"),
+        ("result", "0006_registrationrequest"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="WaitlistEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("created_at", models.DateTimeField(auto_now_add=True)),
+                (
+                    "course",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="waitlist_entries",
+                        to="course.course",
+                    ),
+                ),
+                (
+                    "student",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="accounts.student",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ("created_at", "pk"),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="waitlistentry",
+            constraint=models.UniqueConstraint(
+                fields=("student", "course"), name="unique_waitlist_entry"
+            ),
+        ),
+        migrations.RunPython(count_enrolled, migrations.RunPython.noop),
+    ]
@@ -1,11 +1,17 @@
+import threading
+from collections import Counter, defaultdict
+from contextlib import contextmanager
 from decimal import Decimal
 from django.conf import settings
 
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
 from django.urls import reverse
+from django.utils.translation import gettext_lazy as _
 
 from accounts.models import Student
-from core.models import Semester
+from core.models import Semester, Session
 from course.models import Course
 
 A_PLUS = "A+"
@@ -74,6 +80,189 @@ GRADE_POINT_MAPPING = {
 }
 
 
+SEMESTER_ORDER = {
+    semester: index for index, (semester, _) in enumerate(settings.SEMESTER_CHOICES)
+}
+
+
+def _grade_point_average(points, credits):
+    if credits:
+        return round(Decimal(points) / Decimal(credits), 2)
+    return Decimal("0.00")
+
+
+def standing_contribution(
+    student_id, session_id, semester, level, credit, point, comment
+):
+    """
+    Return the AcademicStanding key of a taken course and the
+    ``(credits_attempted, credits_earned, points)`` it contributes.
+    """
+    key = (student_id, session_id, semester, level)
+    earned = credit if comment == PASS else 0
+    return key, (credit, earned, Decimal(point))
+
+
+def add_standing_delta(deltas, key, values, sign=1):
+    """Accumulate ``values`` (times ``sign``) into ``deltas[key]``."""
+    current = deltas.get(key, (0, 0, Decimal("0.00")))
+    deltas[key] = tuple(a + sign * b for a, b in zip(current, values))
+    return deltas
+
+
+class TakenCourseQuerySet(models.query.QuerySet):
+    def gpa_for(self, students, semester=None):
+        """
+        Return ``{student_id: {"gpa": ..., "cgpa": ...}}`` for one or many
+        students from a single ``Sum(point) / Sum(course__credit)`` aggregate
+        grouped by student.
+
+        The GPA only counts courses of the given semester at the student's
+        current level; without a semester the GPA is zero, as before.
+        """
+        if isinstance(students, (Student, int)):
+            students = [students]
+        student_ids = [getattr(student, "pk", student) for student in students]
+        semester = getattr(semester, "semester", semester)
+
+        semester_filter = models.Q(
+            course__level=models.F("student__level"), course__semester=semester
+        )
+        rows = (
+            self.filter(student_id__in=student_ids)
+            .values("student_id")
+            .annotate(
+                points=models.Sum("point"),
+                credits=models.Sum("course__credit"),
+                semester_points=models.Sum("point", filter=semester_filter),
+                semester_credits=models.Sum("course__credit", filter=semester_filter),
+            )
+            .order_by()
+        )
+
+        averages = {
+            student_id: {"gpa": Decimal("0.00"), "cgpa": Decimal("0.00")}
+            for student_id in student_ids
+        }
+        for row in rows:
+            averages[row["student_id"]] = {
+                "gpa": _grade_point_average(
+                    row["semester_points"] if semester else 0,
+                    row["semester_credits"] if semester else 0,
+                ),
+                "cgpa": _grade_point_average(row["points"], row["credits"]),
+            }
+        return averages
+
+
+class TakenCourseManager(models.Manager):
+    def get_queryset(self):
+        return TakenCourseQuerySet(self.model, using=self._db)
+
+    def gpa_for(self, students, semester=None):
+        return self.get_queryset().gpa_for(students, semester)
+
+    def enrol(self, pairs, session=None, count_seats=True):
+        """
+        Insert a TakenCourse for every new ``(student, course)`` pair in one
+        statement. The students are locked and their rows re-read first, so
+        pairs already registered are skipped and only the inserted rows count.
+        ``bulk_create`` skips ``save()``, so the rows are graded here and their
+        standing deltas and seat counts applied together; ``count_seats=False``
+        when the caller already took the seats.
+        """
+        if not pairs:
+            return []
+        if session is None:
+            session = Session.objects.filter(is_current_session=True).first()
+        student_ids = {student.pk for student, _ in pairs}
+        with transaction.atomic():
+            list(
+                Student.objects.select_for_update()
+                .filter(pk__in=student_ids)
+                .order_by("pk")
+                .values_list("pk")
+            )
+            registered = set(
+                self.filter(
+                    student_id__in=student_ids,
+                    course_id__in={course.pk for _, course in pairs},
+                ).values_list("student_id", "course_id")
+            )
+            taken_courses, deltas = [], {}
+            for student, course in pairs:
+                if (student.pk, course.pk) in registered:
+                    continue
+                registered.add((student.pk, course.pk))
+                taken_course = self.model(
+                    student=student, course=course, session=session
+                )
+                taken_course.apply_grading()
+                add_standing_delta(deltas, *taken_course.get_standing_contribution())
+                taken_courses.append(taken_course)
+            self.bulk_create(taken_courses)
+            AcademicStanding.objects.apply_deltas(deltas)
+            if count_seats:
+                Course.objects.add_enrolled(
+                    Counter(taken_course.course_id for taken_course in taken_courses)
+                )
+        return taken_courses
+
+    def register(self, student, courses, session=None):
+        """
+        Register ``student`` for the ``courses`` queryset they do not take yet,
+        reading the courses once and inserting every row in one statement.
+        Full courses put the student on their waitlist instead. Returns the
+        number of rows added.
+        """
+        with transaction.atomic():
+            # concurrent submits of the same student queue up here, so the
+            # deltas are only applied for rows this call inserts
+            list(Student.objects.select_for_update().filter(pk=student.pk).order_by())
+            new_courses = courses.exclude(taken_courses__student=student).only(
+                "pk", "semester", "level", "credit"
+            )
+            seated, waiting = [], []
+            for course in new_courses:
+                if Course.objects.take_seat(course.pk):
+                    seated.append((student, course))
+                else:
+                    waiting.append(WaitlistEntry(student=student, course=course))
+            taken_courses = self.enrol(seated, session, count_seats=False)
+            WaitlistEntry.objects.bulk_create(waiting, ignore_conflicts=True)
+        return len(taken_courses)
+
+    def drop(self, student, course_ids):
+        """
+        Remove ``student`` from ``course_ids`` with a single DELETE. The rows'
+        standing contributions and seats are read first and taken off
+        together, as ``enrol()`` adds them. Returns the number of rows removed.
+        """
+        with transaction.atomic():
+            taken_courses = self.filter(student=student, course_id__in=course_ids)
+            rows = list(
+                taken_courses.select_for_update().values_list(
+                    "course_id",
+                    "session_id",
+                    "course__semester",
+                    "course__level",
+                    "course__credit",
+                    "point",
+                    "comment",
+                )
+            )
+            deltas = {}
+            for course_id, *contribution in rows:
+                add_standing_delta(
+                    deltas, *standing_contribution(student.pk, *contribution), sign=-1
+                )
+            with standing_updates_applied_by_caller():
+                deleted, _ = taken_courses.delete()
+            AcademicStanding.objects.apply_deltas(deltas)
+            Course.objects.add_enrolled({course_id: -1 for course_id, *_ in rows})
+        return deleted
+
+
 class TakenCourse(models.Model):
     student = models.ForeignKey(Student, on_delete=models.CASCADE)
     course = models.ForeignKey(
@@ -104,6 +293,19 @@ class TakenCourse(models.Model):
     comment = models.CharField(
         choices=COMMENT_CHOICES, max_length=200, blank=True, editable=False
     )
+    session = models.ForeignKey(
+        Session, on_delete=models.SET_NULL, blank=True, null=True
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    objects = TakenCourseManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "course"], name="unique_taken_course"
+            )
+        ]
 
     def get_absolute_url(self):
         return reverse("course_detail", kwargs={"slug": self.course.slug})
@@ -139,42 +341,64 @@ class TakenCourse(models.Model):
         grade_point = GRADE_POINT_MAPPING.get(self.grade, 0.0)
         return Decimal(credit) * Decimal(grade_point)
 
-    def save(self, *args, **kwargs):
+    def apply_grading(self):
+        """Recompute total, grade, point and comment from the raw scores."""
         self.total = self.get_total()
         self.grade = self.get_grade()
         self.point = self.get_point()
         self.comment = self.get_comment()
-        super().save(*args, **kwargs)
+
+    def get_standing_contribution(self):
+        """Return the (key, values) this row adds to its AcademicStanding."""
+        return standing_contribution(
+            self.student_id,
+            self.session_id,
+            self.course.semester,
+            self.course.level,
+            self.course.credit,
+            self.point,
+            self.comment,
+        )
+
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.session_id is None:
+            self.session = Session.objects.filter(is_current_session=True).first()
+        self.apply_grading()
+
+        deltas = {}
+        if not self._state.adding:
+            previous = (
+                TakenCourse.objects.filter(pk=self.pk)
+                .values_list(
+                    "student_id",
+                    "session_id",
+                    "course__semester",
+                    "course__level",
+                    "course__credit",
+                    "point",
+                    "comment",
+                )
+                .first()
+            )
+            if previous:
+                add_standing_delta(deltas, *standing_contribution(*previous), sign=-1)
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            add_standing_delta(deltas, *self.get_standing_contribution())
+            AcademicStanding.objects.apply_deltas(deltas)
+            if adding:
+                Course.objects.add_enrolled({self.course_id: 1})
 
     def calculate_gpa(self):
         current_semester = Semester.objects.filter(is_current_semester=True).first()
         if not current_semester:
             return Decimal("0.00")
-
-        taken_courses = TakenCourse.objects.filter(
-            student=self.student,
-            course__level=self.student.level,
-            course__semester=current_semester.semester,
-        )
-
-        total_points = sum(tc.point for tc in taken_courses)
-        total_credits = sum(tc.course.credit for tc in taken_courses)
-
-        if total_credits > 0:
-            gpa = total_points / Decimal(total_credits)
-            return round(gpa, 2)
-        return Decimal("0.00")
+        averages = TakenCourse.objects.gpa_for(self.student_id, current_semester)
+        return averages[self.student_id]["gpa"]
 
     def calculate_cgpa(self):
-        taken_courses = TakenCourse.objects.filter(student=self.student)
-
-        total_points = sum(tc.point for tc in taken_courses)
-        total_credits = sum(tc.course.credit for tc in taken_courses)
-
-        if total_credits > 0:
-            cgpa = total_points / Decimal(total_credits)
-            return round(cgpa, 2)
-        return Decimal("0.00")
+        return TakenCourse.objects.gpa_for(self.student_id)[self.student_id]["cgpa"]
 
 
 class Result(models.Model):
@@ -187,3 +411,244 @@ class Result(models.Model):
 
     def __str__(self):
         return f"Result for {self.student} - Semester: {self.semester}, Level: {self.level}"
+
+
+_standing_updates = threading.local()
+
+
+@contextmanager
+def standing_updates_applied_by_caller():
+    """
+    Skip ``remove_taken_course_standing`` for the TakenCourse rows deleted in
+    this block; the caller takes them off the standings and seats in bulk.
+    """
+    previous = getattr(_standing_updates, "applied_by_caller", False)
+    _standing_updates.applied_by_caller = True
+    try:
+        yield
+    finally:
+        _standing_updates.applied_by_caller = previous
+
+
+@receiver(post_delete, sender=TakenCourse)
+def remove_taken_course_standing(sender, instance, **kwargs):
+    if getattr(_standing_updates, "applied_by_caller", False):
+        return
+    deltas = add_standing_delta({}, *instance.get_standing_contribution(), sign=-1)
+    AcademicStanding.objects.apply_deltas(deltas)
+    Course.objects.add_enrolled({instance.course_id: -1})
+
+
+@receiver(pre_delete, sender=Session)
+def note_session_students(sender, instance, **kwargs):
+    # TakenCourse.session is nulled while the session's standings cascade,
+    # so remember whose standings have to be rebuilt once the delete is done
+    instance._standing_student_ids = set(
+        TakenCourse.objects.filter(session=instance).values_list(
+            "student_id", flat=True
+        )
+    )
+
+
+@receiver(post_delete, sender=Session)
+def rebuild_session_standings(sender, instance, **kwargs):
+    student_ids = getattr(instance, "_standing_student_ids", None)
+    if student_ids:
+        AcademicStanding.objects.rebuild(students=student_ids)
+
+
+class AcademicStandingManager(models.Manager):
+    def apply_deltas(self, deltas):
+        """
+        Apply ``{(student_id, session_id, semester, level): (attempted, earned,
+        points)}`` increments to the standing table.
+
+        The affected students' standings are loaded once and locked, the
+        deltas are added in memory and GPA/CGPA are re-folded over the
+        student's per-semester totals, so no TakenCourse rows are re-read.
+        """
+        deltas = {key: values for key, values in deltas.items() if any(values)}
+        if not deltas:
+            return
+        student_ids = {key[0] for key in deltas}
+        with transaction.atomic():
+            standings = {
+                standing.key: standing
+                for standing in self.select_for_update().filter(
+                    student_id__in=student_ids
+                )
+            }
+            created = []
+            for key, (attempted, earned, points) in deltas.items():
+                standing = standings.get(key)
+                if standing is None:
+                    if attempted <= 0:
+                        # nothing recorded to subtract from, e.g. the student
+                        # is being deleted together with their standings
+                        continue
+                    student_id, session_id, semester, level = key
+                    standing = self.model(
+                        student_id=student_id,
+                        session_id=session_id,
+                        semester=semester,
+                        level=level,
+                    )
+                    standings[key] = standing
+                    created.append(standing)
+                standing.credits_attempted += attempted
+                standing.credits_earned += earned
+                standing.points += points
+
+            by_student = defaultdict(list)
+            for standing in standings.values():
+                by_student[standing.student_id].append(standing)
+            for student_standings in by_student.values():
+                cumulative_points = Decimal("0.00")
+                cumulative_credits = 0
+                for standing in sorted(student_standings, key=lambda s: s.sort_key):
+                    cumulative_points += standing.points
+                    cumulative_credits += standing.credits_attempted
+                    standing.gpa = _grade_point_average(
+                        standing.points, standing.credits_attempted
+                    )
+                    standing.cgpa = _grade_point_average(
+                        cumulative_points, cumulative_credits
+                    )
+
+            to_update = [standing for standing in standings.values() if standing.pk]
+            self.bulk_create(created)
+            self.bulk_update(to_update, AcademicStanding.TOTAL_FIELDS)
+
+    def rebuild(self, students=None):
+        """Recompute standings from scratch, e.g. after course credits change."""
+        taken_courses = TakenCourse.objects.all()
+        standings = self.all()
+        if students is not None:
+            taken_courses = taken_courses.filter(student__in=students)
+            standings = standings.filter(student__in=students)
+        deltas = {}
+        for row in taken_courses.values_list(
+            "student_id",
+            "session_id",
+            "course__semester",
+            "course__level",
+            "course__credit",
+            "point",
+            "comment",
+        ).iterator():
+            add_standing_delta(deltas, *standing_contribution(*row))
+        with transaction.atomic():
+            standings.delete()
+            self.apply_deltas(deltas)
+
+
+class AcademicStanding(models.Model):
+    """
+    Denormalized per (student, session, semester, level) totals, kept up to
+    date from TakenCourse changes so transcript pages are a single read.
+    """
+
+    TOTAL_FIELDS = ["credits_attempted", "credits_earned", "points", "gpa", "cgpa"]
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    session = models.ForeignKey(
+        Session, on_delete=models.CASCADE, blank=True, null=True
+    )
+    semester = models.CharField(max_length=100, choices=settings.SEMESTER_CHOICES)
+    level = models.CharField(max_length=25, choices=settings.LEVEL_CHOICES, null=True)
+    credits_attempted = models.IntegerField(default=0)
+    credits_earned = models.IntegerField(default=0)
+    points = models.DecimalField(
+        max_digits=8, decimal_places=2, default=Decimal("0.00")
+    )
+    gpa = models.DecimalField(max_digits=4, decimal_places=2, default=Decimal("0.00"))
+    cgpa = models.DecimalField(max_digits=4, decimal_places=2, default=Decimal("0.00"))
+
+    objects = AcademicStandingManager()
+
+    class Meta:
+        ordering = ("session", "semester")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "session", "semester", "level"],
+                name="unique_academic_standing",
+            )
+        ]
+
+    def __str__(self):
+        return f"Standing for {self.student} - {self.session} {self.semester} ({self.level})"
+
+    @property
+    def key(self):
+        return (self.student_id, self.session_id, self.semester, self.level)
+
+    @property
+    def sort_key(self):
+        return (self.session_id or 0, SEMESTER_ORDER.get(self.semester, 0))
+
+
+class WaitlistEntry(models.Model):
+    """A student waiting for a seat in a full course, served oldest first."""
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    course = models.ForeignKey(
+        Course, on_delete=models.CASCADE, related_name="waitlist_entries"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ("created_at", "pk")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["student", "course"], name="unique_waitlist_entry"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.student} waiting for {self.course}"
+
+
+class RegistrationRequest(models.Model):
+    """
+    A course registration or drop submitted while registration is queued
+    (``COURSE_REGISTRATION_QUEUE``) and applied by
+    ``manage.py registration_worker``.
+    """
+
+    REGISTER = "register"
+    DROP = "drop"
+
+    ACTION_CHOICES = (
+        (REGISTER, _("Register")),
+        (DROP, _("Drop")),
+    )
+
+    PENDING = "pending"
+    DONE = "done"
+    REJECTED = "rejected"
+
+    STATUS_CHOICES = (
+        (PENDING, _("Pending")),
+        (DONE, _("Done")),
+        (REJECTED, _("Rejected")),
+    )
+
+    student = models.ForeignKey(Student, on_delete=models.CASCADE)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    course_ids = models.JSONField(default=list)
+    status = models.CharField(
+        max_length=10, choices=STATUS_CHOICES, default=PENDING, db_index=True
+    )
+    # the courses that could not be applied, and why
+    message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ("created_at",)
+
+    def __str__(self):
+        return f"{self.action} #{self.pk} for {self.student} ({self.status})"
+
+    def get_absolute_url(self):
+        return reverse("course_registration_status", kwargs={"pk": self.pk})
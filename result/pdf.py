@@ -0,0 +1,547 @@
+import hashlib
+from functools import lru_cache
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_JUSTIFY, TA_LEFT, TA_RIGHT
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch
+from reportlab.platypus import (
+    Image,
+    Paragraph,
+    SimpleDocTemplate,
+    Spacer,
+    Table,
+    TableStyle,
+)
+
+from accounts.models import Student, User
+from core.models import Semester, Session
+from course.models import Course, CourseAllocation
+from .models import FAIL, PASS, F, TakenCourse
+
+CM = 2.54
+
+RESULT_SHEET_HEADER = (
+    "S/N",
+    "ID NO.",
+    "FULL NAME",
+    "TOTAL",
+    "GRADE",
+    "POINT",
+    "COMMENT",
+)
+RESULT_SHEET_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+@lru_cache(maxsize=None)
+def get_result_sheet_styles():
+    """Paragraph and table styles shared by every result sheet in the process."""
+    normal = getSampleStyleSheet()["Normal"]
+    return {
+        "normal": normal,
+        "title": ParagraphStyle(
+            name="ResultSheetTitle",
+            parent=normal,
+            alignment=TA_CENTER,
+            fontName="Helvetica",
+            fontSize=12,
+            leading=15,
+        ),
+        "subtitle": ParagraphStyle(
+            name="ResultSheetSubtitle",
+            parent=normal,
+            alignment=TA_CENTER,
+            fontName="Helvetica",
+            fontSize=10,
+            leading=15,
+        ),
+        "right": ParagraphStyle(name="right", parent=normal, alignment=TA_RIGHT),
+        "table": (
+            # header row
+            ("BACKGROUND", (0, 0), (-1, 0), colors.black),
+            ("TEXTCOLOR", (1, 0), (-1, 0), colors.white),
+            ("TEXTCOLOR", (0, 0), (0, 0), colors.cyan),
+            ("ALIGN", (0, 0), (-1, 0), "CENTER"),
+            ("VALIGN", (0, 0), (-1, 0), "MIDDLE"),
+            # body rows
+            ("INNERGRID", (0, 1), (-1, -1), 0.05, colors.black),
+            ("BOX", (0, 0), (-1, -1), 0.1, colors.black),
+        ),
+    }
+
+
+def result_sheet_fingerprint(course, semester, session, lecturer):
+    """
+    Hash everything the sheet depends on: the course, term, lecturer and
+    the latest modification of its TakenCourse rows.
+    """
+    state = TakenCourse.objects.filter(course=course).aggregate(
+        last_modified=Max("updated_at"), rows=Count("id")
+    )
+    key = "|".join(
+        str(part)
+        for part in (
+            course.pk,
+            semester,
+            session,
+            lecturer.pk,
+            state["last_modified"],
+            state["rows"],
+        )
+    )
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def build_result_sheet(course, semester, session, lecturer):
+    """Render the result sheet of ``course`` and return the PDF bytes."""
+    styles = get_result_sheet_styles()
+    taken_courses = (
+        TakenCourse.objects.filter(course=course)
+        .select_related("student__student")
+        .order_by("pk")
+    )
+
+    rows = [RESULT_SHEET_HEADER]
+    table_style = list(styles["table"])
+    no_of_pass = no_of_fail = 0
+    for count, taken_course in enumerate(taken_courses, start=1):
+        user = taken_course.student.student
+        rows.append(
+            (
+                count,
+                user.username.upper(),
+                Paragraph(user.get_full_name.capitalize(), styles["normal"]),
+                taken_course.total,
+                taken_course.grade,
+                taken_course.point,
+                taken_course.comment,
+            )
+        )
+        if taken_course.grade == F:
+            table_style.append(("TEXTCOLOR", (0, count), (-1, count), colors.red))
+        if taken_course.comment == PASS:
+            no_of_pass += 1
+        elif taken_course.comment == FAIL:
+            no_of_fail += 1
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer,
+        rightMargin=0,
+        leftMargin=6.5 * CM,
+        topMargin=0.3 * CM,
+        bottomMargin=0,
+    )
+
+    logo = Image(settings.STATICFILES_DIRS[0] + "/img/brand.png", 1 * inch, 1 * inch)
+    logo._offs_x = -200
+    logo._offs_y = -45
+    title = f"<b> {semester} Semester {session} Result Sheet</b>"
+    story = [
+        Spacer(1, 0.2),
+        logo,
+        Paragraph(title.upper(), styles["title"]),
+        Spacer(1, 0.1 * inch),
+        Paragraph(
+            f"<b>Course lecturer: {lecturer.get_full_name}</b>".upper(),
+            styles["subtitle"],
+        ),
+        Spacer(1, 0.1 * inch),
+        Paragraph(f"<b>Level: </b>{course.level}".upper(), styles["subtitle"]),
+        Spacer(1, 0.6 * inch),
+        Table(
+            rows,
+            colWidths=[inch] * len(RESULT_SHEET_HEADER),
+            rowHeights=[0.5 * inch] + [None] * (len(rows) - 1),
+            repeatRows=1,
+            style=table_style,
+        ),
+        Spacer(1, 1 * inch),
+        Table(
+            [
+                [
+                    Paragraph(
+                        "<b>Date:</b>_____________________________", styles["normal"]
+                    ),
+                    Paragraph(f"<b>No. of PASS:</b> {no_of_pass}", styles["right"]),
+                ],
+                [
+                    Paragraph(
+                        "<b>Siganture / Stamp:</b> _____________________________",
+                        styles["normal"],
+                    ),
+                    Paragraph(f"<b>No. of FAIL: </b>{no_of_fail}", styles["right"]),
+                ],
+            ]
+        ),
+    ]
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def render_result_sheet(course, semester, session, lecturer):
+    """
+    Return the result sheet PDF, reusing the cached copy while none of the
+    course's TakenCourse rows have changed.
+    """
+    cache_key = "result_sheet:" + result_sheet_fingerprint(
+        course, semester, session, lecturer
+    )
+    pdf = cache.get(cache_key)
+    if pdf is None:
+        pdf = build_result_sheet(course, semester, session, lecturer)
+        cache.set(cache_key, pdf, RESULT_SHEET_CACHE_TIMEOUT)
+    return pdf
+
+
+def result_sheet_filename(course, semester, session):
+    fname = f"{semester}_semester_{session}_{course}_resultSheet.pdf"
+    return fname.replace("/", "-")
+
+
+def result_sheet_job(course_id, semester_id, session_id, lecturer_id):
+    """PdfJob renderer for a single result sheet."""
+    course = Course.objects.get(pk=course_id)
+    semester = Semester.objects.get(pk=semester_id)
+    session = Session.objects.get(pk=session_id)
+    lecturer = User.objects.get(pk=lecturer_id)
+    return (
+        result_sheet_filename(course, semester, session),
+        render_result_sheet(course, semester, session, lecturer),
+    )
+
+
+def result_sheets_batch(semester_id, session_id):
+    """
+    PdfJob fan-out for every allocated course of a semester: one
+    ``result_sheet`` job per (course, lecturer) pair.
+    """
+    semester = Semester.objects.get(pk=semester_id)
+    allocations = (
+        CourseAllocation.objects.filter(
+            courses__semester=semester.semester, courses__taken_courses__isnull=False
+        )
+        .values_list("courses", "lecturer")
+        .distinct()
+    )
+    return [
+        (
+            "result_sheet",
+            {
+                "course_id": course_id,
+                "semester_id": semester_id,
+                "session_id": session_id,
+                "lecturer_id": lecturer_id,
+            },
+        )
+        for course_id, lecturer_id in allocations
+    ]
+
+
+def registration_form_filename(user):
+    return (user.username + ".pdf").replace("/", "-")
+
+
+def registration_form_job(user_id):
+    """PdfJob renderer for a student's course registration form."""
+    user = User.objects.get(pk=user_id)
+    return registration_form_filename(user), build_registration_form(user)
+
+
+def build_registration_form(user):
+    """Render the course registration form of ``user`` and return the PDF bytes."""
+    current_session = Session.objects.get(is_current_session=True)
+    courses = TakenCourse.objects.filter(student__student__id=user.id).select_related(
+        "course"
+    )
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, rightMargin=15, leftMargin=15, topMargin=0, bottomMargin=0
+    )
+    styles = getSampleStyleSheet()
+
+    Story = [Spacer(1, 0.5)]
+    Story.append(Spacer(1, 0.4 * inch))
+    style = styles["Normal"]
+
+    style = getSampleStyleSheet()
+    normal = style["Normal"]
+    normal.alignment = TA_CENTER
+    normal.fontName = "Helvetica"
+    normal.fontSize = 12
+    normal.leading = 18
+    title = "<b>EZOD UNIVERSITY OF TECHNOLOGY, ADAMA</b>"  # TODO: Make this dynamic
+    title = Paragraph(title.upper(), normal)
+    Story.append(title)
+    style = getSampleStyleSheet()
+
+    school = style["Normal"]
+    school.alignment = TA_CENTER
+    school.fontName = "Helvetica"
+    school.fontSize = 10
+    school.leading = 18
+    school_title = (
+        "<b>SCHOOL OF ELECTRICAL ENGINEERING & COMPUTING</b>"  # TODO: Make this dynamic
+    )
+    school_title = Paragraph(school_title.upper(), school)
+    Story.append(school_title)
+
+    style = getSampleStyleSheet()
+    Story.append(Spacer(1, 0.1 * inch))
+    department = style["Normal"]
+    department.alignment = TA_CENTER
+    department.fontName = "Helvetica"
+    department.fontSize = 9
+    department.leading = 18
+    department_title = (
+        "<b>DEPARTMENT OF COMPUTER SCIENCE & ENGINEERING</b>"  # TODO: Make this dynamic
+    )
+    department_title = Paragraph(department_title, department)
+    Story.append(department_title)
+    Story.append(Spacer(1, 0.3 * inch))
+
+    title = "<b><u>STUDENT COURSE REGISTRATION FORM</u></b>"
+    title = Paragraph(title.upper(), normal)
+    Story.append(title)
+    student = Student.objects.get(student__pk=user.id)
+
+    tbl_data = [
+        [
+            Paragraph(
+                "<b>Registration Number : " + user.username.upper() + "</b>",
+                styles["Normal"],
+            )
+        ],
+        [
+            Paragraph(
+                "<b>Name : " + user.get_full_name.upper() + "</b>",
+                styles["Normal"],
+            )
+        ],
+        [
+            Paragraph(
+                "<b>Session : " + current_session.session.upper() + "</b>",
+                styles["Normal"],
+            ),
+            Paragraph("<b>Level: " + student.level + "</b>", styles["Normal"]),
+        ],
+    ]
+    tbl = Table(tbl_data)
+    Story.append(tbl)
+    Story.append(Spacer(1, 0.6 * inch))
+
+    style = getSampleStyleSheet()
+    semester = style["Normal"]
+    semester.alignment = TA_LEFT
+    semester.fontName = "Helvetica"
+    semester.fontSize = 9
+    semester.leading = 18
+    semester_title = "<b>FIRST SEMESTER</b>"
+    semester_title = Paragraph(semester_title, semester)
+    Story.append(semester_title)
+
+    # FIRST SEMESTER
+    count = 0
+    header = [
+        (
+            "S/No",
+            "Course Code",
+            "Course Title",
+            "Unit",
+            Paragraph("Name, Siganture of course lecturer & Date", style["Normal"]),
+        )
+    ]
+    table_header = Table(header, 1 * [1.4 * inch], 1 * [0.5 * inch])
+    table_header.setStyle(
+        TableStyle(
+            [
+                ("ALIGN", (-2, -2), (-2, -2), "CENTER"),
+                ("VALIGN", (-2, -2), (-2, -2), "MIDDLE"),
+                ("ALIGN", (1, 0), (1, 0), "CENTER"),
+                ("VALIGN", (1, 0), (1, 0), "MIDDLE"),
+                ("ALIGN", (0, 0), (0, 0), "CENTER"),
+                ("VALIGN", (0, 0), (0, 0), "MIDDLE"),
+                ("ALIGN", (-4, 0), (-4, 0), "LEFT"),
+                ("VALIGN", (-4, 0), (-4, 0), "MIDDLE"),
+                ("ALIGN", (-3, 0), (-3, 0), "LEFT"),
+                ("VALIGN", (-3, 0), (-3, 0), "MIDDLE"),
+                ("TEXTCOLOR", (0, -1), (-1, -1), colors.black),
+                ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.black),
+                ("BOX", (0, 0), (-1, -1), 0.25, colors.black),
+            ]
+        )
+    )
+    Story.append(table_header)
+
+    first_semester_unit = 0
+    for course in courses:
+        if course.course.semester == settings.FIRST:
+            first_semester_unit += int(course.course.credit)
+            data = [
+                (
+                    count + 1,
+                    course.course.code.upper(),
+                    Paragraph(course.course.title, style["Normal"]),
+                    course.course.credit,
+                    "",
+                )
+            ]
+            count += 1
+            table_body = Table(data, 1 * [1.4 * inch], 1 * [0.3 * inch])
+            table_body.setStyle(
+                TableStyle(
+                    [
+                        ("ALIGN", (-2, -2), (-2, -2), "CENTER"),
+                        ("ALIGN", (1, 0), (1, 0), "CENTER"),
+                        ("ALIGN", (0, 0), (0, 0), "CENTER"),
+                        ("ALIGN", (-4, 0), (-4, 0), "LEFT"),
+                        ("TEXTCOLOR", (0, -1), (-1, -1), colors.black),
+                        ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.black),
+                        ("BOX", (0, 0), (-1, -1), 0.25, colors.black),
+                    ]
+                )
+            )
+            Story.append(table_body)
+
+    style = getSampleStyleSheet()
+    semester = style["Normal"]
+    semester.alignment = TA_LEFT
+    semester.fontName = "Helvetica"
+    semester.fontSize = 8
+    semester.leading = 18
+    semester_title = (
+        "<b>Total Second First Credit : " + str(first_semester_unit) + "</b>"
+    )
+    semester_title = Paragraph(semester_title, semester)
+    Story.append(semester_title)
+
+    # FIRST SEMESTER ENDS HERE
+    Story.append(Spacer(1, 0.6 * inch))
+
+    style = getSampleStyleSheet()
+    semester = style["Normal"]
+    semester.alignment = TA_LEFT
+    semester.fontName = "Helvetica"
+    semester.fontSize = 9
+    semester.leading = 18
+    semester_title = "<b>SECOND SEMESTER</b>"
+    semester_title = Paragraph(semester_title, semester)
+    Story.append(semester_title)
+    # SECOND SEMESTER
+    count = 0
+    header = [
+        (
+            "S/No",
+            "Course Code",
+            "Course Title",
+            "Unit",
+            Paragraph(
+                "<b>Name, Signature of course lecturer & Date</b>", style["Normal"]
+            ),
+        )
+    ]
+    table_header = Table(header, 1 * [1.4 * inch], 1 * [0.5 * inch])
+    table_header.setStyle(
+        TableStyle(
+            [
+                ("ALIGN", (-2, -2), (-2, -2), "CENTER"),
+                ("VALIGN", (-2, -2), (-2, -2), "MIDDLE"),
+                ("ALIGN", (1, 0), (1, 0), "CENTER"),
+                ("VALIGN", (1, 0), (1, 0), "MIDDLE"),
+                ("ALIGN", (0, 0), (0, 0), "CENTER"),
+                ("VALIGN", (0, 0), (0, 0), "MIDDLE"),
+                ("ALIGN", (-4, 0), (-4, 0), "LEFT"),
+                ("VALIGN", (-4, 0), (-4, 0), "MIDDLE"),
+                ("ALIGN", (-3, 0), (-3, 0), "LEFT"),
+                ("VALIGN", (-3, 0), (-3, 0), "MIDDLE"),
+                ("TEXTCOLOR", (0, -1), (-1, -1), colors.black),
+                ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.black),
+                ("BOX", (0, 0), (-1, -1), 0.25, colors.black),
+            ]
+        )
+    )
+    Story.append(table_header)
+
+    second_semester_unit = 0
+    for course in courses:
+        if course.course.semester == settings.SECOND:
+            second_semester_unit += int(course.course.credit)
+            data = [
+                (
+                    count + 1,
+                    course.course.code.upper(),
+                    Paragraph(course.course.title, style["Normal"]),
+                    course.course.credit,
+                    "",
+                )
+            ]
+            # color = colors.black
+            count += 1
+            table_body = Table(data, 1 * [1.4 * inch], 1 * [0.3 * inch])
+            table_body.setStyle(
+                TableStyle(
+                    [
+                        ("ALIGN", (-2, -2), (-2, -2), "CENTER"),
+                        ("ALIGN", (1, 0), (1, 0), "CENTER"),
+                        ("ALIGN", (0, 0), (0, 0), "CENTER"),
+                        ("ALIGN", (-4, 0), (-4, 0), "LEFT"),
+                        ("TEXTCOLOR", (0, -1), (-1, -1), colors.black),
+                        ("INNERGRID", (0, 0), (-1, -1), 0.25, colors.black),
+                        ("BOX", (0, 0), (-1, -1), 0.25, colors.black),
+                    ]
+                )
+            )
+            Story.append(table_body)
+
+    style = getSampleStyleSheet()
+    semester = style["Normal"]
+    semester.alignment = TA_LEFT
+    semester.fontName = "Helvetica"
+    semester.fontSize = 8
+    semester.leading = 18
+    semester_title = (
+        "<b>Total Second Semester Credit : " + str(second_semester_unit) + "</b>"
+    )
+    semester_title = Paragraph(semester_title, semester)
+    Story.append(semester_title)
+
+    Story.append(Spacer(1, 2))
+    style = getSampleStyleSheet()
+    certification = style["Normal"]
+    certification.alignment = TA_JUSTIFY
+    certification.fontName = "Helvetica"
+    certification.fontSize = 8
+    certification.leading = 18
+    certification_text = (
+        "CERTIFICATION OF REGISTRATION: I certify that <b>"
+        + str(user.get_full_name.upper())
+        + "</b>\
+    has been duly registered for the <b>"
+        + student.level
+        + " level </b> of study in the department\
+    of COMPUTER SICENCE & ENGINEERING and that the courses and credits \
+    registered are as approved by the senate of the University"
+    )
+    certification_text = Paragraph(certification_text, certification)
+    Story.append(certification_text)
+
+    # FIRST SEMESTER ENDS HERE
+
+    logo = settings.STATICFILES_DIRS[0] + "/img/brand.png"
+    im_logo = Image(logo, 1 * inch, 1 * inch)
+    setattr(im_logo, "_offs_x", -218)
+    setattr(im_logo, "_offs_y", 480)
+    Story.append(im_logo)
+
+    picture = settings.BASE_DIR + user.get_picture()
+    im = Image(picture, 1.0 * inch, 1.0 * inch)
+    setattr(im, "_offs_x", 218)
+    setattr(im, "_offs_y", 550)
+    Story.append(im)
+
+    doc.build(Story)
+    return buffer.getvalue()
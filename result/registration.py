@@ -0,0 +1,231 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.urls import reverse
+from django.utils.timezone import now
+
+from accounts.models import Student
+from core.models import Session
+from course.models import Course
+from .models import RegistrationRequest, TakenCourse, WaitlistEntry
+
+REGISTRATION_BATCH_SIZE = 200
+
+
+def enqueue_registration(student, action, course_ids):
+    return RegistrationRequest.objects.create(
+        student=student, action=action, course_ids=[int(i) for i in course_ids]
+    )
+
+
+def request_status(registration):
+    return {
+        "id": registration.pk,
+        "action": registration.action,
+        "status": registration.status,
+        "message": registration.message,
+        "status_url": reverse(
+            "course_registration_status", kwargs={"pk": registration.pk}
+        ),
+    }
+
+
+def registered_credits(student_ids):
+    """``{(student_id, level, semester): credits}`` the students already take."""
+    return Counter(
+        {
+            (student_id, level, semester): total
+            for student_id, level, semester, total in TakenCourse.objects.filter(
+                student_id__in=student_ids
+            )
+            .values_list("student_id", "course__level", "course__semester")
+            .annotate(total=Sum("course__credit"))
+            .order_by()
+        }
+    )
+
+
+def lock_students(student_ids):
+    """
+    Lock the students' rows for the transaction. Students are always locked
+    before courses, the order ``TakenCourse.objects.register()`` takes them.
+    """
+    list(
+        Student.objects.select_for_update()
+        .filter(pk__in=student_ids)
+        .order_by("pk")
+        .values_list("pk")
+    )
+
+
+def over_credit_limit(credits, student, course):
+    max_credits = settings.COURSE_REGISTRATION_MAX_CREDITS
+    key = (student.pk, course.level, course.semester)
+    return bool(max_credits) and credits[key] + course.credit > max_credits
+
+
+def apply_registration_requests(registrations):
+    """
+    Apply a batch of queued requests, oldest first, in one transaction.
+
+    Seats (from ``Course.enrolled_count``) and credits are read once for the
+    whole batch, with the students and courses locked, and then tracked in
+    memory, so a request only sees the capacity left by the ones before it.
+    Full courses put the student on the waitlist; courses over the credit
+    limit or no longer offered to the student are skipped. Both are named in
+    the request's message. Returns the number of courses registered.
+    """
+    student_ids = {r.student_id for r in registrations}
+    course_ids = {pk for r in registrations for pk in r.course_ids}
+    session = Session.objects.filter(is_current_session=True).first()
+
+    with transaction.atomic():
+        lock_students(student_ids)
+        courses = (
+            Course.objects.select_for_update()
+            .only(
+                "pk",
+                "title",
+                "program",
+                "level",
+                "semester",
+                "credit",
+                "capacity",
+                "enrolled_count",
+            )
+            .in_bulk(course_ids)
+        )
+        taken = set(
+            TakenCourse.objects.filter(student_id__in=student_ids).values_list(
+                "student_id", "course_id"
+            )
+        )
+        credits = registered_credits(student_ids)
+
+        pairs, waiting, registered = [], [], 0
+        for registration in registrations:
+            student = registration.student
+            if registration.action == RegistrationRequest.DROP:
+                # earlier registrations of the batch go in before the drop
+                registered += len(TakenCourse.objects.enrol(pairs, session))
+                pairs = []
+                TakenCourse.objects.drop(student, registration.course_ids)
+                for course_id in registration.course_ids:
+                    if (student.pk, course_id) in taken:
+                        course = courses[course_id]
+                        taken.discard((student.pk, course_id))
+                        course.enrolled_count -= 1
+                        credits[
+                            student.pk, course.level, course.semester
+                        ] -= course.credit
+                continue
+
+            notes, added = [], 0
+            for course_id in registration.course_ids:
+                course = courses.get(course_id)
+                if course is None or (student.pk, course_id) in taken:
+                    continue
+                if (course.program_id, course.level) != (
+                    student.program_id,
+                    student.level,
+                ):
+                    notes.append(f"{course.title}: not offered to you")
+                elif over_credit_limit(credits, student, course):
+                    notes.append(f"{course.title}: over the credit limit")
+                elif course.seats_left == 0:
+                    notes.append(f"{course.title}: full, you are on the waitlist")
+                    waiting.append(WaitlistEntry(student=student, course=course))
+                    added += 1
+                else:
+                    pairs.append((student, course))
+                    added += 1
+                    taken.add((student.pk, course_id))
+                    course.enrolled_count += 1
+                    credits[student.pk, course.level, course.semester] += course.credit
+            registration.message = "\n".join(notes)
+            if notes and not added:
+                registration.status = RegistrationRequest.REJECTED
+        registered += len(TakenCourse.objects.enrol(pairs, session))
+        WaitlistEntry.objects.bulk_create(waiting, ignore_conflicts=True)
+
+        processed_at = now()
+        for registration in registrations:
+            if registration.status == RegistrationRequest.PENDING:
+                registration.status = RegistrationRequest.DONE
+            registration.processed_at = processed_at
+        RegistrationRequest.objects.bulk_update(
+            registrations, ["status", "message", "processed_at"]
+        )
+    return registered
+
+
+def process_registration_queue(batch_size=REGISTRATION_BATCH_SIZE):
+    """Apply the oldest pending requests; returns how many were processed."""
+    registrations = list(
+        RegistrationRequest.objects.filter(status=RegistrationRequest.PENDING)
+        .select_related("student")
+        .order_by("pk")[:batch_size]
+    )
+    if registrations:
+        apply_registration_requests(registrations)
+    return len(registrations)
+
+
+def promote_waitlist(batch_size=REGISTRATION_BATCH_SIZE, course_ids=None):
+    """
+    Give the free seats of courses (all, or ``course_ids``) to their
+    waitlists, oldest entry first, promoting at most ``batch_size`` students
+    in one transaction. Entries that would go over the credit limit keep
+    waiting. Returns the number of students promoted.
+    """
+    has_seat = Q(capacity__isnull=True) | Q(enrolled_count__lt=F("capacity"))
+    if course_ids is not None:
+        has_seat &= Q(pk__in=course_ids)
+    with transaction.atomic():
+        student_ids = set(
+            WaitlistEntry.objects.filter(
+                course__in=Course.objects.filter(has_seat)
+            ).values_list("student_id", flat=True)
+        )
+        if not student_ids:
+            return 0
+        lock_students(student_ids)
+        waiting = WaitlistEntry.objects.filter(student_id__in=student_ids)
+        # locked until the promotions are counted in, so a concurrent
+        # Course.objects.take_seat() cannot fill the same seats
+        seats = {
+            course.pk: course.seats_left
+            for course in Course.objects.select_for_update()
+            .filter(has_seat, pk__in=waiting.values("course_id"))
+            .only("pk", "capacity", "enrolled_count")
+        }
+        if not seats:
+            return 0
+        entries = list(
+            waiting.filter(course__in=seats).select_related("student", "course")
+        )
+        taken = set(
+            TakenCourse.objects.filter(
+                student_id__in=student_ids, course__in=seats
+            ).values_list("student_id", "course_id")
+        )
+        credits = registered_credits(student_ids)
+
+        pairs, done = [], []
+        for entry in entries:
+            student, course = entry.student, entry.course
+            if (student.pk, course.pk) in taken:
+                done.append(entry.pk)  # registered since
+            elif len(pairs) >= batch_size or seats[course.pk] == 0:
+                continue
+            elif not over_credit_limit(credits, student, course):
+                pairs.append((student, course))
+                done.append(entry.pk)
+                if seats[course.pk] is not None:
+                    seats[course.pk] -= 1
+                credits[student.pk, course.level, course.semester] += course.credit
+        TakenCourse.objects.enrol(pairs)
+        WaitlistEntry.objects.filter(pk__in=done).delete()
+    return len(pairs)
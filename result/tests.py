@@ -1,3 +1,494 @@
-from django.test import TestCase
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import Student
+from core.models import Semester, Session
+from course.models import Course, Program
+from result.models import (
+    AcademicStanding,
+    RegistrationRequest,
+    Result,
+    TakenCourse,
+    WaitlistEntry,
+)
+from result.pdf import render_result_sheet, result_sheet_fingerprint
+from result.registration import (
+    enqueue_registration,
+    process_registration_queue,
+    promote_waitlist,
+)
+from result.utils import record_scores
+
+User = get_user_model()
+
+
+class RecordScoresTests(TestCase):
+    def setUp(self):
+        self.session = Session.objects.create(
+            session="2024/2025", is_current_session=True
+        )
+        self.semester = Semester.objects.create(
+            semester="First", is_current_semester=True, session=self.session
+        )
+        self.program = Program.objects.create(title="Computer Science")
+        self.course = Course.objects.create(
+            title="Algorithms",
+            code="CS101",
+            credit=3,
+            program=self.program,
+            level="Bachelor",
+            semester="First",
+        )
+
+    def make_taken_courses(self, count):
+        taken_courses = []
+        offset = User.objects.count()
+        for i in range(offset, offset + count):
+            user = User.objects.create_user(username=f"student{i}", password="password")
+            student = Student.objects.create(
+                student=user, level="Bachelor", program=self.program
+            )
+            taken_courses.append(
+                TakenCourse.objects.create(student=student, course=self.course)
+            )
+        return taken_courses
+
+    def score_payload(self, taken_courses, scores=("10", "20", "10", "5", "40")):
+        return {str(tc.pk): list(scores) for tc in taken_courses}
+
+    def test_scores_are_graded_and_results_upserted(self):
+        taken_course = self.make_taken_courses(1)[0]
+        record_scores(
+            self.course, self.score_payload([taken_course]), self.semester, self.session
+        )
+
+        taken_course.refresh_from_db()
+        self.assertEqual(taken_course.total, Decimal("85.00"))
+        self.assertEqual(taken_course.grade, "A")
+        self.assertEqual(taken_course.point, Decimal("12.00"))
+        self.assertEqual(taken_course.comment, "PASS")
+
+        result = Result.objects.get(student=taken_course.student)
+        self.assertEqual(result.gpa, 4.0)
+        self.assertEqual(result.cgpa, 4.0)
+
+        record_scores(
+            self.course,
+            self.score_payload([taken_course], ("0", "0", "0", "0", "30")),
+            self.semester,
+            self.session,
+        )
+        result = Result.objects.get(student=taken_course.student)
+        self.assertEqual(result.gpa, 0.0)
+
+    def test_query_count_does_not_depend_on_class_size(self):
+        small = self.make_taken_courses(2)
+        with CaptureQueriesContext(connection) as small_ctx:
+            record_scores(
+                self.course, self.score_payload(small), self.semester, self.session
+            )
+
+        TakenCourse.objects.all().delete()
+        Result.objects.all().delete()
+        large = self.make_taken_courses(12)
+        with CaptureQueriesContext(connection) as large_ctx:
+            record_scores(
+                self.course, self.score_payload(large), self.semester, self.session
+            )
+
+        self.assertEqual(len(small_ctx), len(large_ctx))
+        self.assertEqual(Result.objects.count(), 12)
+
+
+class GpaForTests(TestCase):
+    def setUp(self):
+        self.program = Program.objects.create(title="Physics")
+        self.first = Course.objects.create(
+            title="Mechanics",
+            code="PH101",
+            credit=3,
+            program=self.program,
+            level="Bachelor",
+            semester="First",
+        )
+        self.second = Course.objects.create(
+            title="Optics",
+            code="PH102",
+            credit=2,
+            program=self.program,
+            level="Bachelor",
+            semester="Second",
+        )
+        self.students = []
+        for i in range(2):
+            user = User.objects.create_user(username=f"physics{i}", password="pw")
+            self.students.append(
+                Student.objects.create(
+                    student=user, level="Bachelor", program=self.program
+                )
+            )
+
+    def test_gpa_and_cgpa_for_many_students_in_one_query(self):
+        alice, bob = self.students
+        TakenCourse.objects.create(student=alice, course=self.first, final_exam=90)
+        TakenCourse.objects.create(student=alice, course=self.second, final_exam=70)
+        TakenCourse.objects.create(student=bob, course=self.first, final_exam=10)
+
+        with self.assertNumQueries(1):
+            averages = TakenCourse.objects.gpa_for(self.students, "First")
+
+        self.assertEqual(averages[alice.pk]["gpa"], Decimal("4.00"))
+        self.assertEqual(averages[alice.pk]["cgpa"], Decimal("3.60"))
+        self.assertEqual(averages[bob.pk]["gpa"], Decimal("0.00"))
+        self.assertEqual(averages[bob.pk]["cgpa"], Decimal("0.00"))
+
+    def test_students_without_courses_get_zero(self):
+        averages = TakenCourse.objects.gpa_for(self.students[0])
+        self.assertEqual(
+            averages[self.students[0].pk],
+            {"gpa": Decimal("0.00"), "cgpa": Decimal("0.00")},
+        )
+
+
+class AcademicStandingTests(TestCase):
+    def setUp(self):
+        self.session = Session.objects.create(
+            session="2024/2025", is_current_session=True
+        )
+        self.program = Program.objects.create(title="Chemistry")
+        self.first = Course.objects.create(
+            title="Organic",
+            code="CH101",
+            credit=3,
+            program=self.program,
+            level="Bachelor",
+            semester="First",
+        )
+        self.second = Course.objects.create(
+            title="Inorganic",
+            code="CH102",
+            credit=2,
+            program=self.program,
+            level="Bachelor",
+            semester="Second",
+        )
+        user = User.objects.create_user(username="chem", password="pw")
+        self.student = Student.objects.create(
+            student=user, level="Bachelor", program=self.program
+        )
+
+    def standing(self, semester):
+        return AcademicStanding.objects.get(student=self.student, semester=semester)
+
+    def test_standing_follows_taken_course_changes(self):
+        first = TakenCourse.objects.create(student=self.student, course=self.first)
+        self.assertEqual(first.session, self.session)
+        standing = self.standing("First")
+        self.assertEqual(standing.credits_attempted, 3)
+        self.assertEqual(standing.credits_earned, 0)
+
+        first.final_exam = 90
+        first.save()
+        TakenCourse.objects.create(
+            student=self.student, course=self.second, final_exam=70
+        )
+        standing = self.standing("First")
+        self.assertEqual(standing.credits_earned, 3)
+        self.assertEqual(standing.points, Decimal("12.00"))
+        self.assertEqual(standing.gpa, Decimal("4.00"))
+        second = self.standing("Second")
+        self.assertEqual(second.gpa, Decimal("3.00"))
+        self.assertEqual(second.cgpa, Decimal("3.60"))
+
+        first.delete()
+        self.assertEqual(self.standing("First").credits_attempted, 0)
+        self.assertEqual(self.standing("Second").cgpa, Decimal("3.00"))
+
+    def test_rebuild_matches_incremental_totals(self):
+        TakenCourse.objects.create(student=self.student, course=self.first, quiz=50)
+        TakenCourse.objects.create(student=self.student, course=self.second)
+        incremental = list(
+            AcademicStanding.objects.values_list(*AcademicStanding.TOTAL_FIELDS)
+        )
+        AcademicStanding.objects.rebuild()
+        rebuilt = list(
+            AcademicStanding.objects.values_list(*AcademicStanding.TOTAL_FIELDS)
+        )
+        self.assertEqual(incremental, rebuilt)
+
+    def test_deleting_a_session_keeps_its_courses_in_the_standings(self):
+        TakenCourse.objects.create(student=self.student, course=self.first)
+        self.session.delete()
+        standing = self.standing("First")
+        self.assertIsNone(standing.session_id)
+        self.assertEqual(standing.credits_attempted, 3)
+
+    @override_settings(
+        LANGUAGE_CODE="en",
+        STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    )
+    def test_grade_result_reads_standings(self):
+        self.student.student.is_student = True
+        self.student.student.save()
+        TakenCourse.objects.create(
+            student=self.student, course=self.first, final_exam=90
+        )
+        self.client.force_login(self.student.student)
+
+        response = self.client.get(reverse("grade_results"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["total_first_semester_credit"], 3)
+        self.assertEqual(list(response.context["results"]), [self.standing("First")])
+
+    def test_register_and_drop_are_set_based(self):
+        courses = Course.objects.filter(pk__in=[self.first.pk, self.second.pk])
+        with self.assertNumQueries(16):
+            added = TakenCourse.objects.register(self.student, courses)
+        self.assertEqual(added, 2)
+        self.assertEqual(TakenCourse.objects.register(self.student, courses), 0)
+        taken = TakenCourse.objects.get(student=self.student, course=self.first)
+        self.assertEqual(taken.session, self.session)
+        self.assertEqual(taken.comment, "FAIL")
+        self.assertEqual(self.standing("First").credits_attempted, 3)
+        self.assertEqual(self.standing("Second").credits_attempted, 2)
+
+        with self.assertNumQueries(10):
+            dropped = TakenCourse.objects.drop(
+                self.student, [self.first.pk, self.second.pk]
+            )
+        self.assertEqual(dropped, 2)
+        self.assertEqual(self.standing("First").credits_attempted, 0)
+        self.assertEqual(self.standing("Second").credits_attempted, 0)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.enrolled_count, 0)
+
+    def test_enrol_skips_pairs_already_registered(self):
+        TakenCourse.objects.enrol([(self.student, self.first)])
+        again = TakenCourse.objects.enrol(
+            [(self.student, self.first), (self.student, self.second)]
+        )
+        self.assertEqual([t.course for t in again], [self.second])
+        self.assertEqual(self.standing("First").credits_attempted, 3)
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.enrolled_count, 1)
+
+    @override_settings(
+        LANGUAGE_CODE="en",
+        STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    )
+    def test_registration_page(self):
+        Semester.objects.create(
+            semester="First", is_current_semester=True, session=self.session
+        )
+        self.student.student.is_student = True
+        self.student.student.save()
+        self.client.force_login(self.student.student)
+
+        self.client.post(reverse("course_registration"), {str(self.first.pk): "3"})
+        response = self.client.get(reverse("course_registration"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context["registered_courses"], [self.first])
+        self.assertEqual(response.context["courses"], [])
+        self.assertEqual(response.context["total_registered_credit"], 3)
+        self.assertFalse(response.context["all_courses_are_registered"])
+
+        self.client.post(reverse("course_drop"), {"course_ids": [self.first.pk]})
+        self.assertFalse(TakenCourse.objects.filter(student=self.student).exists())
+
+
+class RegistrationQueueTests(TestCase):
+    def setUp(self):
+        self.session = Session.objects.create(
+            session="2024/2025", is_current_session=True
+        )
+        self.program = Program.objects.create(title="Physics")
+        self.mechanics = Course.objects.create(
+            title="Mechanics",
+            code="PH101",
+            credit=3,
+            program=self.program,
+            level="Bachelor",
+            semester="First",
+            capacity=1,
+        )
+        self.optics = Course.objects.create(
+            title="Optics",
+            code="PH102",
+            credit=4,
+            program=self.program,
+            level="Bachelor",
+            semester="First",
+        )
+
+    def make_student(self, username):
+        user = User.objects.create_user(username=username, password="pw")
+        user.is_student = True
+        user.save()
+        return Student.objects.create(
+            student=user, level="Bachelor", program=self.program
+        )
+
+    @override_settings(COURSE_REGISTRATION_MAX_CREDITS=5)
+    def test_batch_applies_capacity_and_credit_checks_in_order(self):
+        first, second = self.make_student("first"), self.make_student("second")
+        both = [self.mechanics.pk, self.optics.pk]
+        enqueue_registration(first, RegistrationRequest.REGISTER, both)
+        enqueue_registration(second, RegistrationRequest.REGISTER, both)
+        enqueue_registration(first, RegistrationRequest.DROP, [self.mechanics.pk])
+        enqueue_registration(second, RegistrationRequest.REGISTER, both)
+
+        self.assertEqual(process_registration_queue(), 4)
+
+        first_request, second_request, _, retry = RegistrationRequest.objects.all()
+        self.assertEqual(first_request.status, RegistrationRequest.DONE)
+        self.assertEqual(first_request.message, "Optics: over the credit limit")
+        self.assertEqual(second_request.status, RegistrationRequest.DONE)
+        self.assertEqual(
+            second_request.message, "Mechanics: full, you are on the waitlist"
+        )
+        # the drop freed the seat, but Optics already uses second's credits
+        self.assertEqual(retry.message, "Mechanics: over the credit limit")
+        self.assertEqual(retry.status, RegistrationRequest.REJECTED)
+        self.assertFalse(TakenCourse.objects.filter(student=first).exists())
+        self.assertEqual(
+            list(
+                TakenCourse.objects.filter(student=second).values_list(
+                    "course__code", flat=True
+                )
+            ),
+            ["PH102"],
+        )
+        standing = AcademicStanding.objects.get(student=second)
+        self.assertEqual(standing.credits_attempted, 4)
+        self.assertEqual(process_registration_queue(), 0)
+        # the free Mechanics seat would take second over the credit limit
+        self.assertEqual(promote_waitlist(), 0)
+        self.assertTrue(WaitlistEntry.objects.filter(student=second).exists())
+
+    def test_full_course_waitlist_is_promoted_when_a_seat_frees(self):
+        first, second = self.make_student("first"), self.make_student("second")
+        mechanics = Course.objects.filter(pk=self.mechanics.pk)
+
+        self.assertEqual(TakenCourse.objects.register(first, mechanics), 1)
+        self.assertEqual(TakenCourse.objects.register(second, mechanics), 0)
+        self.mechanics.refresh_from_db()
+        self.assertEqual(self.mechanics.enrolled_count, 1)
+        self.assertEqual(self.mechanics.seats_left, 0)
+        self.assertTrue(WaitlistEntry.objects.filter(student=second).exists())
+
+        TakenCourse.objects.drop(first, [self.mechanics.pk])
+        self.mechanics.refresh_from_db()
+        self.assertEqual(self.mechanics.enrolled_count, 0)
+
+        self.assertEqual(promote_waitlist(), 1)
+        self.mechanics.refresh_from_db()
+        self.assertEqual(self.mechanics.enrolled_count, 1)
+        self.assertTrue(TakenCourse.objects.filter(student=second).exists())
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    @override_settings(LANGUAGE_CODE="en")
+    def test_direct_drop_promotes_the_waitlist(self):
+        first, second = self.make_student("first"), self.make_student("second")
+        mechanics = Course.objects.filter(pk=self.mechanics.pk)
+        TakenCourse.objects.register(first, mechanics)
+        TakenCourse.objects.register(second, mechanics)
+        self.client.force_login(first.student)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse("course_drop"), {"course_ids": [self.mechanics.pk]}
+            )
+
+        self.assertTrue(TakenCourse.objects.filter(student=second).exists())
+        self.assertFalse(WaitlistEntry.objects.exists())
+
+    @override_settings(
+        COURSE_REGISTRATION_QUEUE=True,
+        LANGUAGE_CODE="en",
+        STATICFILES_STORAGE="django.contrib.staticfiles.storage.StaticFilesStorage",
+    )
+    def test_queued_registration_and_status(self):
+        Semester.objects.create(
+            semester="First", is_current_semester=True, session=self.session
+        )
+        student = self.make_student("queued")
+        self.client.force_login(student.student)
+
+        self.client.post(
+            reverse("course_registration"), {str(self.optics.pk): "4", "x": "1"}
+        )
+        self.assertFalse(TakenCourse.objects.exists())
+        registration = RegistrationRequest.objects.get()
+        self.assertEqual(registration.course_ids, [self.optics.pk])
+
+        url = reverse("course_registration_status", kwargs={"pk": registration.pk})
+        self.assertContains(self.client.get(reverse("course_registration")), url)
+        self.assertEqual(self.client.get(url).json()["status"], "pending")
+        call_command("registration_worker", once=True, stdout=StringIO())
+        self.assertEqual(self.client.get(url).json()["status"], "done")
+        self.assertTrue(TakenCourse.objects.filter(student=student).exists())
+
+
+class ResultSheetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.session = Session.objects.create(
+            session="2024/2025", is_current_session=True
+        )
+        self.semester = Semester.objects.create(
+            semester="First", is_current_semester=True, session=self.session
+        )
+        self.program = Program.objects.create(title="Biology")
+        self.course = Course.objects.create(
+            title="Genetics",
+            code="BI101",
+            credit=3,
+            program=self.program,
+            level="Bachelor",
+            semester="First",
+        )
+        self.lecturer = User.objects.create_user(username="lect", password="pw")
+        for i in range(3):
+            user = User.objects.create_user(username=f"bio{i}", password="pw")
+            student = Student.objects.create(
+                student=user, level="Bachelor", program=self.program
+            )
+            TakenCourse.objects.create(student=student, course=self.course)
+
+    def render(self):
+        return render_result_sheet(
+            self.course, self.semester, self.session, self.lecturer
+        )
+
+    def test_unchanged_sheet_is_served_from_cache(self):
+        pdf = self.render()
+        self.assertTrue(pdf.startswith(b"%PDF"))
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.render(), pdf)
+
+    def test_score_changes_invalidate_cached_sheet(self):
+        first = self.result_sheet_key()
+        taken_course = TakenCourse.objects.first()
+        record_scores(
+            self.course,
+            {str(taken_course.pk): ["10", "10", "10", "10", "10"]},
+            self.semester,
+            self.session,
+        )
+        self.assertNotEqual(first, self.result_sheet_key())
+
+    def result_sheet_key(self):
+        return result_sheet_fingerprint(
+            self.course, self.semester, self.session, self.lecturer
+        )
@@ -6,6 +6,7 @@ from .views import (
     assessment_result,
     course_registration_form,
     result_sheet_pdf_view,
+    result_sheets_pdf_view,
 )
 
 
@@ -14,6 +15,7 @@ urlpatterns = [
     path("manage-score/<int:id>/", add_score_for, name="add_score_for"),
     path("grade/", grade_result, name="grade_results"),
     path("assessment/", assessment_result, name="ass_results"),
+    path("result/print/all/", result_sheets_pdf_view, name="result_sheets_pdf_view"),
     path("result/print/<int:id>/", result_sheet_pdf_view, name="result_sheet_pdf_view"),
     path(
         "registration/form/", course_registration_form, name="course_registration_form"
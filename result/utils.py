@@ -0,0 +1,79 @@
+from decimal import Decimal
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AcademicStanding, TakenCourse, Result, add_standing_delta
+
+SCORE_FIELDS = ("assignment", "mid_exam", "quiz", "attendance", "final_exam")
+GRADED_FIELDS = SCORE_FIELDS + ("total", "grade", "point", "comment", "updated_at")
+
+
+def record_scores(course, scores, semester, session):
+    """
+    Grade and persist the scores submitted for ``course`` in one transaction.
+
+    ``scores`` maps TakenCourse ids to the five raw scores in the order of
+    ``SCORE_FIELDS``. The number of queries does not depend on class size:
+    the rows are fetched once, graded in memory, written with ``bulk_update``,
+    the score changes are applied to ``AcademicStanding`` as deltas and the
+    affected students' ``Result`` rows are upserted in bulk.
+    """
+    with transaction.atomic():
+        taken_courses = list(
+            TakenCourse.objects.select_related("course", "student").filter(
+                course=course, pk__in=scores.keys()
+            )
+        )
+        deltas = {}
+        updated_at = timezone.now()
+        for taken_course in taken_courses:
+            add_standing_delta(
+                deltas, *taken_course.get_standing_contribution(), sign=-1
+            )
+            values = scores[str(taken_course.pk)]
+            for field, value in zip(SCORE_FIELDS, values):
+                setattr(taken_course, field, Decimal(value))
+            taken_course.apply_grading()
+            # bulk_update() skips auto_now, but result sheets are cached on it
+            taken_course.updated_at = updated_at
+            add_standing_delta(deltas, *taken_course.get_standing_contribution())
+        TakenCourse.objects.bulk_update(taken_courses, GRADED_FIELDS)
+        AcademicStanding.objects.apply_deltas(deltas)
+
+        students = {tc.student_id: tc.student for tc in taken_courses}
+        if not students:
+            return 0
+        averages = TakenCourse.objects.gpa_for(list(students), semester)
+
+        existing = {}
+        for result in Result.objects.filter(
+            student_id__in=students,
+            semester=semester.semester,
+            session=session.session,
+        ):
+            if result.level == students[result.student_id].level:
+                existing.setdefault(result.student_id, []).append(result)
+
+        to_update, to_create = [], []
+        for student_id, student in students.items():
+            gpa, cgpa = averages[student_id]["gpa"], averages[student_id]["cgpa"]
+            if student_id in existing:
+                for result in existing[student_id]:
+                    result.gpa = gpa
+                    result.cgpa = cgpa
+                    to_update.append(result)
+            else:
+                to_create.append(
+                    Result(
+                        student=student,
+                        gpa=gpa,
+                        cgpa=cgpa,
+                        semester=semester.semester,
+                        session=session.session,
+                        level=student.level,
+                    )
+                )
+        Result.objects.bulk_update(to_update, ["gpa", "cgpa"])
+        Result.objects.bulk_create(to_create)
+    return len(taken_courses)